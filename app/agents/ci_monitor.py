@@ -2,17 +2,158 @@
 CI Monitor Agent
 ================
 Polls GitHub Actions API to check the status of a specific commit/branch.
+
+Webhook-first mode (``wait_for_status``):
+    GitHub ``check_suite`` / ``check_run`` / ``workflow_run`` webhooks are
+    routed through ``webhook_hub`` to wake waiting monitors, which confirm
+    the aggregate status with a single API call. Polling is only the
+    fallback when no webhook arrives within ``fallback_after`` seconds.
 """
 import httpx
 import time
 import asyncio
+import functools
 import logging
+import random
 import re
+import statistics
+from collections import deque
 from datetime import datetime, timezone
-from typing import Optional, Literal, List, Dict, Any
+from email.utils import parsedate_to_datetime
+from typing import Optional, Literal, List, Dict, Any, Callable, Awaitable
+
+try:
+    import orjson  # faster parser for large check-run / workflow-run payloads
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+    ORJSON_AVAILABLE = False
+
+try:
+    import ijson  # incremental parser for large workflow-run listings
+    IJSON_AVAILABLE = True
+except ImportError:
+    ijson = None  # type: ignore[assignment]
+    IJSON_AVAILABLE = False
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 multiplexing in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Rate-limit handling: pre-emptively pause when fewer than this many
+# requests remain in the current GitHub quota window.
+_RATE_LIMIT_LOW_WATERMARK = 5
+
+# Adaptive polling: sleep proportionally to how long the CI job has been
+# running (~7 polls over a run's life) instead of pure geometric growth.
+_MIN_BACKOFF = 5.0
+_MAX_BACKOFF = 60.0
+_GEOMETRIC_BACKOFF_CAP = 30.0   # fallback when GitHub gives no start time
+_ADAPTIVE_FACTOR = 0.15
+_DURATION_SAMPLES = 10          # recent run durations kept per repo
+
+# Stall detection is time-based: a run is "stalled" once no job has changed
+# state for this long (or the repo's median run time, if longer). Counting
+# polls would misfire because the adaptive delay changes the poll cadence.
+_STALL_SECONDS = 180.0
+
+# GraphQL check-run query — fetches only the fields the poll loop reads,
+# roughly a tenth of the REST check-runs payload.
+_GRAPHQL_URL = "https://api.github.com/graphql"
+_CHECK_RUNS_QUERY = (
+    "query($owner:String!,$repo:String!,$sha:GitObjectID!){"
+    " repository(owner:$owner,name:$repo){"
+    " object(oid:$sha){ ... on Commit {"
+    " checkSuites(first:20){ nodes{"
+    " checkRuns(first:50){ nodes{ name status conclusion startedAt } }"
+    " } } } } } }"
+)
+_FAILED_CONCLUSIONS = frozenset({"failure", "timed_out", "action_required", "cancelled"})
+
+# Timeline cap — oldest events are dropped once a long-lived monitor
+# has recorded this many, keeping memory bounded.
+_TIMELINE_MAXLEN = 1000
+
+# owner/repo extraction from https:// or git@ GitHub URLs
+_REPO_PATH_RE = re.compile(r"github\.com[:/](.+?)(?:\.git)?$")
+
+# Error handling: transient failures back off exponentially (2^n seconds,
+# capped); after this many consecutive failures the circuit opens and the
+# poll gives up with "ci_error" instead of hammering a degraded GitHub.
+_CIRCUIT_BREAKER_THRESHOLD = 6
+_MAX_ERROR_BACKOFF = 300.0
+_TRANSIENT_ERRORS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+
+# Workflow-run listings can exceed 1 MB; only the newest runs matter
+# for filtering, so streaming stops after this many items.
+_STREAM_ITEM_LIMIT = 20
+
+# Job filtering: skip deploy/publish jobs, focus on build/test jobs.
+# Single compiled alternations scan each job name once instead of
+# one Python-level substring test per keyword.
+_IGNORE_JOB_RE = re.compile("deploy|publish|release|notify")
+_FOCUS_JOB_RE = re.compile("build|test|lint|check|ci")
+
+
+@functools.lru_cache(maxsize=32)
+def _extract_repo_path(repo_url: str) -> str:
+    """Extract 'owner/repo' from GitHub URL (memoised — a run polls few repos)."""
+    match = _REPO_PATH_RE.search(repo_url)
+    return match.group(1).rstrip("/") if match else ""
+
+
+def _jittered(delay: float) -> float:
+    """Spread a delay over ±50% so parallel monitors don't wake in lockstep."""
+    return random.uniform(delay * 0.5, delay * 1.5)
+
+
+class CIWebhookHub:
+    """
+    Process-wide registry of monitors waiting on GitHub CI webhooks.
+
+    Keys are ``(owner/repo, commit_sha)`` (lower-cased). The webhook route
+    calls ``dispatch``; waiting ``CIMonitor.wait_for_status`` calls are
+    woken via their ``asyncio.Event``.
+    """
+
+    def __init__(self) -> None:
+        self._waiters: Dict[tuple[str, str], List[asyncio.Event]] = {}
+
+    @staticmethod
+    def _key(repo_path: str, commit_sha: str) -> tuple[str, str]:
+        return repo_path.lower(), commit_sha.lower()
+
+    def register(self, repo_path: str, commit_sha: str) -> asyncio.Event:
+        """Register a waiter and return the event that a webhook will set."""
+        event = asyncio.Event()
+        self._waiters.setdefault(self._key(repo_path, commit_sha), []).append(event)
+        return event
+
+    def unregister(self, repo_path: str, commit_sha: str, event: asyncio.Event) -> None:
+        key = self._key(repo_path, commit_sha)
+        waiters = self._waiters.get(key)
+        if not waiters:
+            return
+        if event in waiters:
+            waiters.remove(event)
+        if not waiters:
+            del self._waiters[key]
+
+    def dispatch(self, repo_path: str, commit_sha: str) -> int:
+        """Wake every waiter for a commit. Returns the number woken."""
+        waiters = self._waiters.get(self._key(repo_path, commit_sha), [])
+        for event in waiters:
+            event.set()
+        return len(waiters)
+
+
+webhook_hub = CIWebhookHub()
+
+
 CIStatus = Literal[
     "queued", 
     "in_progress", 
@@ -28,8 +169,15 @@ class CIMonitor:
     Agent that monitors the health of the CI/CD pipeline on GitHub.
     """
 
-    def __init__(self, github_token: str = "") -> None:
+    def __init__(
+        self,
+        github_token: str = "",
+        use_graphql: bool = False,
+        timeline_maxlen: int = _TIMELINE_MAXLEN,
+    ) -> None:
         self.github_token = github_token
+        # GraphQL requires an authenticated token
+        self.use_graphql = use_graphql and bool(github_token)
         self.headers = {
             "Accept": "application/vnd.github.v3+json",
             "User-Agent": "CI-Healing-Agent"
@@ -37,14 +185,113 @@ class CIMonitor:
         if github_token:
             self.headers["Authorization"] = f"token {github_token}"
         
-        self.timeline: List[Dict[str, Any]] = []
+        self.timeline: deque = deque(maxlen=timeline_maxlen)
+
+        # Conditional-GET cache: url → ETag and url → last parsed items.
+        # A 304 Not Modified reply is free against the primary rate limit.
+        self._etags: Dict[str, str] = {}
+        self._last_items: Dict[str, List[Dict[str, Any]]] = {}
+
+        # In-flight poll loops keyed by URL — concurrent callers for the
+        # same commit/branch share one loop instead of duplicating requests.
+        self._inflight: Dict[str, "asyncio.Future[CIStatus]"] = {}
+        # Callers currently awaiting each shared poll; the last one to leave
+        # (e.g. cancelled) cancels the poll instead of leaving it orphaned.
+        self._waiters: Dict["asyncio.Future[CIStatus]", int] = {}
+
+        # Long-lived HTTP client, created lazily and reused across polls so
+        # the TCP/TLS handshake to api.github.com is paid once per monitor.
+        self._client: Optional[httpx.AsyncClient] = None
+
+        # Median CI run duration per repo, used to seed the first poll delay
+        self._median_duration: Dict[str, float] = {}
+        self._run_durations: Dict[str, deque] = {}
+
+        # Epoch seconds at which a nearly-exhausted rate-limit quota resets
+        self._quota_reset_at: Optional[float] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Lazy-initialise the pooled HTTP client."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=20.0,
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=60),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Cancel in-flight polls, then close the pooled HTTP client."""
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if self._client and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
 
     def _extract_repo_path(self, repo_url: str) -> str:
         """Extract 'owner/repo' from GitHub URL."""
-        match = re.search(r"github\.com[:/](.+?)(?:\.git)?$", repo_url)
-        if match:
-            return match.group(1).rstrip("/")
-        return ""
+        return _extract_repo_path(repo_url)
+
+    @staticmethod
+    def _rate_limit_delay(headers: httpx.Headers, floor: float = 0.0) -> Optional[float]:
+        """
+        Compute how long to wait from GitHub rate-limit headers.
+
+        Honours ``Retry-After`` (delta-seconds or HTTP-date) and
+        ``X-RateLimit-Reset`` (epoch seconds). Returns None when the
+        response carries no rate-limit information.
+        """
+        delays: List[float] = []
+
+        retry_after = headers.get("Retry-After")
+        if retry_after:
+            try:
+                delays.append(float(retry_after))
+            except ValueError:
+                try:
+                    retry_at = parsedate_to_datetime(retry_after)
+                    delays.append(retry_at.timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+
+        reset = headers.get("X-RateLimit-Reset")
+        if reset and headers.get("X-RateLimit-Remaining") == "0":
+            try:
+                delays.append(float(reset) - time.time())
+            except ValueError:
+                pass
+
+        if not delays:
+            return None
+        return max(max(delays), floor, 0.0)
+
+    def _note_rate_limit(self, response: httpx.Response) -> None:
+        """
+        Record when the quota resets if the remaining budget is nearly exhausted.
+
+        The poll loop waits for the reset before its next request (bounded
+        by its own deadline); a response that completes the poll costs no wait.
+        """
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if not remaining or not reset:
+            return
+        try:
+            remaining_count = int(remaining)
+            reset_at = float(reset)
+        except ValueError:
+            return
+        self._quota_reset_at = reset_at if remaining_count < _RATE_LIMIT_LOW_WATERMARK else None
+
+    def _quota_wait(self) -> float:
+        """Seconds until the nearly-exhausted quota resets (0 when not throttled)."""
+        if self._quota_reset_at is None:
+            return 0.0
+        return max(self._quota_reset_at - time.time(), 0.0)
 
     def _add_timeline_event(
         self,
@@ -53,28 +300,27 @@ class CIMonitor:
         stalled_flag: bool = False,
         job_name: str = "",
         duration: float = 0.0,
+        circuit_open: bool = False,
     ) -> None:
-        """Add a timeline event for the dashboard."""
+        """Add a timeline event for the dashboard (timestamp kept as epoch seconds)."""
         self.timeline.append({
             "iteration": iteration,
             "status": status,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "timestamp": time.time(),
             "stalled_flag": stalled_flag,
             "job_name": job_name,
             "duration": round(duration, 2),
+            "circuit_open": circuit_open,
         })
 
     def _filter_jobs(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Filter jobs to focus on build/test and ignore deploy/publish."""
-        ignore_keywords = ["deploy", "publish", "release", "notify"]
-        focus_keywords = ["build", "test", "lint", "check", "ci"]
-        
         filtered = []
         for job in jobs:
             name = job.get("name", "").lower()
-            if any(kw in name for kw in ignore_keywords):
+            if _IGNORE_JOB_RE.search(name):
                 continue
-            if not focus_keywords or any(kw in name for kw in focus_keywords):
+            if _FOCUS_JOB_RE.search(name):
                 filtered.append(job)
         
         # If no focus jobs found, return all non-ignored
@@ -97,7 +343,15 @@ class CIMonitor:
             return "unknown_timeout"
 
         url = f"https://api.github.com/repos/{repo_path}/commits/{commit_sha}/check-runs"
-        return await self._poll_url(url, "check_runs", timeout_seconds, iteration)
+        fetch = None
+        if self.use_graphql:
+            fetch = functools.partial(
+                self._fetch_check_runs_graphql, repo_path=repo_path, commit_sha=commit_sha
+            )
+
+        return await self._poll_coalesced(
+            url, "check_runs", timeout_seconds, iteration, repo_path=repo_path, fetch=fetch
+        )
 
     async def poll_branch_status(
         self,
@@ -115,104 +369,459 @@ class CIMonitor:
             return "unknown_timeout"
 
         url = f"https://api.github.com/repos/{repo_path}/actions/runs?branch={branch}"
-        return await self._poll_url(url, "workflow_runs", timeout_seconds, iteration)
+        return await self._poll_coalesced(
+            url, "workflow_runs", timeout_seconds, iteration, repo_path=repo_path
+        )
+
+    async def wait_for_status(
+        self,
+        repo_url: str,
+        commit_sha: str,
+        timeout_seconds: int = 300,
+        iteration: int = 1,
+        fallback_after: float = 60.0,
+    ) -> CIStatus:
+        """
+        Webhook-first wait for a commit's CI result.
+
+        Sleeps until a GitHub webhook for the commit wakes it, then confirms
+        the aggregate status with one API call. If no webhook arrives for
+        ``fallback_after`` seconds, falls back to ``poll_status`` for the
+        remaining time budget.
+        """
+        repo_path = self._extract_repo_path(repo_url)
+        if not repo_path:
+            logger.error("Could not extract repo path from %s", repo_url)
+            return "unknown_timeout"
 
-    async def _poll_url(self, url: str, data_key: str, timeout_seconds: int, iteration: int) -> CIStatus:
-        """Shared polling logic with exponential backoff, stalled detection, and cooldown."""
+        url = f"https://api.github.com/repos/{repo_path}/commits/{commit_sha}/check-runs"
         start_time = time.time()
-        backoff = 5.0
-        consecutive_in_progress = 0
-        consecutive_same_state = 0
-        last_status = ""
+        deadline = start_time + timeout_seconds
+        event = webhook_hub.register(repo_path, commit_sha)
+        try:
+            while True:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    elapsed = round(time.time() - start_time, 2)
+                    self._add_timeline_event(iteration, "unknown_timeout", duration=elapsed)
+                    return "unknown_timeout"
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=min(remaining, fallback_after))
+                except asyncio.TimeoutError:
+                    logger.info(
+                        "No CI webhook for %s@%s within %.0fs, falling back to polling",
+                        repo_path, commit_sha[:8], fallback_after,
+                    )
+                    return await self.poll_status(
+                        repo_url, commit_sha,
+                        max(1, int(deadline - time.time())), iteration,
+                    )
+                event.clear()
 
-        async with httpx.AsyncClient(headers=self.headers, timeout=20.0) as client:
-            while (time.time() - start_time) < timeout_seconds:
                 try:
-                    response = await client.get(url)
-                    response.raise_for_status()
-                    data = response.json()
-                    items = data.get(data_key, [])
-
-                    if not items:
-                        current_status: CIStatus = "queued"
-                        job_names = ""
+                    client = self._get_client()
+                    if self.use_graphql:
+                        items = await self._fetch_check_runs_graphql(client, repo_path, commit_sha)
                     else:
-                        # Apply job filtering logic
-                        filtered_items = self._filter_jobs(items)
-                        job_names = ", ".join(
-                            r.get("name", "unknown")[:40] for r in filtered_items[:3]
+                        items = await self._fetch_rest_items(client, url, "check_runs")
+                except Exception as e:
+                    logger.warning("Webhook-triggered CI check failed (%s), falling back to polling", e)
+                    return await self.poll_status(
+                        repo_url, commit_sha,
+                        max(1, int(deadline - time.time())), iteration,
+                    )
+
+                status, job_names, _ = self._summarise_items(items)
+                if status in ("completed_success", "completed_failure"):
+                    elapsed = round(time.time() - start_time, 2)
+                    self._add_timeline_event(iteration, status, job_name=job_names, duration=elapsed)
+                    return status
+        finally:
+            webhook_hub.unregister(repo_path, commit_sha, event)
+
+    async def _poll_coalesced(
+        self,
+        url: str,
+        data_key: str,
+        timeout_seconds: int,
+        iteration: int,
+        repo_path: str = "",
+        fetch: Optional[Callable[[httpx.AsyncClient], Awaitable[List[Dict[str, Any]]]]] = None,
+    ) -> CIStatus:
+        """Join an in-flight poll for the same URL, or start a new one."""
+        task = self._inflight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._poll_url(
+                    url, data_key, timeout_seconds, iteration,
+                    repo_path=repo_path, fetch=fetch,
+                )
+            )
+            self._inflight[url] = task
+
+            def _release(done: "asyncio.Future[CIStatus]", key: str = url) -> None:
+                if self._inflight.get(key) is done:
+                    del self._inflight[key]
+
+            task.add_done_callback(_release)
+        # Shield so one cancelled caller does not cancel the shared poll loop;
+        # once no caller is left waiting, nobody needs the result
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            remaining = self._waiters[task] - 1
+            if remaining:
+                self._waiters[task] = remaining
+            else:
+                del self._waiters[task]
+                if not task.done():
+                    task.cancel()
+
+    async def _fetch_rest_items(
+        self, client: httpx.AsyncClient, url: str, data_key: str
+    ) -> List[Dict[str, Any]]:
+        """GET a REST endpoint (with conditional-GET caching) and return its item list."""
+        request_headers: Dict[str, str] = {}
+        if url in self._etags and url in self._last_items:
+            request_headers["If-None-Match"] = self._etags[url]
+
+        if data_key == "workflow_runs" and IJSON_AVAILABLE:
+            return await self._stream_rest_items(client, url, data_key, request_headers)
+
+        response = await client.get(url, headers=request_headers)
+        if response.status_code == 304 and url in self._last_items:
+            # Nothing changed on GitHub's side — reuse the cached items
+            return self._last_items[url]
+
+        response.raise_for_status()
+        self._note_rate_limit(response)
+        data = orjson.loads(response.content) if ORJSON_AVAILABLE else response.json()
+        items = data.get(data_key, [])
+        etag = response.headers.get("ETag")
+        if etag:
+            self._etags[url] = etag
+            self._last_items[url] = items
+        return items
+
+    async def _stream_rest_items(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        data_key: str,
+        request_headers: Dict[str, str],
+    ) -> List[Dict[str, Any]]:
+        """
+        Stream a large REST listing with ijson, stopping after the first
+        ``_STREAM_ITEM_LIMIT`` items instead of materialising the whole payload.
+        """
+        async with client.stream("GET", url, headers=request_headers) as response:
+            if response.status_code == 304 and url in self._last_items:
+                return self._last_items[url]
+            response.raise_for_status()
+            self._note_rate_limit(response)
+
+            items: List[Dict[str, Any]] = []
+            events = ijson.sendable_list()
+            parser = ijson.items_coro(events, f"{data_key}.item")
+            async for chunk in response.aiter_bytes():
+                parser.send(chunk)
+                items.extend(events)
+                del events[:]
+                if len(items) >= _STREAM_ITEM_LIMIT:
+                    break
+            else:
+                parser.close()
+                items.extend(events)
+            items = items[:_STREAM_ITEM_LIMIT]
+
+            etag = response.headers.get("ETag")
+            if etag:
+                self._etags[url] = etag
+                self._last_items[url] = items
+        return items
+
+    async def _fetch_check_runs_graphql(
+        self, client: httpx.AsyncClient, repo_path: str, commit_sha: str
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch check runs for a commit via GraphQL.
+
+        Flattens checkSuites → checkRuns into the same list-of-dicts shape
+        (lowercase ``status`` / ``conclusion``, ``started_at``) that the
+        REST check-runs endpoint returns, so the poll loop is unchanged.
+        """
+        owner, _, repo = repo_path.partition("/")
+        response = await client.post(
+            _GRAPHQL_URL,
+            json={
+                "query": _CHECK_RUNS_QUERY,
+                "variables": {"owner": owner, "repo": repo, "sha": commit_sha},
+            },
+        )
+        response.raise_for_status()
+        self._note_rate_limit(response)
+        data = orjson.loads(response.content) if ORJSON_AVAILABLE else response.json()
+        if data.get("errors"):
+            raise ValueError(f"GraphQL errors: {data['errors']}")
+
+        return self._flatten_check_runs((data.get("data") or {}).get("repository"))
+
+    @staticmethod
+    def _flatten_check_runs(repository: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Flatten a GraphQL repository.object.checkSuites node into REST-shaped check runs."""
+        commit = (repository or {}).get("object") or {}
+        items: List[Dict[str, Any]] = []
+        for suite in (commit.get("checkSuites") or {}).get("nodes") or []:
+            for run in (suite.get("checkRuns") or {}).get("nodes") or []:
+                items.append({
+                    "name": run.get("name") or "",
+                    "status": (run.get("status") or "").lower(),
+                    "conclusion": (run.get("conclusion") or "").lower() or None,
+                    "started_at": run.get("startedAt"),
+                })
+        return items
+
+    def _summarise_items(
+        self, items: List[Dict[str, Any]]
+    ) -> tuple[CIStatus, str, Optional[float]]:
+        """
+        Reduce a check-run / workflow-run list to (status, job_names, job_started).
+
+        Status is "queued" (no runs), "in_progress", "completed_success"
+        or "completed_failure", after deploy/publish jobs are filtered out.
+        job_started is the earliest reported start time (epoch seconds).
+        Single pass over the filtered jobs.
+        """
+        if not items:
+            return "queued", "", None
+
+        all_completed = True
+        any_failed = False
+        job_started: Optional[float] = None
+        names: List[str] = []
+        for idx, run in enumerate(self._filter_jobs(items)):
+            if run.get("status") != "completed":
+                all_completed = False
+            elif run.get("conclusion") in _FAILED_CONCLUSIONS:
+                any_failed = True
+            if idx < 3:
+                names.append(run.get("name", "unknown")[:40])
+            started = self._parse_start(run)
+            if started is not None and (job_started is None or started < job_started):
+                job_started = started
+
+        job_names = ", ".join(names)
+        if not all_completed:
+            return "in_progress", job_names, job_started
+        status: CIStatus = "completed_failure" if any_failed else "completed_success"
+        return status, job_names, job_started
+
+    @staticmethod
+    def _parse_start(item: Dict[str, Any]) -> Optional[float]:
+        """Return a job's start time (epoch seconds), if GitHub reported one."""
+        raw = item.get("started_at") or item.get("run_started_at")
+        if not raw:
+            return None
+        try:
+            return datetime.fromisoformat(raw.replace("Z", "+00:00")).timestamp()
+        except (AttributeError, ValueError):
+            return None
+
+    def _initial_backoff(self, repo_path: str) -> float:
+        """Seed the first poll delay from the repo's median run duration."""
+        median = self._median_duration.get(repo_path)
+        if not median:
+            return _MIN_BACKOFF
+        return min(max(median / 10, _MIN_BACKOFF), _MAX_BACKOFF)
+
+    def _record_duration(self, repo_path: str, seconds: float) -> None:
+        """Track a completed run's duration and refresh the repo median."""
+        if not repo_path or seconds <= 0:
+            return
+        samples = self._run_durations.setdefault(repo_path, deque(maxlen=_DURATION_SAMPLES))
+        samples.append(seconds)
+        self._median_duration[repo_path] = statistics.median(samples)
+
+    async def _poll_url(
+        self,
+        url: str,
+        data_key: str,
+        timeout_seconds: int,
+        iteration: int,
+        repo_path: str = "",
+        fetch: Optional[Callable[[httpx.AsyncClient], Awaitable[List[Dict[str, Any]]]]] = None,
+    ) -> CIStatus:
+        """Shared polling logic with adaptive backoff, stalled detection, and cooldown."""
+        start_time = time.time()
+        deadline = start_time + timeout_seconds
+        backoff = self._initial_backoff(repo_path)
+        stall_after = max(_STALL_SECONDS, self._median_duration.get(repo_path, 0.0))
+        last_progress_at = start_time
+        last_progress: tuple = ()
+        consecutive_same_state = 0
+        consecutive_errors = 0
+        malformed_payloads = 0
+        last_status = ""
+
+        client = self._get_client()
+        while time.time() < deadline:
+            try:
+                if fetch is not None:
+                    items = await fetch(client)
+                else:
+                    items = await self._fetch_rest_items(client, url, data_key)
+                consecutive_errors = 0
+
+                current_status, job_names, job_started = self._summarise_items(items)
+
+                if current_status in ("completed_success", "completed_failure"):
+                    elapsed = round(time.time() - start_time, 2)
+                    self._record_duration(
+                        repo_path,
+                        time.time() - job_started if job_started is not None else elapsed,
+                    )
+                    self._add_timeline_event(
+                        iteration, current_status, job_name=job_names, duration=elapsed
+                    )
+                    return current_status
+
+                # Stalled detection — no job has changed state for stall_after seconds
+                progress = (
+                    current_status,
+                    sum(1 for run in items if run.get("status") == "completed"),
+                )
+                if progress != last_progress:
+                    last_progress = progress
+                    last_progress_at = time.time()
+                elif (
+                    current_status == "in_progress"
+                    and time.time() - last_progress_at >= stall_after
+                ):
+                    logger.warning(
+                        "CI detected as STALLED (no progress for %.0fs)",
+                        time.time() - last_progress_at,
+                    )
+                    elapsed = round(time.time() - start_time, 2)
+                    self._add_timeline_event(
+                        iteration, "stalled", stalled_flag=True,
+                        job_name=job_names, duration=elapsed,
+                    )
+                    return "stalled"
+
+                # Polling cooldown — accelerate backoff on repeated same-state
+                if current_status == last_status:
+                    consecutive_same_state += 1
+                    # Use faster multiplier when stuck on same state
+                    multiplier = 2.0 if consecutive_same_state >= 2 else 1.5
+                else:
+                    consecutive_same_state = 0
+                    multiplier = 1.5
+                    if last_status:
+                        # State transition — poll promptly again
+                        backoff = _MIN_BACKOFF
+                    elapsed = round(time.time() - start_time, 2)
+                    logger.info("CI Status update: %s", current_status)
+                    self._add_timeline_event(
+                        iteration, current_status,
+                        job_name=job_names if items else "",
+                        duration=elapsed,
+                    )
+                    last_status = current_status
+
+                # Adaptive backoff — proportional to how long the job has run;
+                # geometric growth when GitHub gives no start time.
+                if job_started is not None:
+                    elapsed_job = time.time() - job_started
+                    backoff = min(max(elapsed_job * _ADAPTIVE_FACTOR, _MIN_BACKOFF), _MAX_BACKOFF)
+                    delay = _jittered(backoff)
+                else:
+                    delay = _jittered(backoff)
+                    backoff = min(backoff * multiplier, _GEOMETRIC_BACKOFF_CAP)
+
+                # Quota nearly exhausted — hold the next request until the reset,
+                # unless the reset lands past the polling deadline.
+                quota_wait = self._quota_wait()
+                if quota_wait > delay:
+                    if quota_wait >= deadline - time.time():
+                        logger.warning(
+                            "GitHub rate limit resets in %.1fs, past the polling deadline", quota_wait
                         )
-                        
-                        all_completed = all(r.get("status") == "completed" for r in filtered_items)
-                        
-                        if all_completed:
-                            any_failed = any(
-                                r.get("conclusion") in ("failure", "timed_out", "action_required", "cancelled") 
-                                for r in filtered_items
-                            )
-                            status: CIStatus = "completed_failure" if any_failed else "completed_success"
-                            elapsed = round(time.time() - start_time, 2)
-                            self._add_timeline_event(
-                                iteration, status, job_name=job_names, duration=elapsed
-                            )
-                            return status
-                        
-                        current_status = "in_progress"
-
-                    # Stalled detection
-                    if current_status == "in_progress":
-                        consecutive_in_progress += 1
-                        if consecutive_in_progress >= 7:  # ~2.5-3 minutes of no change
-                            logger.warning("CI detected as STALLED")
-                            elapsed = round(time.time() - start_time, 2)
-                            self._add_timeline_event(
-                                iteration, "stalled", stalled_flag=True,
-                                job_name=job_names, duration=elapsed,
-                            )
-                            return "stalled"
-                    else:
-                        consecutive_in_progress = 0
+                        break
+                    logger.warning(
+                        "GitHub rate limit nearly exhausted, sleeping %.1fs until reset", quota_wait
+                    )
+                    delay = quota_wait
+                await asyncio.sleep(delay)
+                continue
 
-                    # Polling cooldown — accelerate backoff on repeated same-state
-                    if current_status == last_status:
-                        consecutive_same_state += 1
-                        # Use faster multiplier when stuck on same state
-                        multiplier = 2.0 if consecutive_same_state >= 2 else 1.5
-                    else:
-                        consecutive_same_state = 0
-                        multiplier = 1.5
-                        elapsed = round(time.time() - start_time, 2)
-                        logger.info("CI Status update: %s", current_status)
-                        self._add_timeline_event(
-                            iteration, current_status,
-                            job_name=job_names if items else "",
-                            duration=elapsed,
+            except httpx.HTTPStatusError as http_err:
+                status_code = http_err.response.status_code
+                if status_code in (403, 429):
+                    # Primary/secondary rate limit — wait for the advertised reset
+                    rate_delay = self._rate_limit_delay(http_err.response.headers, floor=backoff)
+                    if rate_delay is not None:
+                        if rate_delay >= deadline - time.time():
+                            logger.warning(
+                                "CI polling rate-limited (HTTP %d) until past the polling deadline "
+                                "(%.1fs), giving up", status_code, rate_delay,
+                            )
+                            break
+                        logger.warning(
+                            "CI polling rate-limited (HTTP %d, remaining=%s, reset=%s), sleeping %.1fs",
+                            status_code,
+                            http_err.response.headers.get("X-RateLimit-Remaining", "?"),
+                            http_err.response.headers.get("X-RateLimit-Reset", "?"),
+                            rate_delay,
                         )
-                        last_status = current_status
-
-                    # Exponential backoff
-                    await asyncio.sleep(backoff)
-                    backoff = min(backoff * multiplier, 30.0)
-
-                except httpx.HTTPStatusError as http_err:
-                    status_code = http_err.response.status_code
-                    if 400 <= status_code < 500:
-                        # 4xx = permanent error (commit doesn't exist, bad auth, etc.)
-                        logger.error("CI polling aborted — HTTP %d: %s", status_code, http_err)
-                        elapsed = round(time.time() - start_time, 2)
-                        self._add_timeline_event(iteration, "ci_error", duration=elapsed)
-                        return "ci_error"
-                    # 5xx = transient, retry
-                    logger.error("CI polling server error (HTTP %d), retrying: %s", status_code, http_err)
-                    await asyncio.sleep(10)
-                except Exception as e:
-                    logger.error("Error polling CI: %s", e)
-                    await asyncio.sleep(10)
+                        await asyncio.sleep(rate_delay)
+                        continue
+                if 400 <= status_code < 500:
+                    # 4xx = permanent error (commit doesn't exist, bad auth, etc.)
+                    logger.error("CI polling aborted — HTTP %d: %s", status_code, http_err)
+                    elapsed = round(time.time() - start_time, 2)
+                    self._add_timeline_event(iteration, "ci_error", duration=elapsed)
+                    return "ci_error"
+                # 5xx = transient, retry
+                logger.error("CI polling server error (HTTP %d), retrying: %s", status_code, http_err)
+            except _TRANSIENT_ERRORS as e:
+                logger.error("Transient error polling CI (%s), retrying: %s", type(e).__name__, e)
+            except ValueError as e:
+                # Malformed JSON / GraphQL error payload — retry once, then give up
+                malformed_payloads += 1
+                if malformed_payloads > 1:
+                    logger.error("CI polling aborted — repeated malformed response: %s", e)
+                    elapsed = round(time.time() - start_time, 2)
+                    self._add_timeline_event(iteration, "ci_error", duration=elapsed)
+                    return "ci_error"
+                logger.error("Malformed CI response, retrying once: %s", e)
+            except Exception:
+                logger.exception("Unexpected error polling CI, aborting")
+                elapsed = round(time.time() - start_time, 2)
+                self._add_timeline_event(iteration, "ci_error", duration=elapsed)
+                return "ci_error"
+
+            # Only failed ticks reach here — successful ticks sleep and `continue`
+            # inside the try block above.
+            consecutive_errors += 1
+            if consecutive_errors >= _CIRCUIT_BREAKER_THRESHOLD:
+                logger.error(
+                    "CI polling circuit OPEN after %d consecutive errors", consecutive_errors
+                )
+                elapsed = round(time.time() - start_time, 2)
+                self._add_timeline_event(
+                    iteration, "ci_error", duration=elapsed, circuit_open=True
+                )
+                return "ci_error"
+            await asyncio.sleep(_jittered(min(2.0 ** consecutive_errors, _MAX_ERROR_BACKOFF)))
 
         elapsed = round(time.time() - start_time, 2)
         self._add_timeline_event(iteration, "unknown_timeout", duration=elapsed)
         return "unknown_timeout"
 
     def get_timeline(self) -> List[Dict[str, Any]]:
-        """Return the captured timeline events."""
-        return self.timeline
+        """Return the captured timeline events with ISO-8601 UTC timestamps."""
+        return [
+            {**event, "timestamp": datetime.fromtimestamp(event["timestamp"], tz=timezone.utc).isoformat()}
+            for event in self.timeline
+        ]
@@ -33,17 +33,23 @@ The FixAgent does NOT:
 FixAgent only proposes code patches.
 """
 import difflib
+import functools
+import hashlib
 import logging
 import re
 import asyncio
-from typing import Optional
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Union
 
 from app.models.bug_report import BugReport
 from app.models.fix_result import FixResult
 from app.llm.client import LLMClient, LLMResponse
 from app.llm.router import LLMRouter, decide_context_level
 from app.llm.prompts import get_system_prompt, build_user_prompt
-from app.utils.fix_fingerprint import generate_bug_signature, generate_fix_fingerprint
+from app.llm.rate_limiter import AsyncRateLimiter
+from app.core.config import LLM_CALLS_PER_MINUTE, LLM_BURST, FIX_FINGERPRINT_DB
+from app.services.cache_service import FingerprintStore
+from app.utils.fix_fingerprint import generate_fix_fingerprint
 from app.utils.patch_locality import validate_patch_locality
 from app.utils.escalation_reasons import (
     DIFF_TOO_LARGE,
@@ -54,9 +60,15 @@ from app.utils.escalation_reasons import (
     REPEATED_FIX,
     MERGE_CONFLICT,
     LLM_FAILURE,
-    get_severity_hint,
 )
 
+try:
+    import patiencediff
+    PATIENCEDIFF_AVAILABLE = True
+except ImportError:
+    patiencediff = None  # type: ignore[assignment]
+    PATIENCEDIFF_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
@@ -64,6 +76,28 @@ logger = logging.getLogger(__name__)
 # Merge Conflict Markers
 # ---------------------------------------------------------------------------
 _CONFLICT_MARKER_RE = re.compile(r'^(<{7}|>{7})\s', re.MULTILINE)
+_CONFLICT_MARKERS = ("<<<<<<<", ">>>>>>>")
+
+# Added/removed diff lines, excluding the ---/+++ file headers
+_CHANGED_LINE_RE = re.compile(r'^(?!---|\+\+\+)[+-]', re.MULTILINE)
+
+
+# ---------------------------------------------------------------------------
+# Focused Context (large files)
+# ---------------------------------------------------------------------------
+# Files longer than this are sent to the LLM as a region around the error
+# and the patched region is spliced back, instead of sending the full text
+_FOCUSED_CONTEXT_MAX_LINES = 400
+_SCOPE_HEADER_RE = re.compile(r'^(?:async\s+def|def|class)\s')
+
+# Error lines this far past EOF have nothing localisable for the LLM to fix
+_LINE_OUT_OF_RANGE_MARGIN = 20
+
+
+@functools.lru_cache(maxsize=64)
+def _normalize_scope(working_directory: str) -> str:
+    """Normalise a CI working directory once; it repeats across every fix call."""
+    return working_directory.replace("\\", "/").strip("/")
 
 
 # ---------------------------------------------------------------------------
@@ -85,6 +119,16 @@ class FixAgent:
         Provider router (auto-created if not provided).
     client : LLMClient or None
         HTTP client (auto-created if not provided).
+    rate_limiter : AsyncRateLimiter or None
+        Limiter pacing LLM calls (default: LLM_CALLS_PER_MINUTE per minute,
+        bursts of up to LLM_BURST).
+        Pass one instance to several agents to share a provider quota.
+    max_fingerprints : int
+        Maximum fingerprints kept for repeat detection; least recently
+        seen entries are evicted first (default: 10000).
+    fingerprint_db : str
+        SQLite path persisting rejected or ineffective fingerprints per
+        repo across restarts (default: FIX_FINGERPRINT_DB; empty = in-memory only).
     """
 
     def __init__(
@@ -94,14 +138,24 @@ class FixAgent:
         locality_window: int = 20,
         router: Optional[LLMRouter] = None,
         client: Optional[LLMClient] = None,
+        rate_limiter: Optional[AsyncRateLimiter] = None,
+        max_fingerprints: int = 10_000,
+        fingerprint_db: str = FIX_FINGERPRINT_DB,
     ) -> None:
         self.confidence_threshold = confidence_threshold
         self.max_diff_lines = max_diff_lines
         self.locality_window = locality_window
         self.router = router or LLMRouter()
         self.client = client or LLMClient()
-        # In-memory set of previously seen fix fingerprints (for repeat detection)
-        self._seen_fingerprints: set[str] = set()
+        self._limiter = rate_limiter or AsyncRateLimiter(
+            LLM_CALLS_PER_MINUTE, 60, capacity=LLM_BURST
+        )
+        # Bounded LRU of previously seen fix fingerprints (for repeat detection)
+        self.max_fingerprints = max_fingerprints
+        self._seen_fingerprints: OrderedDict[str, None] = OrderedDict()
+        self._fingerprint_store = FingerprintStore(fingerprint_db) if fingerprint_db else None
+        # In-flight LLM calls keyed by (bug_signature, prompt) hash, for coalescing
+        self._inflight: Dict[str, "asyncio.Future[LLMResponse]"] = {}
 
     # -------------------------------------------------------------------
     # Public API
@@ -118,12 +172,13 @@ class FixAgent:
         full_file_content: str = "",
         related_file_content: str = "",
         ci_config_hint: str = "",
+        repo_url: str = "",
     ) -> FixResult:
         """
         Generate a minimal code fix for the given BugReport.
 
         Steps:
-            1. Compute bug_signature and error_severity_hint
+            1. Read cached bug_signature and error_severity_hint
             2. Check for merge conflict markers → manual_required
             3. Check working directory scope → reject if out of scope
             4. Extract snippet (±3 lines)
@@ -159,6 +214,9 @@ class FixAgent:
             Related file content for medium/large context.
         ci_config_hint : str
             CI config hint for large context.
+        repo_url : str
+            Repository the fix targets; scopes the persistent record of
+            rejected fingerprints.
 
         Returns
         -------
@@ -168,8 +226,8 @@ class FixAgent:
         effective_error = error_message or bug_report.message
 
         # --- Step 1: Compute signatures and hints ---
-        bug_sig = generate_bug_signature(bug_report)
-        severity_hint = get_severity_hint(bug_report.bug_type)
+        bug_sig = bug_report.signature
+        severity_hint = bug_report.severity_hint
 
         # --- Step 2: Merge conflict check ---
         if self._has_conflict_markers(file_content):
@@ -203,17 +261,47 @@ class FixAgent:
             )
 
         # --- Step 4: Extract snippet ---
-        snippet = self._extract_snippet(file_content, bug_report.line_number, context=10)
+        # Split once; snippet extraction and size decisions share the result
+        file_lines = file_content.splitlines()
+        num_lines = len(file_lines)
+
+        # Degenerate inputs: skip the LLM call entirely
+        if (
+            not file_content.strip()
+            or bug_report.line_number < 1
+            or bug_report.line_number > num_lines + _LINE_OUT_OF_RANGE_MARGIN
+        ):
+            logger.warning(
+                "No fixable target in %s (line %d of %d), skipping LLM call",
+                bug_report.file_path, bug_report.line_number, num_lines,
+            )
+            return FixResult(
+                bug_report=bug_report,
+                original_content=file_content,
+                manual_required=True,
+                error_message=(
+                    "Empty file" if not file_content.strip()
+                    else f"Line {bug_report.line_number} is outside the file ({num_lines} lines)"
+                ),
+                bug_signature=bug_sig,
+                escalation_reason=INVALID_RESPONSE,
+                error_severity_hint=severity_hint,
+            )
+
+        snippet = self._extract_snippet_from_lines(file_lines, bug_report.line_number, context=10)
 
         # --- Step 5: Determine context level ---
         # If the file is small, always provide the full content even in attempt 1
-        num_lines = len(file_content.splitlines())
-        if num_lines < 300:
-            context_level = "medium"
-        else:
-            context_level = decide_context_level(attempt_number)
+        context_level = decide_context_level(attempt_number, num_lines)
 
         # --- Step 6: Build prompt ---
+        # Large files: send only a bounded region around the error
+        region: Optional[tuple[int, int]] = None
+        prompt_file_content = full_file_content or file_content
+        if not full_file_content and num_lines > _FOCUSED_CONTEXT_MAX_LINES:
+            region = self._focused_window(file_lines, bug_report.line_number)
+            prompt_file_content = "\n".join(file_lines[region[0]:region[1]])
+
         system_prompt = get_system_prompt(bug_report.domain)
         user_prompt = build_user_prompt(
             error_message=effective_error,
@@ -224,19 +312,16 @@ class FixAgent:
             test_name=test_name,
             previous_attempt_info=previous_attempt_info,
             context_level=context_level,
-            full_file_content=full_file_content or file_content,
+            full_file_content=prompt_file_content,
             related_file_content=related_file_content,
             ci_config_hint=ci_config_hint,
+            region_lines=(region[0] + 1, region[1], num_lines) if region else None,
         )
 
         # --- Step 7: Call LLM ---
-        # Add a short sleep to stay under free-tier TPM limits when multiple bugs are processed
-        await asyncio.sleep(3.0)
         try:
-            llm_response: LLMResponse = await self.client.call_with_fallback(
-                user_prompt=user_prompt,
-                system_prompt=system_prompt,
-                router=self.router,
+            llm_response: LLMResponse = await self._call_llm_coalesced(
+                bug_sig, system_prompt, user_prompt,
             )
         except Exception as e:
             logger.error("LLM call failed: %s", e, exc_info=True)
@@ -265,12 +350,16 @@ class FixAgent:
             )
 
         patched = llm_response.patched_content
-
-        # --- Step 9: Compute diff ---
-        diff = self._compute_diff(file_content, patched, bug_report.file_path)
-
-        # --- Step 10: Safety check — diff size ---
-        if not self._check_diff_size(diff, self.max_diff_lines):
+        if region:
+            patched = self._splice_region(file_content, patched, *region)
+
+        # --- Step 9 + 10: Compute diff, rejecting oversize patches mid-stream ---
+        # CPU-bound; run off the event loop so concurrent fixes keep awaiting I/O
+        diff_ok, diff = await asyncio.to_thread(
+            self._compute_diff_within_limit,
+            file_content, patched, bug_report.file_path, self.max_diff_lines,
+        )
+        if not diff_ok:
             logger.warning(
                 "Diff too large for %s, rejecting patch",
                 bug_report.file_path,
@@ -292,7 +381,7 @@ class FixAgent:
 
         # --- Step 11: Patch locality validation ---
         # If the file is small, give the LLM more room (effectively disable window check)
-        effective_window = 100 if len(file_content.splitlines()) < 100 else self.locality_window
+        effective_window = 100 if num_lines < 100 else self.locality_window
         
         locality_ok, locality_reason = validate_patch_locality(
             original_content=file_content,
@@ -319,13 +408,18 @@ class FixAgent:
             )
 
         # --- Step 12: Fingerprint and repeat detection ---
+        # In-memory check-and-add has no await in between, so it is atomic
+        # under fix_batch; the disk lookup covers patches rejected in earlier runs
         fingerprint = generate_fix_fingerprint(bug_report, diff)
-        is_repeat = fingerprint in self._seen_fingerprints
-        if fingerprint:
-            self._seen_fingerprints.add(fingerprint)
+        is_repeat = self._remember_fingerprint(fingerprint)
+        if not is_repeat and fingerprint and self._fingerprint_store is not None:
+            is_repeat = await asyncio.to_thread(
+                self._fingerprint_store.contains, fingerprint, repo_url
+            )
 
         if is_repeat:
             logger.warning("Repeated fix detected for %s (fingerprint: %s)", bug_report.file_path, fingerprint)
+            await self._persist_rejected(fingerprint, repo_url)
             return FixResult(
                 bug_report=bug_report,
                 original_content=file_content,
@@ -345,6 +439,8 @@ class FixAgent:
 
         # --- Step 13: Confidence gating ---
         below_threshold = llm_response.confidence_score < self.confidence_threshold
+        if below_threshold:
+            await self._persist_rejected(fingerprint, repo_url)
 
         return FixResult(
             bug_report=bug_report,
@@ -363,13 +459,118 @@ class FixAgent:
             error_severity_hint=severity_hint,
         )
 
+    async def fix_batch(
+        self,
+        items: Sequence[Dict[str, Any]],
+        max_concurrency: int = 8,
+        timeout: Optional[float] = None,
+    ) -> List[Union[FixResult, BaseException]]:
+        """
+        Run ``fix`` for several bugs with bounded concurrency.
+
+        Parameters
+        ----------
+        items : sequence of dict
+            Keyword arguments for each ``fix`` call (must include
+            ``bug_report`` and ``file_content``).
+        max_concurrency : int
+            Maximum number of LLM calls in flight at once (default: 8).
+        timeout : float or None
+            Seconds allowed per item, including time queued behind the
+            semaphore, so the whole batch finishes within ``timeout``.
+            Expired items come back as ``asyncio.TimeoutError``.
+
+        Returns
+        -------
+        list
+            One entry per item, in input order. Failures are returned as
+            the raised exception rather than aborting the batch.
+        """
+        sem = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def _one(kwargs: Dict[str, Any]) -> FixResult:
+            async with sem:
+                return await self.fix(**kwargs)
+
+        return await asyncio.gather(
+            *(asyncio.wait_for(_one(kw), timeout=timeout) for kw in items),
+            return_exceptions=True,
+        )
+
+    async def _call_llm_coalesced(
+        self, bug_sig: str, system_prompt: str, user_prompt: str,
+    ) -> LLMResponse:
+        """Join an identical in-flight LLM call, or start a new one."""
+        key = hashlib.sha256(
+            f"{bug_sig}\0{system_prompt}\0{user_prompt}".encode("utf-8")
+        ).hexdigest()
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._call_llm(system_prompt, user_prompt))
+            self._inflight[key] = task
+
+            def _release(done: "asyncio.Future[LLMResponse]", key: str = key) -> None:
+                if self._inflight.get(key) is done:
+                    del self._inflight[key]
+
+            task.add_done_callback(_release)
+        # Shield so one cancelled caller does not cancel the shared call
+        return await asyncio.shield(task)
+
+    async def _call_llm(self, system_prompt: str, user_prompt: str) -> LLMResponse:
+        # Only calls that would exceed the provider quota wait; bursts proceed immediately
+        async with self._limiter:
+            return await self.client.call_with_fallback(
+                user_prompt=user_prompt,
+                system_prompt=system_prompt,
+                router=self.router,
+            )
+
     def clear_fingerprints(self) -> None:
-        """Clear the seen fingerprints set (for new agent run)."""
+        """Clear the in-memory seen fingerprints (for new agent run); persisted ones are kept."""
         self._seen_fingerprints.clear()
 
-    def has_seen_fingerprint(self, fingerprint: str) -> bool:
+    def clear_rejected_fingerprints(self, repo_url: str = "") -> None:
+        """Forget the persisted rejected fingerprints of one repo."""
+        if self._fingerprint_store is not None:
+            self._fingerprint_store.clear_repo(repo_url)
+
+    def _remember_fingerprint(self, fingerprint: str) -> bool:
+        """
+        Record a fingerprint in the in-memory LRU.
+        Returns True if it was already seen.
+        """
+        if not fingerprint:
+            return False
+        if fingerprint in self._seen_fingerprints:
+            self._seen_fingerprints.move_to_end(fingerprint)
+            return True
+        self._seen_fingerprints[fingerprint] = None
+        if len(self._seen_fingerprints) > self.max_fingerprints:
+            self._seen_fingerprints.popitem(last=False)
+        return False
+
+    async def _persist_rejected(self, fingerprint: str, repo_url: str) -> None:
+        """Persist a rejected fingerprint for this repo (if a store is configured)."""
+        if not fingerprint or self._fingerprint_store is None:
+            return
+        await asyncio.to_thread(self._fingerprint_store.add, fingerprint, repo_url)
+
+    async def record_ineffective(self, fix_result: FixResult, repo_url: str = "") -> None:
+        """
+        Remember an applied fix that did not change its bug, so the same
+        patch is flagged as a repeat in later runs against the same repo.
+        """
+        await self._persist_rejected(fix_result.patch_fingerprint, repo_url)
+
+    def has_seen_fingerprint(self, fingerprint: str, repo_url: str = "") -> bool:
         """Check if a fingerprint has been seen before (for testing)."""
-        return fingerprint in self._seen_fingerprints
+        if fingerprint in self._seen_fingerprints:
+            return True
+        return (
+            self._fingerprint_store is not None
+            and self._fingerprint_store.contains(fingerprint, repo_url)
+        )
 
     # -------------------------------------------------------------------
     # Internal Helpers
@@ -393,7 +594,11 @@ class FixAgent:
         str
             The extracted snippet with line numbers prefixed.
         """
-        lines = content.splitlines()
+        return FixAgent._extract_snippet_from_lines(content.splitlines(), line_number, context)
+
+    @staticmethod
+    def _extract_snippet_from_lines(lines: list[str], line_number: int, context: int = 3) -> str:
+        """Same as ``_extract_snippet`` but for content already split into lines."""
         if not lines:
             return ""
 
@@ -402,13 +607,42 @@ class FixAgent:
         start = max(0, idx - context)
         end = min(len(lines), idx + context + 1)
 
-        snippet_lines: list[str] = []
-        for i in range(start, end):
-            line_num = i + 1
-            prefix = ">>>" if line_num == line_number else "   "
-            snippet_lines.append(f"{prefix} {line_num:4} | {lines[i]}")
+        return "\n".join(
+            f"{'>>>' if line_num == line_number else '   '} {line_num:4} | {line}"
+            for line_num, line in enumerate(lines[start:end], start + 1)
+        )
 
-        return "\n".join(snippet_lines)
+    @staticmethod
+    def _focused_window(
+        lines: list[str], line_number: int, max_lines: int = _FOCUSED_CONTEXT_MAX_LINES,
+    ) -> tuple[int, int]:
+        """
+        Pick a bounded [start, end) line window around the error.
+
+        The window is centred on the error line and, when it fits within
+        ``max_lines``, extended upward to include the enclosing top-level
+        ``def``/``class`` header so the LLM sees the surrounding scope.
+        """
+        idx = max(0, min(line_number - 1, len(lines) - 1))
+        start = max(0, idx - max_lines // 2)
+
+        for i in range(idx, -1, -1):
+            if _SCOPE_HEADER_RE.match(lines[i]):
+                if i < start and idx - i < max_lines:
+                    start = i
+                break
+
+        end = min(len(lines), start + max_lines)
+        start = max(0, min(start, end - max_lines))
+        return start, end
+
+    @staticmethod
+    def _splice_region(original: str, patched_region: str, start: int, end: int) -> str:
+        """Replace lines [start, end) of ``original`` with the patched region."""
+        kept = original.splitlines(keepends=True)
+        if end < len(kept) and patched_region and not patched_region.endswith("\n"):
+            patched_region += "\n"
+        return "".join(kept[:start]) + patched_region + "".join(kept[end:])
 
     @staticmethod
     def _compute_diff(original: str, patched: str, file_path: str) -> str:
@@ -429,17 +663,65 @@ class FixAgent:
         str
             Unified diff string.
         """
-        original_lines = original.splitlines(keepends=True)
-        patched_lines = patched.splitlines(keepends=True)
+        if original == patched:
+            return ""
+        return "\n".join(FixAgent._iter_diff(original, patched, file_path))
+
+    @staticmethod
+    def _iter_diff(original: str, patched: str, file_path: str):
+        """
+        Lazily yield unified diff lines.
 
-        diff = difflib.unified_diff(
-            original_lines,
-            patched_lines,
+        Uses patiencediff's compiled matcher when installed (much faster than
+        difflib.SequenceMatcher on large files), else stdlib difflib.
+        """
+        if PATIENCEDIFF_AVAILABLE:
+            return patiencediff.unified_diff(
+                original.splitlines(keepends=True),
+                patched.splitlines(keepends=True),
+                fromfile=f"a/{file_path}",
+                tofile=f"b/{file_path}",
+                lineterm="",
+                sequencematcher=patiencediff.PatienceSequenceMatcher,
+            )
+        return difflib.unified_diff(
+            original.splitlines(keepends=True),
+            patched.splitlines(keepends=True),
             fromfile=f"a/{file_path}",
             tofile=f"b/{file_path}",
             lineterm="",
         )
-        return "\n".join(diff)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=32)
+    def _compute_diff_within_limit(
+        original: str, patched: str, file_path: str, threshold: int,
+    ) -> tuple[bool, str]:
+        """
+        Compute the diff and check its size in a single pass.
+
+        Consumes the diff generator once, counting changed lines, and stops
+        generating as soon as ``threshold`` is exceeded. Memoised so an
+        identical LLM regeneration does not re-run the diff.
+
+        Returns
+        -------
+        tuple[bool, str]
+            (within_threshold, diff). For oversize patches the diff is
+            truncated at the point the threshold was crossed.
+        """
+        if original == patched:
+            return True, ""
+
+        diff_lines: list[str] = []
+        changed_lines = 0
+        for line in FixAgent._iter_diff(original, patched, file_path):
+            diff_lines.append(line)
+            if _CHANGED_LINE_RE.match(line):
+                changed_lines += 1
+                if changed_lines > threshold:
+                    return False, "\n".join(diff_lines)
+        return True, "\n".join(diff_lines)
 
     @staticmethod
     def _check_diff_size(diff: str, threshold: int) -> bool:
@@ -461,14 +743,13 @@ class FixAgent:
         if not diff:
             return True
 
+        # Stop scanning as soon as the threshold is exceeded
         changed_lines = 0
-        for line in diff.splitlines():
-            if line.startswith("---") or line.startswith("+++"):
-                continue
-            if line.startswith("+") or line.startswith("-"):
-                changed_lines += 1
-
-        return changed_lines <= threshold
+        for _ in _CHANGED_LINE_RE.finditer(diff):
+            changed_lines += 1
+            if changed_lines > threshold:
+                return False
+        return True
 
     @staticmethod
     def _has_conflict_markers(content: str) -> bool:
@@ -485,6 +766,9 @@ class FixAgent:
         bool
             True if conflict markers found.
         """
+        # Cheap substring scan first; the anchored regex only runs on a hit
+        if not any(marker in content for marker in _CONFLICT_MARKERS):
+            return False
         return bool(_CONFLICT_MARKER_RE.search(content))
 
     @staticmethod
@@ -507,13 +791,21 @@ class FixAgent:
         if not working_directory:
             return True
 
-        # Normalise paths
-        normalized_file = file_path.replace("\\", "/").strip("/")
-        normalized_scope = working_directory.replace("\\", "/").strip("/")
+        normalized_scope = _normalize_scope(working_directory)
+        if not normalized_scope:
+            return True
 
-        return normalized_file.startswith(normalized_scope)
+        # Match whole path components so "backend2/x.py" is not in scope "backend"
+        normalized_file = file_path.replace("\\", "/").lstrip("/")
+        return (
+            normalized_file == normalized_scope
+            or normalized_file.startswith(normalized_scope + "/")
+        )
 
     async def close(self) -> None:
-        """Clean up the LLM client."""
+        """Clean up the LLM client and fingerprint store."""
         if self.client:
             await self.client.close()
+        if self._fingerprint_store is not None:
+            self._fingerprint_store.close()
+            self._fingerprint_store = None
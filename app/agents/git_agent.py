@@ -5,11 +5,13 @@ Handles repository operations: writing fixes, committing, and pushing.
 Enforces strict naming conventions and safety limits.
 """
 import os
+import random
 import re
+import shlex
 import subprocess
 import logging
 import time
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple, Union
 from app.models.fix_result import FixResult
 from app.core.config import MAX_COMMITS_PER_RUN, TEAM_NAME, LEADER_NAME, PATCH_TRUNCATION_RATIO
 
@@ -24,6 +26,77 @@ BUG_PRIORITY_TIERS = {
     "LINTING": 5,
 }
 
+# Branch naming patterns (compiled once)
+_RE_WS = re.compile(r"\s+")
+_RE_NON_ALNUM = re.compile(r"[^A-Z0-9_]")
+_RE_DUP_US = re.compile(r"_+")
+_RE_BRANCH = re.compile(r"[A-Z0-9_]+_AI_Fix")
+
+# Push failures that retrying cannot fix (auth / permission errors)
+_NON_RETRYABLE_PUSH_RE = re.compile(
+    r"Permission denied|Authentication failed|\b403\b|could not read Username", re.IGNORECASE
+)
+_MAX_PUSH_BACKOFF = 30.0
+
+# Exit status used by the batched add/commit script when the patch stages no diff
+_NO_DIFF_EXIT = 42
+
+
+def _stderr_text(err: subprocess.CalledProcessError) -> str:
+    """Decode a failed call's stderr; hot-path calls capture it as raw bytes."""
+    stderr = err.stderr
+    if isinstance(stderr, bytes):
+        return stderr.decode("utf-8", "replace")
+    return stderr or ""
+
+
+class _GitSession:
+    """
+    Long-running ``git cat-file --batch-check`` process for one workspace.
+
+    Object/ref lookups become a newline write to a pipe instead of a new
+    ``git rev-parse`` process. Refs are re-resolved on every query, so
+    commits made by other git processes are seen immediately.
+    """
+
+    def __init__(self, workspace_path: str) -> None:
+        self.workspace_path = workspace_path
+        self._proc: Optional[subprocess.Popen] = None
+
+    def _ensure(self) -> subprocess.Popen:
+        if self._proc is None or self._proc.poll() is not None:
+            self._proc = subprocess.Popen(
+                ["git", "cat-file", "--batch-check"],
+                cwd=self.workspace_path,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                bufsize=1,
+            )
+        return self._proc
+
+    def resolve(self, name: str) -> str:
+        """Return the object SHA for a ref/revision, or "" if it does not exist."""
+        proc = self._ensure()
+        proc.stdin.write(f"{name}\n")
+        proc.stdin.flush()
+        # "<sha> <type> <size>" or "<name> missing"
+        parts = proc.stdout.readline().split()
+        if len(parts) == 3:
+            return parts[0]
+        return ""
+
+    def close(self) -> None:
+        if self._proc is None:
+            return
+        try:
+            self._proc.stdin.close()
+            self._proc.wait(timeout=5)
+        except Exception:
+            self._proc.kill()
+        self._proc = None
+
 
 class GitAgent:
     """
@@ -31,14 +104,32 @@ class GitAgent:
     and pushing them to the remote repository.
     """
 
-    def __init__(self, commit_prefix: str = "[AI-AGENT] Fix:") -> None:
+    def __init__(
+        self,
+        commit_prefix: str = "[AI-AGENT] Fix:",
+        conflict_strategy: str = "rebase",
+        max_push_attempts: int = 5,
+        push_backoff_base: float = 0.5,
+        durable_writes: bool = False,
+    ) -> None:
         self.commit_prefix = commit_prefix
+        # fsync patched files before committing
+        self.durable_writes = durable_writes
+        self.max_push_attempts = max_push_attempts
+        self.push_backoff_base = push_backoff_base
+        # Push-conflict recovery: "rebase" (pull --rebase) or "reset"
+        # (reset to the remote branch, then replay local commits)
+        self.conflict_strategy = conflict_strategy
         self.commit_count = 0
         self.branch_name = ""
         self.push_status = "pending"
         self.efficiency_penalty_risk = False
+        # Set once the commit budget is exhausted; later fixes return immediately
+        self._over_budget = False
         self.commit_priority_delta = 0
         self._previous_bug_tiers: List[int] = []
+        self._sessions: Dict[str, _GitSession] = {}
+        self._abs_workspace_cache: Dict[str, str] = {}
 
     def generate_branch_name(self, team_name: str = TEAM_NAME, leader_name: str = LEADER_NAME) -> str:
         """
@@ -47,9 +138,9 @@ class GitAgent:
         # Clean team and leader names: uppercase, spaces to underscores, remove special chars
         def clean(s: str) -> str:
             s = s.upper()
-            s = re.sub(r"\s+", "_", s) # spaces to underscores
-            s = re.sub(r"[^A-Z0-9_]", "", s) # remove special chars (keep underscores)
-            s = re.sub(r"_+", "_", s) # deduplicate underscores
+            s = _RE_WS.sub("_", s) # spaces to underscores
+            s = _RE_NON_ALNUM.sub("", s) # remove special chars (keep underscores)
+            s = _RE_DUP_US.sub("_", s) # deduplicate underscores
             return s.strip("_")
 
         t = clean(team_name)
@@ -68,21 +159,21 @@ class GitAgent:
                 ["git", "checkout", "-b", branch_name],
                 cwd=workspace_path,
                 check=True,
-                capture_output=True,
-                text=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
             )
             logger.info("Successfully checked out branch: %s", branch_name)
             return True
         except subprocess.CalledProcessError as e:
-            logger.warning("Branch checkout failed (may already exist): %s", e.stderr)
+            logger.warning("Branch checkout failed (may already exist): %s", _stderr_text(e))
             # Try switching to it if it exists
             try:
                 subprocess.run(
                     ["git", "checkout", branch_name],
                     cwd=workspace_path,
                     check=True,
-                    capture_output=True,
-                    text=True,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
                 )
                 return True
             except subprocess.CalledProcessError:
@@ -95,73 +186,69 @@ class GitAgent:
         """
         Validate branch name follows exact format: [A-Z0-9_]+_AI_Fix
         """
-        pattern = r"^[A-Z0-9_]+_AI_Fix$"
-        return bool(re.match(pattern, name))
+        return _RE_BRANCH.fullmatch(name) is not None
 
-    def apply_fix(self, fix_result: FixResult, workspace_path: str) -> bool:
+    def apply_fix(self, fix_result: FixResult, workspace_path: str, commit: bool = True) -> bool:
         """
         Write the patched content to disk and commit it.
+
+        With ``commit=False`` only the file is written; the caller commits it
+        later, e.g. grouped with other fixes via commit_batch().
         """
         if not fix_result.success or not fix_result.patched_content:
             logger.warning("Refusing to apply unsuccessful or empty fix")
             return False
 
-        if self.commit_count >= MAX_COMMITS_PER_RUN:
-            logger.error("Max commit limit reached (%d), blocking further fixes", MAX_COMMITS_PER_RUN)
-            self.efficiency_penalty_risk = True
+        if self._over_budget or self.commit_count >= MAX_COMMITS_PER_RUN:
+            self._block_over_budget()
             return False
 
-        repo_relative_path = fix_result.bug_report.file_path
-        abs_path = os.path.normpath(os.path.join(workspace_path, repo_relative_path))
-
-        if not abs_path.startswith(os.path.abspath(workspace_path)):
-            logger.error("Security violation: attempt to write outside workspace: %s", abs_path)
+        prepared = self._prepare_write(fix_result, workspace_path)
+        if prepared is None:
             return False
+        repo_relative_path, abs_path, data = prepared
 
         try:
-            # 1. Write the file
-            with open(abs_path, "w", encoding="utf-8") as f:
-                f.write(fix_result.patched_content)
-            
+            # 1. Write the file (already-encoded bytes, no text-layer buffering)
+            self._write_bytes(abs_path, data)
+            if not commit:
+                logger.info("Wrote fix for %s (commit deferred)", repo_relative_path)
+                return True
+
             # 2. Stage and commit
-            bug = fix_result.bug_report
-            # Ensure prefix is present
-            msg_content = f"{bug.bug_type}/{bug.sub_type} in {bug.file_path}"
-            commit_msg = f"{self.commit_prefix} {msg_content}"
+            commit_msg = self._commit_message(fix_result)
 
-            # git add <file>
-            subprocess.run(
-                ["git", "add", repo_relative_path],
-                cwd=workspace_path,
-                check=True,
-                capture_output=True,
-                text=True
+            # git add + staged-diff check + git commit in a single process spawn;
+            # exits _NO_DIFF_EXIT when staging produced no differences.
+            # The message goes through stdin (-F -), so it is never quoted or
+            # bounded by argv length.
+            path_arg = shlex.quote(repo_relative_path)
+            script = (
+                f"git add -- {path_arg} || exit $?; "
+                f"if git diff --cached --quiet -- {path_arg}; then exit {_NO_DIFF_EXIT}; fi; "
+                f"git commit -F - -- {path_arg}"
             )
-
-            # Verify there are actual staged changes before committing
-            diff_check = subprocess.run(
-                ["git", "diff", "--cached", "--quiet"],
-                cwd=workspace_path,
-                capture_output=True,
-                text=True,
-            )
-            if diff_check.returncode == 0:
-                # returncode 0 = NO differences → nothing to commit
+            try:
+                subprocess.run(
+                    ["/bin/sh", "-c", script],
+                    cwd=workspace_path,
+                    input=commit_msg.encode("utf-8"),
+                    check=True,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                )
+            except subprocess.CalledProcessError as e:
+                if e.returncode != _NO_DIFF_EXIT:
+                    logger.error(
+                        "Failed to commit fix for %s: %s", repo_relative_path, _stderr_text(e)
+                    )
+                    return False
                 logger.warning(
                     "Patch for %s produced no diff (identical content), skipping commit",
                     repo_relative_path,
                 )
                 return False
 
-            # git commit -m <msg>
-            subprocess.run(
-                ["git", "commit", "-m", commit_msg],
-                cwd=workspace_path,
-                check=True,
-                capture_output=True,
-                text=True
-            )
-
             self.commit_count += 1
             logger.info("Successfully committed fix: %s", commit_msg)
             return True
@@ -170,11 +257,125 @@ class GitAgent:
             logger.error("Failed to apply/commit fix for %s: %s", repo_relative_path, e)
             return False
 
+    def commit_batch(self, workspace_path: str, domain: str, fixes: List[FixResult]) -> bool:
+        """
+        Commit already-written fixes as a single commit for one domain.
+
+        The subject keeps the commit prefix; the body lists each fix. Returns
+        False if the budget is exhausted, nothing was staged, or git failed.
+        """
+        if not fixes:
+            return False
+        if self._over_budget or self.commit_count >= MAX_COMMITS_PER_RUN:
+            self._block_over_budget()
+            return False
+
+        paths = list(dict.fromkeys(f.bug_report.file_path for f in fixes))
+        path_args = " ".join(shlex.quote(p) for p in paths)
+        lines = [f"{self.commit_prefix} {domain}: {len(fixes)} fix(es)", ""]
+        lines.extend(
+            f"- {f.bug_report.bug_type}/{f.bug_report.sub_type} in {f.bug_report.file_path}"
+            for f in fixes
+        )
+        commit_msg = "\n".join(lines)
+
+        # Same single-spawn add/check/commit script as apply_fix
+        script = (
+            f"git add -- {path_args} || exit $?; "
+            f"if git diff --cached --quiet -- {path_args}; then exit {_NO_DIFF_EXIT}; fi; "
+            f"git commit -F - -- {path_args}"
+        )
+        try:
+            subprocess.run(
+                ["/bin/sh", "-c", script],
+                cwd=workspace_path,
+                input=commit_msg.encode("utf-8"),
+                check=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+            )
+        except subprocess.CalledProcessError as e:
+            if e.returncode == _NO_DIFF_EXIT:
+                logger.warning("No staged changes for %s batch, skipping commit", domain)
+            else:
+                logger.error("Failed to commit %s batch: %s", domain, _stderr_text(e))
+            return False
+        except OSError as e:
+            logger.error("Failed to commit %s batch: %s", domain, e)
+            return False
+
+        self.commit_count += 1
+        logger.info("Committed %d fix(es) for %s in one commit", len(fixes), domain)
+        return True
+
+    def _block_over_budget(self) -> None:
+        """Flag the exhausted commit budget, logging only the first time."""
+        if not self._over_budget:
+            logger.error("Max commit limit reached (%d), blocking further fixes", MAX_COMMITS_PER_RUN)
+            self._over_budget = True
+        self.efficiency_penalty_risk = True
+
+    def _prepare_write(self, fix_result: FixResult, workspace_path: str) -> Optional[Tuple[str, str, bytes]]:
+        """
+        Resolve and validate the target path and encode the patch.
+
+        Returns (repo_relative_path, abs_path, data), or None when the path
+        escapes the workspace or the content already matches the file on disk.
+        """
+        repo_relative_path = fix_result.bug_report.file_path
+        abs_path = os.path.normpath(os.path.join(workspace_path, repo_relative_path))
+
+        ws_abs = self._abs_workspace_cache.get(workspace_path)
+        if ws_abs is None:
+            ws_abs = self._abs_workspace_cache[workspace_path] = os.path.abspath(workspace_path)
+        # Compare on a separator boundary so "/ws-evil/x" is not inside "/ws"
+        if abs_path != ws_abs and not abs_path.startswith(ws_abs + os.sep):
+            logger.error("Security violation: attempt to write outside workspace: %s", abs_path)
+            return None
+
+        # Identical content → nothing to write or commit; skip the git plumbing
+        data = fix_result.patched_content.encode("utf-8")
+        try:
+            with open(abs_path, "rb") as f:
+                current = f.read()
+        except OSError:
+            current = None
+        if current == data:
+            logger.warning(
+                "Patch for %s matches file on disk, skipping write and commit",
+                repo_relative_path,
+            )
+            return None
+        return repo_relative_path, abs_path, data
+
+    def _commit_message(self, fix_result: FixResult) -> str:
+        """Build the prefixed commit message for a fix."""
+        bug = fix_result.bug_report
+        return f"{self.commit_prefix} {bug.bug_type}/{bug.sub_type} in {bug.file_path}"
+
+    def _write_bytes(self, abs_path: str, data: bytes) -> None:
+        """Write ``data`` to ``abs_path`` with raw os.write calls."""
+        fd = os.open(abs_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+            if self.durable_writes:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+
     def push(self, workspace_path: str, branch: str = "") -> str:
         """
         Push local commits to the remote repository with safety checks and retry.
         Returns push_status.
         """
+        self.push_status = self._push(workspace_path, branch)
+        return self.push_status
+
+    def _push(self, workspace_path: str, branch: str = "") -> str:
+        """Push body for push(); returns the status."""
         # If no branch provided, use generated branch or default to a safe naming scheme
         if not branch:
             branch = self.branch_name or self.generate_branch_name()
@@ -182,17 +383,15 @@ class GitAgent:
         # VALIDATION GATE
         if branch.lower() == "main" or branch.lower() == "master":
             logger.error("SAFETY VIOLATION: Refusing to push to %s", branch)
-            self.push_status = "rejected_main"
-            return self.push_status
+            return "rejected_main"
 
         if not self.validate_branch_name(branch):
             logger.error("VALIDATION FAILED: Invalid branch naming convention: %s", branch)
-            self.push_status = "invalid_branch_name"
-            return self.push_status
+            return "invalid_branch_name"
 
         # PUSH WITH CONFLICT-SAFE RETRY
         attempts = 0
-        max_attempts = 2
+        max_attempts = self.max_push_attempts
         
         while attempts < max_attempts:
             attempts += 1
@@ -201,40 +400,65 @@ class GitAgent:
                     ["git", "push", "origin", branch],
                     cwd=workspace_path,
                     check=True,
-                    capture_output=True,
-                    text=True
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
                 )
                 logger.info("Successfully pushed changes to branch: %s", branch)
-                self.push_status = "success"
-                return self.push_status
+                return "success"
             except subprocess.CalledProcessError as e:
-                logger.error("Push attempt %d failed: %s", attempts, e.stderr)
+                stderr = _stderr_text(e)
+                logger.error("Push attempt %d failed: %s", attempts, stderr)
+                if _NON_RETRYABLE_PUSH_RE.search(stderr):
+                    logger.error("Push rejected by remote (auth/permission), not retrying")
+                    return "auth_failed"
                 if attempts < max_attempts:
-                    # Fetch + rebase before retrying
-                    logger.info("Attempting fetch + rebase before retry...")
+                    # Sync with the remote branch (one spawn) before retrying
+                    logger.info("Attempting %s sync before retry...", self.conflict_strategy)
                     try:
                         subprocess.run(
-                            ["git", "fetch", "origin", branch],
+                            self._sync_command(branch),
                             cwd=workspace_path, check=True,
-                            capture_output=True, text=True
-                        )
-                        subprocess.run(
-                            ["git", "rebase", f"origin/{branch}"],
-                            cwd=workspace_path, check=True,
-                            capture_output=True, text=True
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
                         )
                     except subprocess.CalledProcessError as rebase_err:
-                        logger.error("Fetch/rebase failed: %s", rebase_err.stderr)
-                        self.push_status = "conflict_unresolved"
-                        return self.push_status
-                    time.sleep(2)
+                        logger.error("Fetch/rebase failed: %s", _stderr_text(rebase_err))
+                        return "conflict_unresolved"
+                    time.sleep(self._push_backoff(attempts))
                 else:
-                    self.push_status = "conflict_unresolved"
-        
-        return self.push_status
+                    return "conflict_unresolved"
+
+        return "conflict_unresolved"
+
+    def _push_backoff(self, attempt: int) -> float:
+        """Exponential backoff with jitter before push retry ``attempt`` + 1."""
+        delay = min(_MAX_PUSH_BACKOFF, self.push_backoff_base * (2 ** (attempt - 1)))
+        return delay + random.uniform(0, 0.25)
+
+    def _sync_command(self, branch: str) -> List[str]:
+        """Build the single command that reconciles the local branch with origin."""
+        if self.conflict_strategy == "reset":
+            remote = shlex.quote(f"origin/{branch}")
+            script = (
+                f"git fetch origin {shlex.quote(branch)} || exit $?; "
+                f"shas=$(git rev-list --reverse {remote}..HEAD) || exit $?; "
+                f"git reset --hard {remote} || exit $?; "
+                '[ -z "$shas" ] || git cherry-pick $shas || { git cherry-pick --abort; exit 1; }'
+            )
+            return ["/bin/sh", "-c", script]
+        return ["git", "pull", "--rebase", "--autostash", "origin", branch]
 
     def get_last_commit_sha(self, workspace_path: str) -> str:
         """Get the SHA of the HEAD commit."""
+        session = self._sessions.get(workspace_path)
+        if session is None:
+            session = self._sessions[workspace_path] = _GitSession(workspace_path)
+        try:
+            sha = session.resolve("HEAD")
+            if sha:
+                return sha
+        except Exception as e:
+            logger.debug("cat-file session failed, falling back to rev-parse: %s", e)
+            session.close()
         try:
             res = subprocess.run(
                 ["git", "rev-parse", "HEAD"],
@@ -247,6 +471,12 @@ class GitAgent:
         except Exception:
             return ""
 
+    def close(self) -> None:
+        """Shut down any persistent git helper processes."""
+        for session in self._sessions.values():
+            session.close()
+        self._sessions.clear()
+
     @property
     def state(self) -> Dict[str, Any]:
         """Expose internal state for the orchestrator/dashboard."""
@@ -266,14 +496,18 @@ class GitAgent:
     # -------------------------------------------------------------------
     @staticmethod
     def validate_patch_size(
-        original: str,
-        patched: str,
+        original: Union[str, bytes],
+        patched: Union[str, bytes],
         ratio: float = PATCH_TRUNCATION_RATIO,
     ) -> bool:
         """
         Reject patches significantly smaller than the original.
         Returns True if patch is acceptable, False if truncated.
         O(1) comparison.
+
+        Accepts str (character ratio) or already-encoded bytes (byte ratio),
+        so callers holding the encoded write payload need not encode again.
+        Both arguments must be the same type.
         """
         if not original:
             return True  # Nothing to compare against
@@ -292,8 +526,9 @@ class GitAgent:
         Positive delta = improvement (higher-priority bugs resolved).
         """
         def best_tier(types: List[str]) -> int:
-            tiers = [BUG_PRIORITY_TIERS.get(t, 99) for t in types]
-            return min(tiers) if tiers else 99
+            tier_of = BUG_PRIORITY_TIERS.get
+            # Type lists repeat a handful of names; look each up once
+            return min((tier_of(t, 99) for t in set(types)), default=99)
 
         prev_best = best_tier(previous_bug_types)
         curr_best = best_tier(current_bug_types)
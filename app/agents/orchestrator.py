@@ -26,12 +26,16 @@ Stability Guardrails (Step 6.1):
     - Telemetry hooks (counters in state)
 """
 import os
+import re
 import time
+import hashlib
 import logging
 import asyncio
 import subprocess
+import threading
 from collections import deque
-from typing import List, Optional, Set, Dict
+from functools import lru_cache
+from typing import List, Optional, Set, Dict, Tuple, FrozenSet
 from datetime import datetime, timezone
 
 from app.state.agent_state import AgentState
@@ -48,14 +52,18 @@ from app.executor.command_resolver import resolve_from_ci_config
 from app.parser.failure_parser import parse_failure_log
 from app.parser.classification import priority_of
 from app.agents.fix_agent import FixAgent
+from app.llm.router import decide_context_level
 from app.agents.git_agent import GitAgent
 from app.agents.ci_monitor import CIMonitor
 from app.parser.ci_config_reader import read_ci_configs, get_all_commands
-from app.utils.fix_fingerprint import generate_bug_signature, generate_fix_fingerprint
+from app.utils.fix_fingerprint import generate_fix_fingerprint
 from app.utils.escalation_reasons import REPEATED_FIX
 from app.services.static_analysis import analyze_repository as run_static_analysis
 from app.services.python_builtin_scanner import scan_python_files as run_builtin_scan
-from app.core.config import RUN_RETRY_LIMIT, GITHUB_TOKEN, PER_BUG_RETRY_LIMIT
+from app.core.config import (
+    RUN_RETRY_LIMIT, GITHUB_TOKEN, PER_BUG_RETRY_LIMIT, CI_USE_GRAPHQL, DEFAULT_EXECUTION_TIMEOUT,
+    GITHUB_WEBHOOK_SECRET, COMMIT_BATCH_SIZE,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -66,6 +74,10 @@ _GUARDRAIL_REDUCED = 180   # 3 minutes → reduce batch
 _GUARDRAIL_CRITICAL = 240  # 4 minutes → root failures only
 _GUARDRAIL_ABORT = 290     # ~5 minutes → stop loop
 
+# Per-call timeout floors (seconds): a call is always given at least this long
+_MIN_FIX_TIMEOUT = 15      # One fix_agent.fix() call
+_MIN_EXEC_TIMEOUT = 30     # One container execution
+
 # ---------------------------------------------------------------------------
 # Fix history caps
 # ---------------------------------------------------------------------------
@@ -75,25 +87,37 @@ _FP_CAP_GLOBAL = 200       # Max unique bug signatures tracked globally
 # ---------------------------------------------------------------------------
 # Root bug types (commit-gate threshold)
 # ---------------------------------------------------------------------------
-_ROOT_BUG_TYPES = {"SYNTAX", "IMPORT"}
+_ROOT_BUG_TYPES = frozenset({"SYNTAX", "IMPORT"})
 
 
 # ---------------------------------------------------------------------------
 # Domain classification for commit batching
 # ---------------------------------------------------------------------------
+_DB_PATH_RE = re.compile(r"migration|schema|db/|database")
+_FRONTEND_PATH_RE = re.compile(
+    r"frontend/|client/|src/components|src/pages|\.jsx|\.tsx|\.vue|\.css|\.scss"
+)
+
+
+@lru_cache(maxsize=4096)
 def _classify_domain(file_path: str) -> str:
     """Classify a file path into a commit-batch domain."""
-    normalized = file_path.replace("\\", "/").lower()
-    if any(seg in normalized for seg in ("migration", "schema", "db/", "database")):
+    normalized = file_path.lower()
+    if "\\" in normalized:
+        normalized = normalized.replace("\\", "/")
+    if _DB_PATH_RE.search(normalized):
         return "database"
-    if any(seg in normalized for seg in (
-        "frontend/", "client/", "src/components", "src/pages",
-        ".jsx", ".tsx", ".vue", ".css", ".scss",
-    )):
+    if _FRONTEND_PATH_RE.search(normalized):
         return "frontend"
     return "backend"
 
 
+@lru_cache(maxsize=512)
+def _abs_path(workspace_path: str, file_path: str) -> str:
+    """Normalised absolute path of a bug's file inside the workspace."""
+    return os.path.normpath(os.path.join(workspace_path, file_path))
+
+
 def _get_performance_hint(elapsed: float) -> str:
     """Return performance hint based on elapsed time."""
     if elapsed >= _GUARDRAIL_CRITICAL:
@@ -103,25 +127,53 @@ def _get_performance_hint(elapsed: float) -> str:
     return "normal"
 
 
-def _sort_bugs_by_priority(bugs: List[BugReport]) -> List[BugReport]:
-    """Sort BugReports by type priority (SYNTAX first, LINTING last)."""
-    return sorted(bugs, key=lambda b: priority_of(b.bug_type))
-
-
-def _compute_failure_signature(bugs: List[BugReport]) -> str:
-    """Compute a combined signature of all current failures for gating."""
-    parts = sorted(f"{b.file_path}:{b.line_number}:{b.sub_type}" for b in bugs)
-    return "|".join(parts)
+def _exec_timeout(remaining: float) -> int:
+    """Container timeout for the run budget left, clamped to the floor and the default."""
+    return int(max(_MIN_EXEC_TIMEOUT, min(DEFAULT_EXECUTION_TIMEOUT, remaining)))
 
 
-def _compute_failure_signatures_list(bugs: List[BugReport]) -> List[str]:
-    """Return sorted list of individual bug signatures."""
-    return sorted(generate_bug_signature(b) for b in bugs)
+def _sort_bugs_by_priority(bugs: List[BugReport]) -> List[BugReport]:
+    """Sort BugReports by type priority (SYNTAX first, LINTING last)."""
+    # Only a handful of tiers exist: bucket in one pass (stable within a tier),
+    # then order the few bucket keys
+    buckets: Dict[int, List[BugReport]] = {}
+    for b in bugs:
+        buckets.setdefault(priority_of(b.bug_type), []).append(b)
+    return [b for tier in sorted(buckets) for b in buckets[tier]]
+
+
+def _dedupe_by_signature(bugs: List[BugReport]) -> List[BugReport]:
+    """Drop repeat reports of the same bug signature, keeping the first."""
+    seen: Set[str] = set()
+    unique: List[BugReport] = []
+    for b in bugs:
+        sig = b.signature
+        if sig not in seen:
+            seen.add(sig)
+            unique.append(b)
+    return unique
+
+
+def _compute_failure_signatures(bugs: List[BugReport]) -> FrozenSet[str]:
+    """Return the set of individual bug signatures."""
+    return frozenset(b.signature for b in bugs)
+
+
+def _best_priority_count(bugs: List[BugReport]) -> Tuple[int, int]:
+    """Return (best priority, number of bugs at it) in one pass; (999, 0) if empty."""
+    best, count = 999, 0
+    for b in bugs:
+        p = priority_of(b.bug_type)
+        if p < best:
+            best, count = p, 1
+        elif p == best:
+            count += 1
+    return best, count
 
 
 def _classify_iteration_outcome(
-    prev_sigs: List[str],
-    curr_sigs: List[str],
+    prev_sigs: FrozenSet[str],
+    curr_sigs: FrozenSet[str],
     prev_bugs: List[BugReport],
     curr_bugs: List[BugReport],
 ) -> str:
@@ -136,8 +188,8 @@ def _classify_iteration_outcome(
         return "unchanged"
 
     # Compare best (lowest numeric) priority before vs after
-    prev_best = min((priority_of(b.bug_type) for b in prev_bugs), default=999)
-    curr_best = min((priority_of(b.bug_type) for b in curr_bugs), default=999)
+    prev_best, prev_root_count = _best_priority_count(prev_bugs)
+    curr_best, curr_root_count = _best_priority_count(curr_bugs)
 
     if curr_best > prev_best:
         # Root layer improved (e.g. syntax fixed, only lint left)
@@ -147,9 +199,6 @@ def _classify_iteration_outcome(
         return "regressed"
 
     # Same priority tier — compare counts at that tier
-    prev_root_count = sum(1 for b in prev_bugs if priority_of(b.bug_type) == prev_best)
-    curr_root_count = sum(1 for b in curr_bugs if priority_of(b.bug_type) == curr_best)
-
     if curr_root_count < prev_root_count:
         return "improved"
     if curr_root_count > prev_root_count:
@@ -163,11 +212,11 @@ def _classify_iteration_outcome(
 
 def _score_effectiveness(
     fix: FixResult,
-    pre_sigs: Set[str],
-    post_sigs: Set[str],
+    pre_sigs: FrozenSet[str],
+    post_sigs: FrozenSet[str],
 ) -> float:
     """Score patch effectiveness using bug_signature (not message text)."""
-    sig = fix.bug_signature or generate_bug_signature(fix.bug_report)
+    sig = fix.bug_signature or fix.bug_report.signature
     if sig not in post_sigs and sig in pre_sigs:
         return 1.0   # Bug removed
     if sig in post_sigs and sig in pre_sigs:
@@ -176,11 +225,26 @@ def _score_effectiveness(
     return 0.5
 
 
+def _repeat_key(text: str, attempt_number: int) -> str:
+    """
+    Key for repeat-input checks: BLAKE2b digest of the file content plus the
+    context level FixAgent would use for this attempt, so a repeat at one
+    level does not block the escalated retry.
+    """
+    level = decide_context_level(attempt_number, len(text.splitlines()))
+    return f"{hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()}:{level}"
+
+
 def _has_root_failures(bugs: List[BugReport]) -> bool:
     """Check whether any SYNTAX or IMPORT failures remain."""
     return any(b.bug_type in _ROOT_BUG_TYPES for b in bugs)
 
 
+async def _no_bugs() -> List[BugReport]:
+    """Stand-in for a detector that does not apply to this project type."""
+    return []
+
+
 def _fix_targets_root(fix: FixResult) -> bool:
     """Check whether a fix targets a SYNTAX or IMPORT bug."""
     return fix.bug_report.bug_type in _ROOT_BUG_TYPES
@@ -190,7 +254,10 @@ class _FixHistoryStore:
     """
     Bounded fix-fingerprint storage.
     - Per bug_signature: deque(maxlen=5)
-    - Global: max 200 unique signatures, FIFO eviction
+    - Global: max 200 unique signatures across two FIFO queues (S3-FIFO style):
+      first-seen signatures enter a small probation queue and are promoted to
+      the main queue when seen again, so one-shot bugs cannot flush out the
+      repeat offenders that fingerprint checks exist to catch
     """
 
     def __init__(
@@ -198,44 +265,77 @@ class _FixHistoryStore:
         per_bug_cap: int = _FP_CAP_PER_BUG,
         global_cap: int = _FP_CAP_GLOBAL,
     ) -> None:
-        self._store: Dict[str, deque] = {}
-        self._order: deque = deque()   # insertion-order for FIFO eviction
+        # Dicts keep insertion order, so the first key of each is its oldest
+        self._probation: Dict[str, deque] = {}
+        self._main: Dict[str, deque] = {}
         self._per_bug_cap = per_bug_cap
         self._global_cap = global_cap
+        # Probation target (~20%); it may use more while main has room
+        self._probation_cap = max(1, global_cap // 5)
+
+    def _get(self, bug_sig: str) -> Optional[deque]:
+        dq = self._main.get(bug_sig)
+        return dq if dq is not None else self._probation.get(bug_sig)
+
+    def _evict_one(self) -> None:
+        """Drop the oldest probation signature, or the oldest main one once probation is small."""
+        if self._probation and (len(self._probation) >= self._probation_cap or not self._main):
+            del self._probation[next(iter(self._probation))]
+        else:
+            del self._main[next(iter(self._main))]
 
     def get_fingerprints(self, bug_sig: str) -> Set[str]:
         """Return set of known fingerprints for a bug signature."""
-        dq = self._store.get(bug_sig)
+        dq = self._get(bug_sig)
         return set(dq) if dq else set()
 
+    def contains(self, bug_sig: str, patch_fp: str) -> bool:
+        """Check whether a fingerprint is already recorded for a bug signature."""
+        dq = self._get(bug_sig)
+        return dq is not None and patch_fp in dq
+
     def add(self, bug_sig: str, patch_fp: str, iteration: int) -> None:
-        if bug_sig not in self._store:
-            # Global cap eviction
-            if len(self._order) >= self._global_cap:
-                evicted = self._order.popleft()
-                self._store.pop(evicted, None)
-            self._store[bug_sig] = deque(maxlen=self._per_bug_cap)
-            self._order.append(bug_sig)
-        self._store[bug_sig].append(patch_fp)
+        dq = self._main.get(bug_sig)
+        if dq is None:
+            dq = self._probation.pop(bug_sig, None)
+            if dq is not None:
+                # Seen again: promote (total count is unchanged)
+                self._main[bug_sig] = dq
+            else:
+                if self.tracked_signatures >= self._global_cap:
+                    self._evict_one()
+                dq = self._probation[bug_sig] = deque(maxlen=self._per_bug_cap)
+        dq.append(patch_fp)
 
     def to_list(self) -> List[dict]:
         """Serialise to list-of-dicts for state persistence."""
         out: List[dict] = []
-        for sig, dq in self._store.items():
-            for fp in dq:
-                out.append({"bug_signature": sig, "patch_fingerprint": fp})
+        for queue in (self._main, self._probation):
+            for sig, dq in queue.items():
+                for fp in dq:
+                    out.append({"bug_signature": sig, "patch_fingerprint": fp})
         return out
 
     @classmethod
     def from_list(cls, entries: List[dict], **kwargs) -> "_FixHistoryStore":
         store = cls(**kwargs)
+        grouped: Dict[str, List[str]] = {}
         for entry in entries:
-            store.add(entry.get("bug_signature", ""), entry.get("patch_fingerprint", ""), 0)
+            grouped.setdefault(entry.get("bug_signature", ""), []).append(
+                entry.get("patch_fingerprint", "")
+            )
+        # A signature is promoted on its second add, so two or more recorded
+        # fingerprints means it was in the main queue
+        for sig, fps in grouped.items():
+            queue = store._main if len(fps) > 1 else store._probation
+            queue[sig] = deque(fps, maxlen=store._per_bug_cap)
+        while store.tracked_signatures > store._global_cap:
+            store._evict_one()
         return store
 
     @property
     def tracked_signatures(self) -> int:
-        return len(self._store)
+        return len(self._main) + len(self._probation)
 
 
 class Orchestrator:
@@ -263,9 +363,31 @@ class Orchestrator:
     def __init__(self, fix_agent: FixAgent, github_token: str = GITHUB_TOKEN) -> None:
         self.fix_agent = fix_agent
         self.git_agent = GitAgent()
-        self.ci_monitor = CIMonitor(github_token=github_token)
+        self.ci_monitor = CIMonitor(github_token=github_token, use_graphql=CI_USE_GRAPHQL)
         self.github_token = github_token
         self._partial_state: dict = {}
+        # Serialises GitAgent work across worker threads. A cancelled run()
+        # cannot stop a git call already running in a thread, so anything
+        # touching the workspace afterwards (push_partial) takes this lock.
+        self._git_lock = threading.Lock()
+
+    def _locked_git(self, fn, *args, **kwargs):
+        """Run a GitAgent call while holding the workspace git lock."""
+        with self._git_lock:
+            return fn(*args, **kwargs)
+
+    async def _git(self, fn, *args, **kwargs):
+        """Run a GitAgent call in a worker thread under the git lock."""
+        return await asyncio.to_thread(self._locked_git, fn, *args, **kwargs)
+
+    def push_partial(self, workspace_path: str, branch: str) -> str:
+        """
+        Push commits left by an interrupted run.
+
+        Blocks until any git call still running from the cancelled run has
+        finished, so the push never races a half-written commit.
+        """
+        return self._locked_git(self.git_agent.push, workspace_path, branch)
 
     async def run(
         self,
@@ -277,7 +399,9 @@ class Orchestrator:
     ) -> AgentState:
         """Execute the full healing loop."""
         # --- Initialisation ---
-        run_start = time.time()
+        run_start = time.time()  # wall-clock, reported as start_time
+        # Durations and guardrails use the monotonic clock (immune to clock changes)
+        run_clock = time.monotonic()
         state: AgentState = {
             "repo_url": repo_url,
             "team_name": team_name,
@@ -311,9 +435,16 @@ class Orchestrator:
 
         # Track per-bug attempt count for PER_BUG_RETRY_LIMIT
         bug_attempts: Dict[str, int] = {}
+
+        # Committed-but-unpushed fixes (pushes are batched, see COMMIT_BATCH_SIZE)
+        pending_push = 0
+
+        # Content digest + context level per bug signature whose fix came back
+        # as a repeat; the same bug over the same prompt input is not sent again
+        repeated_inputs: Dict[str, Set[str]] = {}
         
         # Track previous-iteration failure signatures for drift detection
-        prev_failure_sigs: List[str] = []
+        prev_failure_sigs: FrozenSet[str] = frozenset()
         prev_bugs: List[BugReport] = []
 
         try:
@@ -321,7 +452,9 @@ class Orchestrator:
             # 1. Clone repository
             # ===========================================================
             logger.info(f"[ORCHESTRATOR] Step 1: Cloning repository: {repo_url}")
-            workspace_path = clone_repository(repo_url, self.github_token)
+            # Git, Docker and other subprocess-bound helpers run in worker
+            # threads so they never block the event loop
+            workspace_path = await asyncio.to_thread(clone_repository, repo_url, self.github_token)
             state["workspace_path"] = workspace_path
             logger.info(f"[ORCHESTRATOR] Repository cloned to: {workspace_path}")
 
@@ -330,7 +463,7 @@ class Orchestrator:
             state["branch_name"] = heal_branch
             logger.info(f"[ORCHESTRATOR] Step 1.5: Generated branch: {heal_branch}")
             
-            if self.git_agent.checkout_branch(workspace_path, heal_branch):
+            if await self._git(self.git_agent.checkout_branch, workspace_path, heal_branch):
                 logger.info(f"[ORCHESTRATOR] Checked out branch: {heal_branch}")
             else:
                 logger.warning(f"[ORCHESTRATOR] Branch checkout failed for {heal_branch}")
@@ -370,12 +503,12 @@ class Orchestrator:
             # 3. Autonomous Healing Loop
             # ===========================================================
             for i in range(1, RUN_RETRY_LIMIT + 1):
-                iter_start = time.time()
+                iter_start = time.monotonic()
                 state["iteration"] = i
                 logger.info(f"--- [ORCHESTRATOR] Iteration {i} Started ---")
 
                 # --- (a) Performance guardrail check ---
-                elapsed = time.time() - run_start
+                elapsed = iter_start - run_clock
                 remaining = max(0, _GUARDRAIL_ABORT - elapsed)
                 state["performance_hint"] = _get_performance_hint(elapsed)
 
@@ -390,104 +523,43 @@ class Orchestrator:
                 try:
                     if ci_stages:
                         # Multi-stage execution from CI config
-                        exec_result: ExecutionResult = run_ci_stages(
+                        exec_result: ExecutionResult = await asyncio.to_thread(
+                            run_ci_stages,
                             workspace_path=workspace_path,
                             stages=ci_stages,
                             project_type=state["project_type"],
                             docker_image=docker_image,
+                            timeout_seconds=_exec_timeout(remaining),
                         )
                     else:
                         # Fallback: default command resolver
-                        exec_result = run_in_container(
+                        exec_result = await asyncio.to_thread(
+                            run_in_container,
                             workspace_path=workspace_path,
                             project_type=state["project_type"],
                             working_dir=working_directory,
                             docker_image=docker_image,
+                            timeout_seconds=_exec_timeout(remaining),
                         )
                 except Exception as exc:
                     logger.error(f"[ORCHESTRATOR] Iteration {i}: Executor CRASHED: {exc}")
                     state["snapshots"].append(IterationSnapshot(
                         iteration=i,
                         execution_summary=f"Executor error: {exc}",
-                        iteration_time_seconds=time.time() - iter_start,
+                        iteration_time_seconds=time.monotonic() - iter_start,
                     ))
                     continue
 
-                # --- (c) PRIMARY: Python built-in scanner (stdlib only) ---
-                # For Python repos, the built-in scanner is the PRIMARY
-                # detection method. It uses ast.parse, py_compile, tokenize,
-                # and importlib — giving precise line numbers with max confidence.
-                bugs: List[BugReport] = []
-                if state["project_type"] == "python":
-                    try:
-                        builtin_bugs = run_builtin_scan(workspace_path)
-                        if builtin_bugs:
-                            logger.info(
-                                f"[ORCHESTRATOR] Iteration {i}: "
-                                f"PRIMARY (built-in) scanner found {len(builtin_bugs)} bug(s)."
-                            )
-                            bugs.extend(builtin_bugs)
-                    except Exception as exc:
-                        logger.warning(
-                            f"[ORCHESTRATOR] Iteration {i}: Built-in scanner failed (non-fatal): {exc}"
-                        )
-
-                # --- (c.2) SECONDARY: CI log parser ---
-                # Parse CI build output for additional errors not caught by
-                # the built-in scanner (e.g. runtime errors, assertion failures,
-                # test-level failures).
-                try:
-                    ci_bugs: List[BugReport] = parse_failure_log(
-                        exec_result.full_log, workspace_path=workspace_path
-                    )
-                    if ci_bugs:
-                        logger.info(
-                            f"[ORCHESTRATOR] Iteration {i}: "
-                            f"SECONDARY (CI log parser) found {len(ci_bugs)} bug(s)."
-                        )
-                        # Merge: only add CI bugs not already found by built-in scanner
-                        existing_keys = {
-                            (b.file_path, b.line_number, b.sub_type) for b in bugs
-                        }
-                        for cb in ci_bugs:
-                            key = (cb.file_path, cb.line_number, cb.sub_type)
-                            if key not in existing_keys:
-                                bugs.append(cb)
-                                existing_keys.add(key)
-                except Exception as exc:
-                    logger.error(f"[ORCHESTRATOR] Iteration {i}: CI log parser failed: {exc}")
-
-                logger.info(
-                    f"[ORCHESTRATOR] Iteration {i}: Total bugs after merge: {len(bugs)}"
+                # --- (c) Detection ---
+                bugs, primary_count, log_root_failures = await self._detect_bugs(
+                    i, workspace_path, exec_result, state["project_type"]
                 )
-                state["total_bugs_found"] += len(bugs)
-
-                # --- (c.3) Bonus: external static analysis (pylint/pyflakes/mypy) ---
-                if state["project_type"] == "python":
-                    try:
-                        static_bugs = run_static_analysis(workspace_path)
-                        if static_bugs:
-                            logger.info(
-                                f"[ORCHESTRATOR] Iteration {i}: "
-                                f"Static analysis found {len(static_bugs)} additional bug(s)."
-                            )
-                            existing_keys = {
-                                (b.file_path, b.line_number, b.sub_type) for b in bugs
-                            }
-                            for sb in static_bugs:
-                                key = (sb.file_path, sb.line_number, sb.sub_type)
-                                if key not in existing_keys:
-                                    bugs.append(sb)
-                                    existing_keys.add(key)
-                    except Exception as exc:
-                        logger.warning(
-                            f"[ORCHESTRATOR] Iteration {i}: Static analysis failed (non-fatal): {exc}"
-                        )
+                state["total_bugs_found"] += primary_count
 
                 # --- (d) Check for success ---
                 if exec_result.exit_code == 0:
                     logger.info(f"[ORCHESTRATOR] Iteration {i}: BUILD SUCCESS! (Healing complete)")
-                    curr_sigs = _compute_failure_signatures_list(bugs)
+                    curr_sigs = _compute_failure_signatures(bugs)
                     outcome = _classify_iteration_outcome(
                         prev_failure_sigs, curr_sigs, prev_bugs, bugs
                     ) if prev_failure_sigs else "improved"
@@ -501,10 +573,10 @@ class Orchestrator:
                         ci_status="success",
                         execution_summary="Build passed.",
                         iteration_outcome=outcome,
-                        previous_failure_signatures=prev_failure_sigs,
-                        current_failure_signatures=curr_sigs,
+                        previous_failure_signatures=sorted(prev_failure_sigs),
+                        current_failure_signatures=sorted(curr_sigs),
                         failure_delta=len(prev_failure_sigs) - len(curr_sigs),
-                        iteration_time_seconds=time.time() - iter_start,
+                        iteration_time_seconds=time.monotonic() - iter_start,
                     ))
                     break
 
@@ -515,7 +587,7 @@ class Orchestrator:
                         build_log_snippet=exec_result.log_excerpt,
                         ci_status="failure",
                         execution_summary="No bugs detected in logs.",
-                        iteration_time_seconds=time.time() - iter_start,
+                        iteration_time_seconds=time.monotonic() - iter_start,
                     ))
                     # If this is the last iteration, mark as failure
                     if i == RUN_RETRY_LIMIT:
@@ -524,8 +596,8 @@ class Orchestrator:
                         break
                     continue
 
-                # --- (e) Sort by priority ---
-                bugs = _sort_bugs_by_priority(bugs)
+                # --- (e) Sort by priority (one bug per signature) ---
+                bugs = _sort_bugs_by_priority(_dedupe_by_signature(bugs))
 
                 # Performance-aware batch limits
                 if state["performance_hint"] == "critical" or remaining < 60:
@@ -535,9 +607,8 @@ class Orchestrator:
                     logger.info(f"[ORCHESTRATOR] Iteration {i}: REDUCED performance hint. Limiting to 3 bugs.")
                     bugs = bugs[:3]
 
-                # Compute pre-fix signatures for drift + gating
-                pre_fix_signature = _compute_failure_signature(bugs)
-                pre_fix_sigs_set = set(_compute_failure_signatures_list(bugs))
+                # Compute pre-fix signatures once for drift + gating
+                pre_fix_sigs = _compute_failure_signatures(bugs)
 
                 # --- (f) Fix phase ---
                 logger.info(f"[ORCHESTRATOR] Iteration {i}: Attempting to fix {len(bugs)} bugs...")
@@ -547,154 +618,257 @@ class Orchestrator:
                 domain_fixes: Dict[str, List[FixResult]] = {}
                 iter_skipped = 0
 
+                # Bugs sharing a file must see each other's applied patches, so
+                # the n-th bug of every file goes into wave n. LLM calls within
+                # a wave run concurrently; acceptance and git apply stay serial.
+                waves: List[List[BugReport]] = []
+                bugs_per_file: Dict[str, int] = {}
+                # Source text per absolute path for this iteration; kept in
+                # step with applied patches so later waves skip the re-read
+                file_cache: Dict[str, str] = {}
                 for bug in bugs:
-                    bug_sig = generate_bug_signature(bug)
-
-                    # 1. Skip already-escalated bugs this iteration
-                    if bug_sig in escalated_signatures:
-                        logger.info(f"[ORCHESTRATOR] Iteration {i}: Skipping escalated bug signature: {bug_sig}")
-                        iter_skipped += 1
-                        continue
-
-                    # 2. Per-bug retry limit check (PER_BUG_RETRY_LIMIT)
-                    attempts = bug_attempts.get(bug_sig, 0)
-                    if attempts >= PER_BUG_RETRY_LIMIT:
-                        logger.warning(f"[ORCHESTRATOR] Iteration {i}: Exhausted {attempts}/{PER_BUG_RETRY_LIMIT} attempts for {bug.file_path} at line {bug.line_number}. Skipping.")
-                        escalated_signatures.add(bug_sig)
-                        iter_skipped += 1
-                        continue
-                    
-                    # Update attempts
-                    bug_attempts[bug_sig] = attempts + 1
-
-                    # Check bounded fix history for repeated fixes
-                    history_fingerprints = history.get_fingerprints(bug_sig)
-
-                    # Read file content
-                    abs_file_path = os.path.normpath(
-                        os.path.join(workspace_path, bug.file_path)
-                    )
-                    file_content = ""
-                    try:
-                        if os.path.exists(abs_file_path):
-                            with open(abs_file_path, "r", encoding="utf-8") as f:
-                                file_content = f.read()
-                    except Exception as exc:
-                        logger.error(f"[ORCHESTRATOR] Iteration {i}: Failed to read source {bug.file_path}: {exc}")
-                        iter_skipped += 1
-                        continue
-
-                    # Generate fix
-                    try:
-                        logger.info(f"[ORCHESTRATOR] Iteration {i}: Requesting fix for {bug.file_path}...")
-                        fix_result = await self.fix_agent.fix(
-                            bug_report=bug,
-                            file_content=file_content,
-                            attempt_number=bug_attempts[bug_sig],
-                            working_directory=working_directory
-                        )
-                        # Rate-limit throttle: space out LLM calls to stay
-                        # within free-tier limits (~10 req/min vs 30 RPM cap)
-                        await asyncio.sleep(6)
-                    except Exception as exc:
-                        logger.error(f"[ORCHESTRATOR] Iteration {i}: FixAgent CRASHED for {bug.file_path}: {exc}")
-                        iter_skipped += 1
-                        continue
-
-                    iteration_fixes.append(fix_result)
-
-                    # --- Patch acceptance rules ---
-                    if not fix_result.success:
-                        escalated_signatures.add(bug_sig)
-                        iter_skipped += 1
+                    n = bugs_per_file.get(bug.file_path, 0)
+                    bugs_per_file[bug.file_path] = n + 1
+                    if n == len(waves):
+                        waves.append([])
+                    waves[n].append(bug)
+
+                guardrail_hit = False
+                for wave_idx, wave in enumerate(waves):
+                    # Guardrail is re-checked per wave so a late iteration cannot
+                    # run far past the abort threshold; one clock sample per wave
+                    # serves both the check and the fix-call timeout below
+                    budget_left = _GUARDRAIL_ABORT - (time.monotonic() - run_clock)
+                    if budget_left <= 0:
                         logger.warning(
-                            f"[ORCHESTRATOR] Iteration {i}: Fix REJECTED for {bug.file_path}. "
-                            f"Reason: {fix_result.escalation_reason or 'not successful'}"
+                            f"[ORCHESTRATOR] Iteration {i}: Guardrail (5m) reached mid-iteration. "
+                            f"Skipping {len(waves) - wave_idx} remaining fix wave(s)."
                         )
-                        continue
+                        guardrail_hit = True
+                        break
 
-                    # Repeated fingerprint check
-                    if fix_result.patch_fingerprint and fix_result.patch_fingerprint in history_fingerprints:
-                        escalated_signatures.add(bug_sig)
-                        fix_result.success = False
-                        fix_result.escalation_reason = REPEATED_FIX
-                        iter_skipped += 1
-                        logger.warning(f"[ORCHESTRATOR] Iteration {i}: REPEATED fix detected for {bug.file_path}. Skipping.")
+                    ready: List[tuple] = []  # (bug, bug_sig, abs_file_path, file_content)
+                    for bug in wave:
+                        # Signatures are unique here, so none was escalated earlier
+                        # in this iteration
+                        bug_sig = bug.signature
+
+                        # Per-bug retry limit check (PER_BUG_RETRY_LIMIT)
+                        attempts = bug_attempts.get(bug_sig, 0)
+                        if attempts >= PER_BUG_RETRY_LIMIT:
+                            logger.warning(f"[ORCHESTRATOR] Iteration {i}: Exhausted {attempts}/{PER_BUG_RETRY_LIMIT} attempts for {bug.file_path} at line {bug.line_number}. Skipping.")
+                            escalated_signatures.add(bug_sig)
+                            iter_skipped += 1
+                            continue
+
+                        # Read file content
+                        abs_file_path = _abs_path(workspace_path, bug.file_path)
+                        file_content = file_cache.get(abs_file_path)
+                        if file_content is None:
+                            file_content = ""
+                            try:
+                                if os.path.exists(abs_file_path):
+                                    with open(abs_file_path, "r", encoding="utf-8") as f:
+                                        file_content = f.read()
+                            except Exception as exc:
+                                logger.error(f"[ORCHESTRATOR] Iteration {i}: Failed to read source {bug.file_path}: {exc}")
+                                iter_skipped += 1
+                                continue
+                            file_cache[abs_file_path] = file_content
+
+                        # Skipped here without counting an attempt, so a bug in a
+                        # large file still escalates to the next context level
+                        seen_inputs = repeated_inputs.get(bug_sig)
+                        if seen_inputs and _repeat_key(file_content, attempts + 1) in seen_inputs:
+                            escalated_signatures.add(bug_sig)
+                            iter_skipped += 1
+                            logger.warning(f"[ORCHESTRATOR] Iteration {i}: Source and context unchanged since a REPEATED fix for {bug.file_path}. Skipping LLM call.")
+                            continue
+
+                        # Update attempts
+                        bug_attempts[bug_sig] = attempts + 1
+                        ready.append((bug, bug_sig, abs_file_path, file_content))
+
+                    if not ready:
                         continue
 
-                    # Record in bounded history
-                    history.add(bug_sig, fix_result.patch_fingerprint or "", i)
+                    # Generate fixes concurrently (independent LLM calls), at most
+                    # fix_batch's semaphore in flight. Pacing is FixAgent's rate
+                    # limiter, acquired before each call, so time already spent
+                    # waiting on a slow call counts toward it.
+                    for bug, _, _, _ in ready:
+                        logger.info(f"[ORCHESTRATOR] Iteration {i}: Requesting fix for {bug.file_path}...")
+                    # Bound each call so one hung request cannot eat the run
+                    # budget: what is left is split across the remaining waves
+                    fix_timeout = max(_MIN_FIX_TIMEOUT, budget_left / (len(waves) - wave_idx))
+                    wave_results = await self.fix_agent.fix_batch(
+                        [
+                            {
+                                "bug_report": bug,
+                                "file_content": file_content,
+                                "attempt_number": bug_attempts[bug_sig],
+                                "working_directory": working_directory,
+                                "repo_url": repo_url,
+                            }
+                            for bug, bug_sig, _, file_content in ready
+                        ],
+                        timeout=fix_timeout,
+                    )
+                    for (bug, bug_sig, abs_file_path, file_content), fix_result in zip(ready, wave_results):
+                        if isinstance(fix_result, asyncio.TimeoutError):
+                            logger.error(f"[ORCHESTRATOR] Iteration {i}: FixAgent TIMED OUT after {fix_timeout:.0f}s for {bug.file_path}")
+                            iter_skipped += 1
+                            continue
+                        if isinstance(fix_result, BaseException):
+                            logger.error(f"[ORCHESTRATOR] Iteration {i}: FixAgent CRASHED for {bug.file_path}: {fix_result}")
+                            iter_skipped += 1
+                            continue
+
+                        iteration_fixes.append(fix_result)
+
+                        # --- Patch acceptance rules ---
+                        if not fix_result.success:
+                            escalated_signatures.add(bug_sig)
+                            iter_skipped += 1
+                            if fix_result.escalation_reason == REPEATED_FIX:
+                                repeated_inputs.setdefault(bug_sig, set()).add(_repeat_key(file_content, bug_attempts[bug_sig]))
+                            logger.warning(
+                                f"[ORCHESTRATOR] Iteration {i}: Fix REJECTED for {bug.file_path}. "
+                                f"Reason: {fix_result.escalation_reason or 'not successful'}"
+                            )
+                            continue
+
+                        # Repeated fingerprint check
+                        if fix_result.patch_fingerprint and history.contains(bug_sig, fix_result.patch_fingerprint):
+                            escalated_signatures.add(bug_sig)
+                            fix_result.success = False
+                            fix_result.escalation_reason = REPEATED_FIX
+                            iter_skipped += 1
+                            repeated_inputs.setdefault(bug_sig, set()).add(_repeat_key(file_content, bug_attempts[bug_sig]))
+                            logger.warning(f"[ORCHESTRATOR] Iteration {i}: REPEATED fix detected for {bug.file_path}. Skipping.")
+                            continue
+
+                        # Record in bounded history
+                        history.add(bug_sig, fix_result.patch_fingerprint or "", i)
+
+                        # Apply patch via git_agent
+                        try:
+                            logger.info(f"[ORCHESTRATOR] Iteration {i}: Applying patch to {bug.file_path}...")
+                            # Written only; committed per domain after all waves
+                            applied = await self._git(
+                                self.git_agent.apply_fix, fix_result, workspace_path, commit=False
+                            )
+                        except Exception as exc:
+                            logger.error(f"[ORCHESTRATOR] Iteration {i}: GitAgent failed to apply patch: {exc}")
+                            applied = False
+
+                        if applied:
+                            # Disk now holds the patched text; later waves reuse it
+                            file_cache[abs_file_path] = fix_result.patched_content
+                            applied_in_iteration += 1
+                            domain = _classify_domain(bug.file_path)
+                            domain_fixes.setdefault(domain, []).append(fix_result)
+                            logger.info(f"[ORCHESTRATOR] Iteration {i}: Patch applied successfully to {bug.file_path} (Domain: {domain})")
+                        else:
+                            # A failed apply may still have written the file
+                            file_cache.pop(abs_file_path, None)
+                            logger.error(f"[ORCHESTRATOR] Iteration {i}: Patch failed to apply at checkout layer for {bug.file_path}")
 
-                    # Apply patch via git_agent
+                # Commit written patches with one commit per domain
+                for domain, fixes in domain_fixes.items():
                     try:
-                        logger.info(f"[ORCHESTRATOR] Iteration {i}: Applying patch to {bug.file_path}...")
-                        applied = self.git_agent.apply_fix(fix_result, workspace_path)
+                        committed = await self._git(
+                            self.git_agent.commit_batch, workspace_path, domain, fixes
+                        )
                     except Exception as exc:
-                        logger.error(f"[ORCHESTRATOR] Iteration {i}: GitAgent failed to apply patch: {exc}")
-                        applied = False
-
-                    if applied:
-                        applied_in_iteration += 1
-                        state["total_fixes_applied"] += 1
-                        domain = _classify_domain(bug.file_path)
-                        domain_fixes.setdefault(domain, []).append(fix_result)
-                        logger.info(f"[ORCHESTRATOR] Iteration {i}: Patch applied successfully to {bug.file_path} (Domain: {domain})")
-                    else:
-                        logger.error(f"[ORCHESTRATOR] Iteration {i}: Patch failed to apply at checkout layer for {bug.file_path}")
+                        logger.error(f"[ORCHESTRATOR] Iteration {i}: GitAgent failed to commit {domain} batch: {exc}")
+                        committed = False
+                    if not committed:
+                        logger.error(f"[ORCHESTRATOR] Iteration {i}: {len(fixes)} {domain} fix(es) written but not committed")
+                        applied_in_iteration -= len(fixes)
+                state["total_fixes_applied"] += applied_in_iteration
+
+                if guardrail_hit:
+                    # Written patches are committed above; no time is left to verify or push
+                    state["skipped_fix_count"] += iter_skipped
+                    state["status"] = "exhausted"
+                    state["execution_summary"] = "Stopped: 5-minute performance guardrail reached."
+                    state["snapshots"].append(IterationSnapshot(
+                        iteration=i,
+                        bug_reports=bugs,
+                        fixes_applied=iteration_fixes,
+                        build_log_snippet=exec_result.log_excerpt,
+                        ci_status="skipped",
+                        execution_summary="Guardrail reached during the fix phase; remaining fixes skipped.",
+                        skipped_fix_count=iter_skipped,
+                        iteration_time_seconds=time.monotonic() - iter_start,
+                    ))
+                    break
 
                 # --- (g) Confidence gating re-execution + effectiveness scoring ---
                 effective_in_iteration = 0
                 post_fix_bugs: List[BugReport] = bugs  # default if no re-execution
+                post_fix_sigs: FrozenSet[str] = pre_fix_sigs
+                has_root_fixes = any(_fix_targets_root(f) for f in iteration_fixes if f.success)
 
-                if applied_in_iteration > 0:
+                if applied_in_iteration > 0 and not has_root_fixes and log_root_failures:
+                    # The build log showed root failures and none of the applied
+                    # fixes target them. The re-run is judged by the same log
+                    # parser, so the root-fix gate blocks this commit whatever it
+                    # shows. Skip the container; fixes stay unscored. (Root bugs
+                    # seen only by the built-in scanner do not count: the
+                    # post-fix log might not report them.)
+                    logger.info(
+                        f"[ORCHESTRATOR] Iteration {i}: CONFIDENCE GATE SKIPPED: "
+                        f"root failures remain and no root fix was applied."
+                    )
+                elif applied_in_iteration > 0:
                     logger.info(f"[ORCHESTRATOR] Iteration {i}: CONFIDENCE GATE: Re-executing build to verify {applied_in_iteration} patches...")
-                    try:
-                        verify_result = run_in_container(
-                            workspace_path=workspace_path,
-                            project_type=state["project_type"],
-                            working_dir=working_directory,
-                            docker_image=docker_image,
-                        )
-                        verify_bugs = parse_failure_log(verify_result.full_log, workspace_path=workspace_path)
-                        post_fix_bugs = verify_bugs
-                        post_fix_signature = _compute_failure_signature(verify_bugs)
-                        post_fix_sigs_set = set(_compute_failure_signatures_list(verify_bugs))
-
-                        if verify_result.exit_code == 0:
-                            logger.info(f"[ORCHESTRATOR] Iteration {i}: CONFIDENCE GATE PASSED! Build successful.")
-                        elif post_fix_signature == pre_fix_signature:
-                            logger.warning(f"[ORCHESTRATOR] Iteration {i}: CONFIDENCE GATE FAILED. Failures are IDENTICAL after fixes.")
-                        else:
-                            logger.info(f"[ORCHESTRATOR] Iteration {i}: CONFIDENCE GATE: Partial success. Bug signature changed.")
-
-                        # --- Effectiveness scoring (signature-based) ---
-                        for fix in iteration_fixes:
-                            if fix.success:
-                                score = _score_effectiveness(fix, pre_fix_sigs_set, post_fix_sigs_set)
-                                fix.effectiveness_score = score
-                                if score > 0:
-                                    effective_in_iteration += 1
-                        logger.info(f"[ORCHESTRATOR] Iteration {i}: Effectiveness stats: {effective_in_iteration} effective fixes.")
-                    except Exception as exc:
-                        logger.error(f"[ORCHESTRATOR] Iteration {i}: Confidence gate execution FAILED: {exc}")
+                    post_fix_bugs, post_fix_sigs, effective_in_iteration = await self._verify_fixes(
+                        i, workspace_path, state["project_type"], working_directory, docker_image,
+                        _exec_timeout(_GUARDRAIL_ABORT - (time.monotonic() - run_clock)),
+                        iteration_fixes, bugs, pre_fix_sigs,
+                    )
+                    # Patches that left their bug unchanged stay flagged in later runs
+                    for fix in iteration_fixes:
+                        if fix.success and fix.effectiveness_score == 0.0:
+                            try:
+                                await self.fix_agent.record_ineffective(fix, repo_url)
+                            except Exception as exc:
+                                logger.warning(f"[ORCHESTRATOR] Iteration {i}: Could not record ineffective fix: {exc}")
 
                 # Update telemetry counters
                 state["effective_fix_count"] += effective_in_iteration
                 state["skipped_fix_count"] += iter_skipped
 
                 # --- Failure drift tracking ---
-                curr_failure_sigs = _compute_failure_signatures_list(post_fix_bugs)
+                curr_failure_sigs = post_fix_sigs
                 iteration_outcome = _classify_iteration_outcome(
                     prev_failure_sigs, curr_failure_sigs, prev_bugs, post_fix_bugs
                 ) if prev_failure_sigs else ("improved" if applied_in_iteration > 0 else "unchanged")
                 logger.info(f"[ORCHESTRATOR] Iteration {i} Outcome: {iteration_outcome.upper()}")
 
+                # Snapshot fields shared by the commit and no-commit paths
+                # (timing is taken when each snapshot is recorded)
+                snapshot_base = {
+                    "iteration": i,
+                    "bug_reports": bugs,
+                    "fixes_applied": iteration_fixes,
+                    "build_log_snippet": exec_result.log_excerpt,
+                    "iteration_outcome": iteration_outcome,
+                    # Sorted lists keep the serialised snapshot stable
+                    "previous_failure_signatures": sorted(prev_failure_sigs),
+                    "current_failure_signatures": sorted(curr_failure_sigs),
+                    "failure_delta": len(prev_failure_sigs) - len(curr_failure_sigs),
+                    "effective_fix_count": effective_in_iteration,
+                    "skipped_fix_count": iter_skipped,
+                }
+
                 # --- (h) Commit gating ---
                 state["commit_count"] = self.git_agent.commit_count
 
                 # --- Root-fix commit gate ---
                 root_failures_remain = _has_root_failures(post_fix_bugs)
-                has_root_fixes = any(_fix_targets_root(f) for f in iteration_fixes if f.success)
 
                 # --- Commit noise protection ---
                 should_commit = (
@@ -710,10 +884,37 @@ class Orchestrator:
                         logger.warning(f"[ORCHESTRATOR] Iteration {i}: ROOT GATE: root failures (SYNTAX/IMPORT) remain, blocking lint-only commit.")
 
                 # --- (i) Push and validate ---
+                # Commits are made every iteration; the push (and the CI run it
+                # triggers) waits until COMMIT_BATCH_SIZE fixes are batched, the
+                # last iteration, or a re-run that found nothing left to fix
                 if should_commit:
-                    logger.info(f"[ORCHESTRATOR] Iteration {i}: PUSHING {applied_in_iteration} fix(es) to remote...")
+                    pending_push += applied_in_iteration
+                flush_push = should_commit and (
+                    pending_push >= COMMIT_BATCH_SIZE
+                    or i == RUN_RETRY_LIMIT
+                    or not post_fix_sigs
+                )
+
+                if should_commit and not flush_push:
+                    logger.info(
+                        f"[ORCHESTRATOR] Iteration {i}: DEFERRING push "
+                        f"({pending_push}/{COMMIT_BATCH_SIZE} fix(es) batched)."
+                    )
+                    state["snapshots"].append(IterationSnapshot(
+                        **snapshot_base,
+                        ci_status="deferred",
+                        execution_summary=(
+                            f"Applied {applied_in_iteration} fix(es), effective {effective_in_iteration}, "
+                            f"push deferred ({pending_push}/{COMMIT_BATCH_SIZE} batched)."
+                        ),
+                        iteration_time_seconds=time.monotonic() - iter_start,
+                    ))
+                elif flush_push:
+                    logger.info(f"[ORCHESTRATOR] Iteration {i}: PUSHING {pending_push} batched fix(es) to remote...")
+                    pending_push = 0
                     try:
-                        self.git_agent.push(workspace_path, heal_branch)
+                        # Network-bound
+                        await self._git(self.git_agent.push, workspace_path, heal_branch)
                     except Exception as exc:
                         logger.error(f"[ORCHESTRATOR] Iteration {i}: Git push failed: {exc}")
 
@@ -723,14 +924,19 @@ class Orchestrator:
                     push_status = getattr(self.git_agent, "push_status", "success")
                     # Handle mocks: if status is empty or a non-string (mock), default to success.
                     # Only explicitly rejected statuses block polling.
-                    if push_status not in ("success", "rejected_main", "conflict_unresolved"):
+                    if push_status not in ("success", "rejected_main", "conflict_unresolved", "auth_failed"):
                         push_status = "success"
 
                     if push_status == "success":
-                        # Poll CI status
-                        logger.info(f"[ORCHESTRATOR] Iteration {i}: POLLING CI for commit {commit_sha}...")
                         try:
-                            ci_status = await self.ci_monitor.poll_status(repo_url, commit_sha)
+                            if GITHUB_WEBHOOK_SECRET:
+                                # Webhook deliveries can be verified: sleep until GitHub
+                                # reports completion (falls back to polling if none arrives)
+                                logger.info(f"[ORCHESTRATOR] Iteration {i}: WAITING for CI webhook for commit {commit_sha}...")
+                                ci_status = await self.ci_monitor.wait_for_status(repo_url, commit_sha, iteration=i)
+                            else:
+                                logger.info(f"[ORCHESTRATOR] Iteration {i}: POLLING CI for commit {commit_sha}...")
+                                ci_status = await self.ci_monitor.poll_status(repo_url, commit_sha)
                             logger.info(f"[ORCHESTRATOR] Iteration {i}: CI STATUS: {ci_status.upper()}")
                         except Exception as exc:
                             logger.error(f"[ORCHESTRATOR] Iteration {i}: CI polling FAILED: {exc}")
@@ -766,48 +972,32 @@ class Orchestrator:
 
                     # --- (j) Record snapshot ---
                     snapshot = IterationSnapshot(
-                        iteration=i,
-                        bug_reports=bugs,
-                        fixes_applied=iteration_fixes,
-                        build_log_snippet=exec_result.log_excerpt,
+                        **snapshot_base,
                         ci_status=ci_status,
                         execution_summary=f"Applied {applied_in_iteration} fix(es), effective {effective_in_iteration}, CI: {ci_status}.",
-                        iteration_outcome=iteration_outcome,
-                        previous_failure_signatures=prev_failure_sigs,
-                        current_failure_signatures=curr_failure_sigs,
-                        failure_delta=len(prev_failure_sigs) - len(curr_failure_sigs),
-                        effective_fix_count=effective_in_iteration,
-                        skipped_fix_count=iter_skipped,
-                        iteration_time_seconds=time.time() - iter_start,
+                        iteration_time_seconds=time.monotonic() - iter_start,
                     )
                     state["snapshots"].append(snapshot)
 
-                    if ci_status == "success":
+                    # CIMonitor reports completed_success / completed_failure; the bare
+                    # success / failure / timeout forms are kept for older callers.
+                    if ci_status in ("success", "completed_success"):
                         logger.info(f"[ORCHESTRATOR] Iteration {i}: CI PASSED! Repository successfully healed.")
                         state["status"] = "success"
                         state["execution_summary"] = (
                             f"Healing successful via CI validation in iteration {i}."
                         )
                         break
-                    elif ci_status in ("failure", "timeout"):
+                    elif ci_status in ("failure", "completed_failure", "timeout"):
                         logger.warning(f"[ORCHESTRATOR] Iteration {i}: CI {ci_status.upper()}. Retrying in next loop.")
                 else:
                     # No commit this iteration
                     logger.warning(f"[ORCHESTRATOR] Iteration {i}: SKIPPING commit/push.")
                     state["snapshots"].append(IterationSnapshot(
-                        iteration=i,
-                        bug_reports=bugs,
-                        fixes_applied=iteration_fixes,
-                        build_log_snippet=exec_result.log_excerpt,
+                        **snapshot_base,
                         ci_status="skipped",
                         execution_summary="All fixes escalated, ineffective, or blocked by commit gate.",
-                        iteration_outcome=iteration_outcome,
-                        previous_failure_signatures=prev_failure_sigs,
-                        current_failure_signatures=curr_failure_sigs,
-                        failure_delta=len(prev_failure_sigs) - len(curr_failure_sigs),
-                        effective_fix_count=effective_in_iteration,
-                        skipped_fix_count=iter_skipped,
-                        iteration_time_seconds=time.time() - iter_start,
+                        iteration_time_seconds=time.monotonic() - iter_start,
                     ))
                     # If ALL bugs were escalated, stop loop
                     if len(escalated_signatures) >= len(bugs):
@@ -821,7 +1011,16 @@ class Orchestrator:
                 # Update previous signatures for next iteration drift tracking
                 prev_failure_sigs = curr_failure_sigs
                 prev_bugs = post_fix_bugs
-                logger.info(f"--- [ORCHESTRATOR] Iteration {i} Finished (Time: {time.time() - iter_start:.1f}s) ---")
+                logger.info(f"--- [ORCHESTRATOR] Iteration {i} Finished (Time: {time.monotonic() - iter_start:.1f}s) ---")
+
+            # The loop can end with batched commits still local (build passed,
+            # bugs all escalated, guardrail): push them without a CI wait
+            if pending_push:
+                logger.info(f"[ORCHESTRATOR] Pushing {pending_push} batched fix(es) left at loop exit...")
+                try:
+                    await self._git(self.git_agent.push, workspace_path, heal_branch)
+                except Exception as exc:
+                    logger.error(f"[ORCHESTRATOR] Final git push failed: {exc}")
 
             # Finalise status if still pending
             if state["status"] == "pending":
@@ -835,16 +1034,158 @@ class Orchestrator:
             state["status"] = "error"
             state["execution_summary"] = f"Fatal error: {str(e)}"
 
-        # ===========================================================
-        # 4. Final results
-        # ===========================================================
-        # Persist bounded history back to state for serialisation
-        state["fix_history"] = history.to_list()
+        finally:
+            # ===========================================================
+            # 4. Final results
+            # ===========================================================
+            # Runs on cancellation too (the API wraps run() in wait_for), so
+            # results are written and clients closed on every exit path.
+            # Persist bounded history back to state for serialisation
+            state["fix_history"] = history.to_list()
+
+            try:
+                ResultsWriter.write_results(state)
+            except Exception as exc:
+                logger.error("Results writer failed: %s", exc)
 
-        try:
-            ResultsWriter.write_results(state)
-        except Exception as exc:
-            logger.error("Results writer failed: %s", exc)
+            try:
+                await self.ci_monitor.aclose()
+            except Exception as exc:
+                logger.warning("CI monitor shutdown failed: %s", exc)
+
+            try:
+                # Under the git lock: waits out a git call still in a worker thread
+                await self._git(self.git_agent.close)
+            except Exception as exc:
+                logger.warning("Git agent shutdown failed: %s", exc)
 
         logger.info("Healing run complete. Status: %s", state["status"])
         return state
+
+    async def _detect_bugs(
+        self,
+        i: int,
+        workspace_path: str,
+        exec_result: ExecutionResult,
+        project_type: str,
+    ) -> Tuple[List[BugReport], int, bool]:
+        """
+        Run all detectors for one iteration and merge their reports.
+
+        Returns (bugs, primary_count, log_root_failures): primary_count is the
+        number of built-in + CI log bugs (static-analysis extras are not
+        counted); log_root_failures is True when the CI log parser itself
+        reported a SYNTAX/IMPORT failure.
+        """
+        # The three detectors are independent, so they run concurrently
+        # in worker threads; each one stays non-fatal.
+        is_python = project_type == "python"
+        builtin_bugs, ci_bugs, static_bugs = await asyncio.gather(
+            # PRIMARY: Python built-in scanner (stdlib only). For Python
+            # repos this is the main detection method: ast.parse,
+            # py_compile, tokenize and importlib give precise line numbers.
+            asyncio.to_thread(run_builtin_scan, workspace_path) if is_python else _no_bugs(),
+            # SECONDARY: CI log parser, for errors the built-in scanner
+            # cannot see (runtime errors, assertion and test failures).
+            asyncio.to_thread(parse_failure_log, exec_result.full_log, workspace_path=workspace_path),
+            # Bonus: external static analysis (pylint/pyflakes/mypy)
+            asyncio.to_thread(run_static_analysis, workspace_path) if is_python else _no_bugs(),
+            return_exceptions=True,
+        )
+
+        if isinstance(builtin_bugs, Exception):
+            logger.warning(
+                f"[ORCHESTRATOR] Iteration {i}: Built-in scanner failed (non-fatal): {builtin_bugs}"
+            )
+            builtin_bugs = []
+        elif builtin_bugs:
+            logger.info(
+                f"[ORCHESTRATOR] Iteration {i}: "
+                f"PRIMARY (built-in) scanner found {len(builtin_bugs)} bug(s)."
+            )
+        if isinstance(ci_bugs, Exception):
+            logger.error(f"[ORCHESTRATOR] Iteration {i}: CI log parser failed: {ci_bugs}")
+            ci_bugs = []
+        elif ci_bugs:
+            logger.info(
+                f"[ORCHESTRATOR] Iteration {i}: "
+                f"SECONDARY (CI log parser) found {len(ci_bugs)} bug(s)."
+            )
+        if isinstance(static_bugs, Exception):
+            logger.warning(
+                f"[ORCHESTRATOR] Iteration {i}: Static analysis failed (non-fatal): {static_bugs}"
+            )
+            static_bugs = []
+
+        # Merge in priority order (built-in, CI log, static): a later
+        # source only adds bugs not already reported at the same location
+        merged: Dict[Tuple[str, int, str], BugReport] = {}
+        for b in builtin_bugs:
+            merged.setdefault((b.file_path, b.line_number, b.sub_type), b)
+        for b in ci_bugs:
+            merged.setdefault((b.file_path, b.line_number, b.sub_type), b)
+
+        logger.info(
+            f"[ORCHESTRATOR] Iteration {i}: Total bugs after merge: {len(merged)}"
+        )
+        primary_count = len(merged)
+
+        if static_bugs:
+            logger.info(
+                f"[ORCHESTRATOR] Iteration {i}: "
+                f"Static analysis found {len(static_bugs)} additional bug(s)."
+            )
+            for b in static_bugs:
+                merged.setdefault((b.file_path, b.line_number, b.sub_type), b)
+        return list(merged.values()), primary_count, _has_root_failures(ci_bugs)
+
+    async def _verify_fixes(
+        self,
+        i: int,
+        workspace_path: str,
+        project_type: str,
+        working_directory: str,
+        docker_image: str,
+        timeout_seconds: int,
+        iteration_fixes: List[FixResult],
+        pre_fix_bugs: List[BugReport],
+        pre_fix_sigs: FrozenSet[str],
+    ) -> Tuple[List[BugReport], FrozenSet[str], int]:
+        """
+        Re-run the build after patching and score each applied fix.
+
+        Returns (post_fix_bugs, post_fix_sigs, effective_count); on executor
+        failure the pre-fix bugs and signatures are returned unscored.
+        """
+        try:
+            verify_result = await asyncio.to_thread(
+                run_in_container,
+                workspace_path=workspace_path,
+                project_type=project_type,
+                working_dir=working_directory,
+                docker_image=docker_image,
+                timeout_seconds=timeout_seconds,
+            )
+            post_fix_bugs = parse_failure_log(verify_result.full_log, workspace_path=workspace_path)
+            post_fix_sigs = _compute_failure_signatures(post_fix_bugs)
+
+            if verify_result.exit_code == 0:
+                logger.info(f"[ORCHESTRATOR] Iteration {i}: CONFIDENCE GATE PASSED! Build successful.")
+            elif post_fix_sigs == pre_fix_sigs:
+                logger.warning(f"[ORCHESTRATOR] Iteration {i}: CONFIDENCE GATE FAILED. Failures are IDENTICAL after fixes.")
+            else:
+                logger.info(f"[ORCHESTRATOR] Iteration {i}: CONFIDENCE GATE: Partial success. Bug signature changed.")
+
+            # --- Effectiveness scoring (signature-based) ---
+            effective = 0
+            for fix in iteration_fixes:
+                if fix.success:
+                    score = _score_effectiveness(fix, pre_fix_sigs, post_fix_sigs)
+                    fix.effectiveness_score = score
+                    if score > 0:
+                        effective += 1
+            logger.info(f"[ORCHESTRATOR] Iteration {i}: Effectiveness stats: {effective} effective fixes.")
+            return post_fix_bugs, post_fix_sigs, effective
+        except Exception as exc:
+            logger.error(f"[ORCHESTRATOR] Iteration {i}: Confidence gate execution FAILED: {exc}")
+            return pre_fix_bugs, pre_fix_sigs, 0
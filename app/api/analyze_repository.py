@@ -123,7 +123,15 @@ def _transform_state_to_response(
         ci_status = getattr(snap, "ci_status", "unknown") if hasattr(snap, "ci_status") else "unknown"
         iter_time = getattr(snap, "iteration_time_seconds", 0) if hasattr(snap, "iteration_time_seconds") else 0
 
-        timeline_status = "PASSED" if ci_status == "success" else "FAILED"
+        # CIMonitor reports completed_success; the bare "success" literal is
+        # kept for snapshots recorded by older runs. "deferred" iterations
+        # committed fixes whose push waits for a later batch: no CI ran yet.
+        if ci_status in ("success", "completed_success"):
+            timeline_status = "PASSED"
+        elif ci_status == "deferred":
+            timeline_status = "DEFERRED"
+        else:
+            timeline_status = "FAILED"
         formatted_time = f"{int(iter_time)}s"
 
         # Calculate timestamp for this iteration
@@ -248,7 +256,8 @@ async def analyze_repository(request: AnalyzeRequest):
         if workspace and branch and orchestrator.git_agent.commit_count > 0:
             try:
                 logger.info(f"[API] Pushing {orchestrator.git_agent.commit_count} partial commit(s) before timeout response...")
-                orchestrator.git_agent.push(workspace, branch)
+                # Waits for git work the cancelled run left in a worker thread
+                await asyncio.to_thread(orchestrator.push_partial, workspace, branch)
             except Exception as push_exc:
                 logger.warning(f"[API] Partial push failed: {push_exc}")
     except Exception as exc:
@@ -0,0 +1,71 @@
+"""
+POST /webhook/github
+Receives GitHub CI webhooks (check_suite, check_run, workflow_run) and wakes
+any CIMonitor waiting on that commit, replacing most status polling.
+
+Safety:
+    - Deliveries must carry a valid X-Hub-Signature-256 (HMAC-SHA256 of the
+      raw body with GITHUB_WEBHOOK_SECRET)
+    - Endpoint refuses all deliveries when no secret is configured
+"""
+import hmac
+import json
+import hashlib
+import logging
+
+from fastapi import APIRouter, HTTPException, Request
+
+from app.agents.ci_monitor import webhook_hub
+from app.core.config import GITHUB_WEBHOOK_SECRET
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/webhook", tags=["Webhook"])
+
+# event name → payload key holding the object with head_sha
+_CI_EVENTS = {
+    "check_suite": "check_suite",
+    "check_run": "check_run",
+    "workflow_run": "workflow_run",
+}
+
+
+def verify_signature(secret: str, body: bytes, signature: str) -> bool:
+    """Constant-time check of GitHub's X-Hub-Signature-256 header."""
+    if not secret or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(f"sha256={expected}", signature)
+
+
+@router.post("/github")
+async def github_webhook(request: Request):
+    body = await request.body()
+    signature = request.headers.get("X-Hub-Signature-256", "")
+    if not verify_signature(GITHUB_WEBHOOK_SECRET, body, signature):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+    event_name = request.headers.get("X-GitHub-Event", "")
+    if event_name == "ping":
+        return {"status": "pong"}
+
+    payload_key = _CI_EVENTS.get(event_name)
+    if not payload_key:
+        return {"status": "ignored", "event": event_name}
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Malformed JSON payload")
+
+    if payload.get("action") != "completed":
+        return {"status": "ignored", "event": event_name}
+
+    repo_path = (payload.get("repository") or {}).get("full_name", "")
+    head_sha = (payload.get(payload_key) or {}).get("head_sha", "")
+    if not repo_path or not head_sha:
+        return {"status": "ignored", "event": event_name}
+
+    woken = webhook_hub.dispatch(repo_path, head_sha)
+    logger.info("CI webhook %s for %s@%s woke %d waiter(s)", event_name, repo_path, head_sha[:8], woken)
+    return {"status": "accepted", "woken": woken}
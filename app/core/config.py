@@ -11,6 +11,12 @@ Environment Variables:
     RUN_RETRY_LIMIT      — Max autonomous fix loops (default: 5)
     DOCKER_IMAGE         — Sandbox container image name (default: rift-sandbox:latest)
     ENABLE_DEV_ENDPOINT  — Enable /dev/* diagnostic endpoints (default: false)
+    CI_USE_GRAPHQL       — Poll commit check runs via GitHub GraphQL (default: false)
+    GITHUB_WEBHOOK_SECRET — Shared secret for verifying /webhook/github deliveries
+    LLM_CALLS_PER_MINUTE — Max LLM fix calls per minute before pacing (default: 20)
+    LLM_BURST            — LLM fix calls allowed back-to-back before pacing starts (default: 3)
+    FIX_FINGERPRINT_DB   — SQLite path persisting rejected fix fingerprints per repo (default: off)
+    COMMIT_BATCH_SIZE    — Committed fixes batched before a push + CI wait (default: 3)
 
 Execution Timeout Philosophy:
     DEFAULT_EXECUTION_TIMEOUT defines the max seconds a single build/test
@@ -31,8 +37,10 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+GITHUB_WEBHOOK_SECRET = os.getenv("GITHUB_WEBHOOK_SECRET", "")
 RUN_RETRY_LIMIT = int(os.getenv("RUN_RETRY_LIMIT", 5))
 DOCKER_IMAGE = os.getenv("DOCKER_IMAGE", "rift-sandbox:latest")
+CI_USE_GRAPHQL = os.getenv("CI_USE_GRAPHQL", "false").lower() == "true"
 
 # Dynamic Docker images: project_type → language-specific image
 # Each entry is overridable via env var (e.g. DOCKER_IMAGE_PYTHON=python:3.12)
@@ -64,3 +72,13 @@ PATCH_TRUNCATION_RATIO = float(os.getenv("PATCH_TRUNCATION_RATIO", 0.3))
 
 # Per-bug retry limit
 PER_BUG_RETRY_LIMIT = int(os.getenv("PER_BUG_RETRY_LIMIT", 5))
+
+# LLM call pacing (free-tier TPM/RPM limits)
+LLM_CALLS_PER_MINUTE = int(os.getenv("LLM_CALLS_PER_MINUTE", 20))
+LLM_BURST = int(os.getenv("LLM_BURST", 3))
+
+# Persistent repeat-fix detection (empty = in-memory only)
+FIX_FINGERPRINT_DB = os.getenv("FIX_FINGERPRINT_DB", "")
+
+# Push batching: each push triggers a full CI run, so fixes are pushed in groups
+COMMIT_BATCH_SIZE = int(os.getenv("COMMIT_BATCH_SIZE", 3))
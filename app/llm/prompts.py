@@ -26,6 +26,8 @@ Confidence Instruction:
 """
 import os
 import logging
+import functools
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
@@ -87,10 +89,14 @@ DOMAIN_PROMPTS: dict[str, str] = {
 }
 
 
+@functools.lru_cache(maxsize=32)
 def get_system_prompt(domain: str = "generic") -> str:
     """
     Return the full system prompt, optionally augmented with domain-specific skills.
 
+    Cached per domain: skills are loaded once at import and domains are a
+    small closed set, so the result is a pure function of ``domain``.
+
     Parameters
     ----------
     domain : str
@@ -123,6 +129,7 @@ def build_user_prompt(
     full_file_content: str = "",
     related_file_content: str = "",
     ci_config_hint: str = "",
+    region_lines: Optional[tuple[int, int, int]] = None,
 ) -> str:
     """
     Build the user prompt sent to the LLM.
@@ -156,6 +163,9 @@ def build_user_prompt(
         Content of related import files (used in medium/large context).
     ci_config_hint : str
         CI config context (used in large context only).
+    region_lines : tuple or None
+        (first, last, total) when ``full_file_content`` is only a region of a
+        large file; the LLM is then asked to return just that region.
 
     Returns
     -------
@@ -181,7 +191,16 @@ def build_user_prompt(
         )
 
     # Context-level content
-    if context_level == "small":
+    if region_lines and context_level != "small":
+        first, last, total = region_lines
+        parts.append(
+            f"FILE REGION (lines {first}-{last} of {total}):\n```\n{full_file_content}\n```"
+        )
+        if related_file_content:
+            parts.append(f"RELATED FILES:\n```\n{related_file_content}\n```")
+        if context_level == "large" and ci_config_hint:
+            parts.append(f"CI CONFIG HINT:\n{ci_config_hint}")
+    elif context_level == "small":
         parts.append(f"CODE SNIPPET (around error):\n```\n{file_snippet}\n```")
     elif context_level == "medium":
         content = full_file_content if full_file_content else file_snippet
@@ -197,9 +216,16 @@ def build_user_prompt(
             parts.append(f"CI CONFIG HINT:\n{ci_config_hint}")
 
     # Hard rules reminder — context-aware
+    if region_lines and context_level != "small":
+        return_rule = (
+            f"- Return the COMPLETE region (lines {region_lines[0]}-{region_lines[1]}) "
+            "with ONLY the fix applied, not the whole file.\n"
+        )
+    else:
+        return_rule = "- Return the COMPLETE file content with ONLY the fix applied.\n"
     parts.append(
         "INSTRUCTIONS:\n"
-        "- Return the COMPLETE file content with ONLY the fix applied.\n"
+        + return_rule +
         "- Do NOT change any lines outside ±15 of the error.\n"
         "- Do NOT rename variables or restructure code.\n"
         "- Preserve ALL comments.\n"
@@ -0,0 +1,70 @@
+"""
+LLM Rate Limiter
+================
+Leaky-bucket limiter that paces LLM calls to stay under provider quotas.
+
+Behaviour:
+    - Bucket drains at ``max_rate`` units per ``time_period`` seconds
+    - Bucket holds up to ``capacity`` units (default 1): calls within
+      capacity proceed immediately, so the worst case over any window of
+      ``time_period`` seconds is ``capacity + max_rate`` calls
+    - Only calls that would overflow the bucket wait for it to drain
+    - ``acquire(amount)`` lets callers weight a call, e.g. by estimated
+      prompt tokens, to turn an RPM bucket into a TPM bucket (size
+      ``capacity`` for the largest single call)
+
+Usage:
+    limiter = AsyncRateLimiter(20, 60, capacity=3)
+    async with limiter:
+        await client.call_with_fallback(...)
+"""
+import asyncio
+import time
+
+
+class AsyncRateLimiter:
+    """
+    Async leaky-bucket rate limiter.
+
+    Safe for concurrent use from coroutines on one event loop; no asyncio
+    primitives are held, so a single instance may be shared across runs.
+    """
+
+    def __init__(
+        self, max_rate: float, time_period: float = 60.0, capacity: float = 1.0
+    ) -> None:
+        if max_rate <= 0 or time_period <= 0 or capacity <= 0:
+            raise ValueError("max_rate, time_period and capacity must be positive")
+        self.max_rate = float(max_rate)
+        self.time_period = float(time_period)
+        self.capacity = float(capacity)
+        self._rate_per_sec = self.max_rate / self.time_period
+        self._level = 0.0
+        self._last_check = time.monotonic()
+
+    def _leak(self) -> None:
+        """Drain the bucket according to elapsed time."""
+        now = time.monotonic()
+        elapsed = now - self._last_check
+        self._last_check = now
+        self._level = max(0.0, self._level - elapsed * self._rate_per_sec)
+
+    def has_capacity(self, amount: float = 1.0) -> bool:
+        """Return True if ``amount`` could be acquired without waiting."""
+        self._leak()
+        return self._level + min(amount, self.capacity) <= self.capacity
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """Wait until ``amount`` units fit in the bucket, then take them."""
+        # Oversized requests are clamped so they can never block forever
+        amount = min(amount, self.capacity)
+        while not self.has_capacity(amount):
+            overflow = self._level + amount - self.capacity
+            await asyncio.sleep(overflow / self._rate_per_sec)
+        self._level += amount
+
+    async def __aenter__(self) -> None:
+        await self.acquire()
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        return None
@@ -20,7 +20,7 @@ Confidence Gating Integration:
 """
 import logging
 from dataclasses import dataclass, field
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from app.core.config import (
     GEMINI_API_KEY, GROQ_API_KEY, OPENROUTER_API_KEY,
     PROVIDER_COOLDOWN_THRESHOLD, PROVIDER_COOLDOWN_SKIP_COUNT,
@@ -117,8 +117,11 @@ class ProviderHealth:
 # ---------------------------------------------------------------------------
 CONTEXT_LEVELS = ("small", "medium", "large")
 
+# Files shorter than this are always sent whole ("medium"), whatever the attempt
+FULL_FILE_MAX_LINES = 300
 
-def decide_context_level(attempt_number: int) -> str:
+
+def decide_context_level(attempt_number: int, num_lines: Optional[int] = None) -> str:
     """
     Decide the context level based on the fix attempt number.
 
@@ -126,12 +129,17 @@ def decide_context_level(attempt_number: int) -> str:
     ----------
     attempt_number : int
         1-based attempt number for the current bug.
+    num_lines : int or None
+        Line count of the failing file, if known. Files under
+        FULL_FILE_MAX_LINES always get "medium".
 
     Returns
     -------
     str
         One of "small", "medium", "large".
     """
+    if num_lines is not None and num_lines < FULL_FILE_MAX_LINES:
+        return "medium"
     if attempt_number <= 1:
         return "medium"  # Always send full file on first attempt
     elif attempt_number == 2:
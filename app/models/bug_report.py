@@ -5,16 +5,22 @@ Pydantic model for structured bug information.
 This is the contract between the static analysis layer and all downstream consumers.
 
 Fields:
-    bug_type        — one of six allowed types (LINTING, SYNTAX, etc.)
+    bug_type        — one of six allowed types (LINTING, SYNTAX, etc.); interned
     sub_type        — key into FIX_TEMPLATES[bug_type] (e.g. "unused_import")
     file_path       — relative to repo root, forward slashes
     line_number     — integer >= 1
     domain          — specialist routing domain (backend_python, frontend_js, etc.)
     tool            — source tool name (pylint, pyflakes, mypy, ast)
     message         — raw tool message for debugging (never shown in evaluation output)
+
+Derived (cached per instance, never serialised):
+    signature       — stable bug signature (see utils.fix_fingerprint)
+    severity_hint   — error severity hint (see utils.escalation_reasons)
 """
+import functools
+import sys
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 
 
 class BugReport(BaseModel):
@@ -27,3 +33,22 @@ class BugReport(BaseModel):
     confidence: float = 0.0
     tool: str = ""
     message: str = ""
+
+    @field_validator("bug_type")
+    @classmethod
+    def _intern_bug_type(cls, v: str) -> str:
+        # Few distinct values, used as dict keys everywhere downstream;
+        # interning lets those lookups hit the identity fast path
+        return sys.intern(v)
+
+    @functools.cached_property
+    def signature(self) -> str:
+        """Stable bug signature, computed once per report."""
+        from app.utils.fix_fingerprint import generate_bug_signature
+        return generate_bug_signature(self)
+
+    @functools.cached_property
+    def severity_hint(self) -> str:
+        """Error severity hint for bug_type, computed once per report."""
+        from app.utils.escalation_reasons import get_severity_hint
+        return get_severity_hint(self.bug_type)
@@ -10,7 +10,7 @@ Fields:
     bug_reports     — List[BugReport] found during this iteration
     fixes_applied   — List[FixResult] attempted during this iteration
     build_log_snippet — abbreviated execution log for dashboard display
-    ci_status       — "pending" | "success" | "failure" | "skipped" | "unknown_timeout"
+    ci_status       — "pending" | "success" | "failure" | "skipped" | "deferred" | "unknown_timeout"
     execution_summary — brief text summarising what happened
 
 Stability Fields (Step 6.1):
@@ -23,8 +23,17 @@ Fix History Cache (Step 5.1):
     - In-memory only (no persistence required yet)
     - Allows orchestrator to detect repeated ineffective fixes
     - Cleared on new agent run via clear()
+
+Fingerprint Store:
+    - Optional SQLite-backed set of fix fingerprints (FIX_FINGERPRINT_DB)
+    - Holds only rejected or ineffective patches, keyed by repository, so
+      a fix that worked on one repo never blocks it on another
+    - Survives process restarts so known bad fixes stay flagged
+    - Disk-backed, so history depth does not grow process memory
+    - Blocking; async callers go through asyncio.to_thread
 """
 import logging
+import sqlite3
 from typing import Optional
 
 logger = logging.getLogger(__name__)
@@ -122,3 +131,47 @@ class FixHistoryCache:
     def __len__(self) -> int:
         """Total number of unique bug signatures tracked."""
         return len(self._history)
+
+
+class FingerprintStore:
+    """
+    Persistent set of (repo, fix fingerprint) pairs backed by a single SQLite table.
+
+    Usage:
+        store = FingerprintStore("fingerprints.db")
+        if not store.contains(fp, repo_url):
+            store.add(fp, repo_url)
+        store.close()
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        # Autocommit; single-writer, so no explicit transactions needed
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS rejected_fp "
+            "(repo TEXT NOT NULL, fp TEXT NOT NULL, PRIMARY KEY (repo, fp))"
+        )
+
+    def contains(self, fingerprint: str, repo: str = "") -> bool:
+        """Return True if the fingerprint was recorded for this repo before."""
+        row = self._db.execute(
+            "SELECT 1 FROM rejected_fp WHERE repo = ? AND fp = ?", (repo, fingerprint)
+        ).fetchone()
+        return row is not None
+
+    def add(self, fingerprint: str, repo: str = "") -> None:
+        """Record a fingerprint for a repo (no-op if already present)."""
+        self._db.execute(
+            "INSERT OR IGNORE INTO rejected_fp (repo, fp) VALUES (?, ?)", (repo, fingerprint)
+        )
+
+    def clear_repo(self, repo: str = "") -> None:
+        """Remove the stored fingerprints of one repo, leaving other repos intact."""
+        self._db.execute("DELETE FROM rejected_fp WHERE repo = ?", (repo,))
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM rejected_fp").fetchone()[0]
@@ -43,7 +43,7 @@ def generate_bug_signature(bug_report: BugReport) -> str:
         Deterministic bug signature string.
     """
     raw = f"{bug_report.file_path}:{bug_report.line_number}:{bug_report.sub_type}"
-    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
 
 
 def generate_fix_fingerprint(bug_report: BugReport, patch_diff: str) -> str:
@@ -72,4 +72,4 @@ def generate_fix_fingerprint(bug_report: BugReport, patch_diff: str) -> str:
         return bug_sig
 
     combined = f"{bug_sig}:{patch_hash}"
-    return hashlib.sha256(combined.encode("utf-8")).hexdigest()[:16]
+    return hashlib.blake2b(combined.encode("utf-8"), digest_size=16).hexdigest()
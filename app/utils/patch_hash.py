@@ -5,7 +5,8 @@ Generate deterministic hash from a unified diff string only.
 
 Rules:
     - Hash the diff only, never the full file content.
-    - Use SHA-256 truncated to 16 hex chars for compactness.
+    - Use BLAKE2b with a 16-byte digest (32 hex chars): 128 bits keeps
+      collisions negligible across long-lived fingerprint stores.
     - Deterministic: same diff always produces same hash.
     - O(diff size) — no heavy computation.
 """
@@ -24,9 +25,9 @@ def compute_patch_hash(diff: str) -> str:
     Returns
     -------
     str
-        16-character hex hash of the diff. Empty string if diff is empty.
+        32-character hex hash of the diff. Empty string if diff is empty.
     """
     if not diff or not diff.strip():
         return ""
 
-    return hashlib.sha256(diff.encode("utf-8")).hexdigest()[:16]
+    return hashlib.blake2b(diff.encode("utf-8"), digest_size=16).hexdigest()
@@ -10,6 +10,7 @@ from app.api.status import router as status_router
 from app.api.results import router as results_router
 from app.api.dev_run_repo import router as dev_router
 from app.api.analyze_repository import router as analyze_router
+from app.api.github_webhook import router as webhook_router
 from app.utils.logging_config import setup_logging
 
 # Initialize enhanced logging
@@ -69,6 +70,7 @@ app.include_router(status_router, tags=["Agent"])
 app.include_router(results_router, tags=["Agent"])
 app.include_router(dev_router)
 app.include_router(analyze_router)
+app.include_router(webhook_router)
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
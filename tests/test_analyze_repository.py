@@ -0,0 +1,35 @@
+"""
+Analyze Repository Endpoint Tests
+=================================
+Tests for the AgentState → dashboard response transform used by
+POST /analyze-repository. No orchestrator run is needed.
+"""
+from app.api.analyze_repository import AnalyzeRequest, _transform_state_to_response
+from app.models.iteration_snapshot import IterationSnapshot
+
+
+def _state_with_ci_statuses(*ci_statuses):
+    return {
+        "repo_url": "https://github.com/test/repo",
+        "status": "success",
+        "snapshots": [
+            IterationSnapshot(iteration=i, bug_reports=[], ci_status=status)
+            for i, status in enumerate(ci_statuses, start=1)
+        ],
+    }
+
+
+def _timeline(state):
+    request = AnalyzeRequest(repo_url=state["repo_url"], team_name="Team", leader_name="Lead")
+    return [item.status for item in _transform_state_to_response(state, request, 1.0).timeline]
+
+
+def test_completed_success_is_passed_in_timeline():
+    state = _state_with_ci_statuses("completed_success", "success", "completed_failure")
+    assert _timeline(state) == ["PASSED", "PASSED", "FAILED"]
+
+
+def test_deferred_iteration_is_not_reported_as_failed():
+    # Fixes committed but batched for a later push: no CI verdict yet
+    state = _state_with_ci_statuses("deferred", "deferred", "completed_success")
+    assert _timeline(state) == ["DEFERRED", "DEFERRED", "PASSED"]
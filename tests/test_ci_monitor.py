@@ -1,7 +1,37 @@
 import pytest
 import asyncio
+import time
+import httpx
 from unittest.mock import AsyncMock, patch, MagicMock
-from app.agents.ci_monitor import CIMonitor
+from app.agents.ci_monitor import CIMonitor, webhook_hub
+
+
+def _no_jitter():
+    """Pin random.uniform to the midpoint so jittered sleeps equal the base delay."""
+    return patch("random.uniform", side_effect=lambda a, b: (a + b) / 2)
+
+
+def _response(payload, status_code=200, headers=None):
+    """Build a real httpx.Response so headers/raise_for_status behave like GitHub's."""
+    return httpx.Response(
+        status_code,
+        json=payload,
+        headers=headers,
+        request=httpx.Request("GET", "https://api.github.com/repos/o/r"),
+    )
+
+def _advancing_clock(start=1_000_000.0):
+    """Patch time.time and asyncio.sleep so each sleep advances the clock."""
+    clock = {"now": start}
+
+    async def fake_sleep(delay):
+        clock["now"] += delay
+
+    return (
+        patch("time.time", side_effect=lambda: clock["now"]),
+        patch("asyncio.sleep", side_effect=fake_sleep),
+        clock,
+    )
 
 @pytest.fixture
 def monitor():
@@ -26,16 +56,13 @@ def test_job_filtering(monitor):
 def test_exponential_backoff_logic(monitor):
     async def run_test():
         # Mock httpx client to return pending then success
-        mock_resp_pending = MagicMock()
-        mock_resp_pending.json.return_value = {"check_runs": [{"status": "in_progress", "name": "build"}]}
-        mock_resp_pending.raise_for_status = MagicMock()
+        mock_resp_pending = _response({"check_runs": [{"status": "in_progress", "name": "build"}]})
         
-        mock_resp_success = MagicMock()
-        mock_resp_success.json.return_value = {"check_runs": [{"status": "completed", "conclusion": "success", "name": "build"}]}
-        mock_resp_success.raise_for_status = MagicMock()
+        mock_resp_success = _response({"check_runs": [{"status": "completed", "conclusion": "success", "name": "build"}]})
 
         with patch("httpx.AsyncClient.get") as mock_get, \
-             patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+             patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep, \
+             _no_jitter():
             
             mock_get.side_effect = [mock_resp_pending, mock_resp_success]
             
@@ -49,25 +76,46 @@ def test_exponential_backoff_logic(monitor):
 
 def test_stalled_detection(monitor):
     async def run_test():
-        mock_resp = MagicMock()
-        mock_resp.json.return_value = {"check_runs": [{"status": "in_progress", "name": "build"}]}
-        mock_resp.raise_for_status = MagicMock()
+        mock_resp = _response({"check_runs": [{"status": "in_progress", "name": "build"}]})
+
+        time_patch, sleep_patch, clock = _advancing_clock()
+        start = clock["now"]
 
         with patch("httpx.AsyncClient.get", return_value=mock_resp), \
-             patch("asyncio.sleep", new_callable=AsyncMock):
-            
-            # Should return stalled after 7 consecutive in_progress
+             time_patch, sleep_patch, _no_jitter():
+            # Should return stalled once nothing has changed for 180s
             status = await monitor.poll_status("https://github.com/o/r", "sha123")
             assert status == "stalled"
             assert any(e["status"] == "stalled" for e in monitor.timeline)
+            assert clock["now"] - start >= 180
+
+    asyncio.run(run_test())
+
+def test_healthy_job_with_start_time_not_flagged_as_stalled(monitor):
+    async def run_test():
+        time_patch, sleep_patch, clock = _advancing_clock(start=1767225600.0)
+        started = "2026-01-01T00:00:00Z"
+        pending = _response({"check_runs": [{"status": "in_progress", "name": "build", "started_at": started}]})
+        success = _response({"check_runs": [{"status": "completed", "conclusion": "success", "name": "build", "started_at": started}]})
+
+        async def fake_get(*args, **kwargs):
+            # A healthy 120s job: in progress until two minutes after start
+            return success if clock["now"] >= 1767225600.0 + 120 else pending
+
+        with patch("httpx.AsyncClient.get", side_effect=fake_get) as mock_get, \
+             time_patch, sleep_patch, _no_jitter():
+            status = await monitor.poll_status("https://github.com/o/r", "sha")
+
+        assert status == "completed_success"
+        # Adaptive delay polls far more than 7 times in the first minutes
+        assert mock_get.call_count > 7
+        assert not any(e["stalled_flag"] for e in monitor.timeline)
     
     asyncio.run(run_test())
 
 def test_timeline_generation(monitor):
     async def run_test():
-        mock_resp = MagicMock()
-        mock_resp.json.return_value = {"check_runs": [{"status": "completed", "conclusion": "failure", "name": "build"}]}
-        mock_resp.raise_for_status = MagicMock()
+        mock_resp = _response({"check_runs": [{"status": "completed", "conclusion": "failure", "name": "build"}]})
         
         with patch("httpx.AsyncClient.get", return_value=mock_resp):
             await monitor.poll_status("https://github.com/o/r", "sha", iteration=2)
@@ -81,9 +129,7 @@ def test_timeline_generation(monitor):
 
 def test_max_polling_window(monitor):
     async def run_test():
-        mock_resp = MagicMock()
-        mock_resp.json.return_value = {"check_runs": []} # Stay 'queued'
-        mock_resp.raise_for_status = MagicMock()
+        mock_resp = _response({"check_runs": []}) # Stay 'queued'
 
         # Use a counter-based mock so time.time never runs out of values
         call_count = {"n": 0}
@@ -100,3 +146,333 @@ def test_max_polling_window(monitor):
             assert status == "unknown_timeout"
     
     asyncio.run(run_test())
+
+def test_rate_limit_retry_after_honoured(monitor):
+    async def run_test():
+        limited = _response({"message": "rate limited"}, status_code=429, headers={"Retry-After": "42"})
+        success = _response({"check_runs": [{"status": "completed", "conclusion": "success", "name": "build"}]})
+
+        with patch("httpx.AsyncClient.get", side_effect=[limited, success]), \
+             patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            status = await monitor.poll_status("https://github.com/o/r", "sha")
+
+            assert status == "completed_success"
+            mock_sleep.assert_called_once_with(42.0)
+
+    asyncio.run(run_test())
+
+def test_forbidden_without_rate_limit_headers_is_permanent(monitor):
+    async def run_test():
+        forbidden = _response({"message": "Bad credentials"}, status_code=403)
+
+        with patch("httpx.AsyncClient.get", return_value=forbidden), \
+             patch("asyncio.sleep", new_callable=AsyncMock):
+            status = await monitor.poll_status("https://github.com/o/r", "sha")
+            assert status == "ci_error"
+
+    asyncio.run(run_test())
+
+def test_low_remaining_quota_sleeps_until_reset(monitor):
+    async def run_test():
+        reset_at = int(time.time()) + 60
+        quota = {"X-RateLimit-Remaining": "2", "X-RateLimit-Reset": str(reset_at)}
+        pending = _response({"check_runs": [{"status": "in_progress", "name": "build"}]}, headers=quota)
+        success = _response(
+            {"check_runs": [{"status": "completed", "conclusion": "success", "name": "build"}]},
+            headers=quota,
+        )
+
+        with patch("httpx.AsyncClient.get", side_effect=[pending, success]), \
+             patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            status = await monitor.poll_status("https://github.com/o/r", "sha")
+
+            assert status == "completed_success"
+            # Only the pending tick waits; the completing response costs nothing
+            mock_sleep.assert_called_once()
+            assert 5 < mock_sleep.call_args[0][0] <= 60
+
+    asyncio.run(run_test())
+
+def test_low_quota_on_completed_status_does_not_sleep(monitor):
+    async def run_test():
+        success = _response(
+            {"check_runs": [{"status": "completed", "conclusion": "success", "name": "build"}]},
+            headers={"X-RateLimit-Remaining": "2", "X-RateLimit-Reset": str(int(time.time()) + 60)},
+        )
+
+        with patch("httpx.AsyncClient.get", return_value=success), \
+             patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            assert await monitor.poll_status("https://github.com/o/r", "sha") == "completed_success"
+            mock_sleep.assert_not_called()
+
+    asyncio.run(run_test())
+
+def test_rate_limit_reset_past_deadline_gives_up(monitor):
+    async def run_test():
+        reset_at = int(time.time()) + 3600
+        pending = _response(
+            {"check_runs": [{"status": "in_progress", "name": "build"}]},
+            headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(reset_at)},
+        )
+        limited = _response({"message": "rate limited"}, status_code=429, headers={"Retry-After": "3600"})
+
+        for response in (pending, limited):
+            with patch("httpx.AsyncClient.get", return_value=response), \
+                 patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+                status = await monitor.poll_status("https://github.com/o/r", "sha", timeout_seconds=300)
+
+                assert status == "unknown_timeout"
+                mock_sleep.assert_not_called()
+            monitor._quota_reset_at = None
+
+    asyncio.run(run_test())
+
+def test_conditional_get_reuses_cached_items_on_304(monitor):
+    async def run_test():
+        pending = _response(
+            {"check_runs": [{"status": "in_progress", "name": "build"}]},
+            headers={"ETag": '"abc123"'},
+        )
+        not_modified = httpx.Response(304, request=httpx.Request("GET", "https://api.github.com/repos/o/r"))
+        success = _response({"check_runs": [{"status": "completed", "conclusion": "success", "name": "build"}]})
+
+        with patch("httpx.AsyncClient.get", side_effect=[pending, not_modified, success]) as mock_get, \
+             patch("asyncio.sleep", new_callable=AsyncMock):
+            status = await monitor.poll_status("https://github.com/o/r", "sha")
+
+            assert status == "completed_success"
+            assert mock_get.call_args_list[0].kwargs["headers"] == {}
+            assert mock_get.call_args_list[1].kwargs["headers"] == {"If-None-Match": '"abc123"'}
+            # The 304 kept the state in_progress — only one status transition was logged before success
+            assert [e["status"] for e in monitor.timeline] == ["in_progress", "completed_success"]
+
+    asyncio.run(run_test())
+
+def test_concurrent_polls_for_same_commit_are_coalesced(monitor):
+    async def run_test():
+        pending = _response({"check_runs": [{"status": "in_progress", "name": "build"}]})
+        success = _response({"check_runs": [{"status": "completed", "conclusion": "success", "name": "build"}]})
+
+        with patch("httpx.AsyncClient.get", side_effect=[pending, success]) as mock_get, \
+             patch("asyncio.sleep", new_callable=AsyncMock):
+            results = await asyncio.gather(
+                monitor.poll_status("https://github.com/o/r", "sha"),
+                monitor.poll_status("https://github.com/o/r", "sha"),
+            )
+
+            assert results == ["completed_success", "completed_success"]
+            assert mock_get.call_count == 2
+            assert monitor._inflight == {}
+
+    asyncio.run(run_test())
+
+def test_cancelled_callers_and_aclose_stop_shared_poll(monitor):
+    async def run_test():
+        pending = _response({"check_runs": [{"status": "in_progress", "name": "build"}]})
+
+        with patch("httpx.AsyncClient.get", return_value=pending) as mock_get:
+            # Last waiter leaving cancels the shared poll
+            caller = asyncio.ensure_future(monitor.poll_status("https://github.com/o/r", "sha", timeout_seconds=60))
+            await asyncio.sleep(0.05)
+            shared = monitor._inflight["https://api.github.com/repos/o/r/commits/sha/check-runs"]
+            caller.cancel()
+            await asyncio.gather(caller, return_exceptions=True)
+            await asyncio.sleep(0)
+            assert shared.cancelled()
+            assert monitor._inflight == {}
+
+            # aclose() cancels polls that still have waiters
+            caller = asyncio.ensure_future(monitor.poll_status("https://github.com/o/r", "sha", timeout_seconds=60))
+            await asyncio.sleep(0.05)
+            assert monitor._inflight
+            await monitor.aclose()
+            await asyncio.gather(caller, return_exceptions=True)
+            assert caller.cancelled()
+            assert monitor._inflight == {}
+            calls = mock_get.call_count
+            await asyncio.sleep(0.05)
+            assert mock_get.call_count == calls
+
+    asyncio.run(run_test())
+
+def test_http_client_reused_across_polls(monitor):
+    async def run_test():
+        success = _response({"check_runs": [{"status": "completed", "conclusion": "success", "name": "build"}]})
+
+        with patch("httpx.AsyncClient.get", return_value=success):
+            await monitor.poll_status("https://github.com/o/r", "sha1")
+            first_client = monitor._client
+            await monitor.poll_status("https://github.com/o/r", "sha2")
+            assert monitor._client is first_client
+
+        await monitor.aclose()
+        assert monitor._client is None
+
+    asyncio.run(run_test())
+
+def test_adaptive_backoff_tracks_job_age(monitor):
+    async def run_test():
+        started = "2026-01-01T00:00:00Z"
+        started_epoch = 1767225600.0
+        pending = _response({"check_runs": [{"status": "in_progress", "name": "build", "started_at": started}]})
+        success = _response({"check_runs": [{"status": "completed", "conclusion": "success", "name": "build", "started_at": started}]})
+
+        with patch("httpx.AsyncClient.get", side_effect=[pending, success]), \
+             patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep, \
+             patch("time.time", return_value=started_epoch + 200), \
+             _no_jitter():
+            status = await monitor.poll_status("https://github.com/o/r", "sha")
+
+            assert status == "completed_success"
+            # 200s into the job → 0.15 * 200 = 30s
+            mock_sleep.assert_called_once_with(pytest.approx(30.0))
+
+        # Completed run duration seeds the next poll: median 200s / 10 = 20s
+        assert monitor._median_duration["o/r"] == pytest.approx(200.0)
+        assert monitor._initial_backoff("o/r") == pytest.approx(20.0)
+
+    asyncio.run(run_test())
+
+def test_graphql_check_runs_flattened():
+    monitor = CIMonitor(github_token="fake", use_graphql=True)
+
+    async def run_test():
+        payload = {"data": {"repository": {"object": {"checkSuites": {"nodes": [
+            {"checkRuns": {"nodes": [
+                {"name": "build", "status": "COMPLETED", "conclusion": "SUCCESS", "startedAt": None},
+                {"name": "deploy", "status": "QUEUED", "conclusion": None, "startedAt": None},
+            ]}},
+        ]}}}}}
+        gql = _response(payload)
+
+        with patch("httpx.AsyncClient.post", return_value=gql) as mock_post, \
+             patch("httpx.AsyncClient.get") as mock_get:
+            status = await monitor.poll_status("https://github.com/o/r", "sha")
+
+            assert status == "completed_success"
+            mock_get.assert_not_called()
+            variables = mock_post.call_args.kwargs["json"]["variables"]
+            assert variables == {"owner": "o", "repo": "r", "sha": "sha"}
+
+    asyncio.run(run_test())
+
+def test_timeline_is_bounded():
+    monitor = CIMonitor(github_token="fake", timeline_maxlen=3)
+    for i in range(5):
+        monitor._add_timeline_event(i, "queued")
+
+    timeline = monitor.get_timeline()
+    assert isinstance(timeline, list)
+    assert [e["iteration"] for e in timeline] == [2, 3, 4]
+
+def test_circuit_breaker_opens_after_consecutive_transient_errors(monitor):
+    async def run_test():
+        with patch("httpx.AsyncClient.get", side_effect=httpx.ConnectError("down")) as mock_get, \
+             patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep, \
+             _no_jitter():
+            status = await monitor.poll_status("https://github.com/o/r", "sha")
+
+            assert status == "ci_error"
+            assert mock_get.call_count == 6
+            # Exponential error backoff: 2, 4, 8, 16, 32 seconds
+            assert [c.args[0] for c in mock_sleep.call_args_list] == [2.0, 4.0, 8.0, 16.0, 32.0]
+            assert monitor.timeline[-1]["circuit_open"] is True
+
+    asyncio.run(run_test())
+
+def test_transient_error_then_recovery(monitor):
+    async def run_test():
+        success = _response({"check_runs": [{"status": "completed", "conclusion": "success", "name": "build"}]})
+
+        with patch("httpx.AsyncClient.get", side_effect=[httpx.ReadTimeout("slow"), success]), \
+             patch("asyncio.sleep", new_callable=AsyncMock):
+            status = await monitor.poll_status("https://github.com/o/r", "sha")
+            assert status == "completed_success"
+
+    asyncio.run(run_test())
+
+def test_unexpected_error_fails_fast(monitor):
+    async def run_test():
+        with patch("httpx.AsyncClient.get", side_effect=RuntimeError("bug")) as mock_get, \
+             patch("asyncio.sleep", new_callable=AsyncMock):
+            status = await monitor.poll_status("https://github.com/o/r", "sha")
+
+            assert status == "ci_error"
+            assert mock_get.call_count == 1
+
+    asyncio.run(run_test())
+
+def test_timeline_timestamps_serialised_as_iso(monitor):
+    with patch("time.time", return_value=1767225600.0):
+        monitor._add_timeline_event(1, "queued")
+
+    assert monitor.timeline[0]["timestamp"] == 1767225600.0
+    assert monitor.get_timeline()[0]["timestamp"] == "2026-01-01T00:00:00+00:00"
+
+def test_backoff_is_jittered(monitor):
+    async def run_test():
+        pending = _response({"check_runs": [{"status": "in_progress", "name": "build"}]})
+        success = _response({"check_runs": [{"status": "completed", "conclusion": "success", "name": "build"}]})
+
+        with patch("httpx.AsyncClient.get", side_effect=[pending, success]), \
+             patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep, \
+             patch("random.uniform", return_value=6.2) as mock_uniform:
+            await monitor.poll_status("https://github.com/o/r", "sha")
+
+            mock_uniform.assert_called_once_with(2.5, 7.5)
+            mock_sleep.assert_called_once_with(6.2)
+
+    asyncio.run(run_test())
+
+def test_workflow_runs_streamed_and_truncated(monitor):
+    pytest.importorskip("ijson")
+
+    runs = [{"name": f"build {n}", "status": "completed", "conclusion": "success"} for n in range(100)]
+
+    def handler(request):
+        return httpx.Response(200, json={"total_count": 100, "workflow_runs": runs})
+
+    async def run_test():
+        monitor._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        items = await monitor._fetch_rest_items(
+            monitor._client, "https://api.github.com/repos/o/r/actions/runs?branch=b", "workflow_runs"
+        )
+        assert len(items) == 20
+        assert items[0]["name"] == "build 0"
+
+        status = await monitor.poll_branch_status("https://github.com/o/r", "b")
+        assert status == "completed_success"
+        await monitor.aclose()
+
+    asyncio.run(run_test())
+
+def test_webhook_wakes_waiter_without_polling(monitor):
+    async def run_test():
+        success = _response({"check_runs": [{"status": "completed", "conclusion": "success", "name": "build"}]})
+
+        with patch("httpx.AsyncClient.get", return_value=success) as mock_get, \
+             patch.object(monitor, "poll_status", new_callable=AsyncMock) as mock_poll:
+            waiter = asyncio.create_task(
+                monitor.wait_for_status("https://github.com/Owner/Repo", "abc123", timeout_seconds=5)
+            )
+            await asyncio.sleep(0)
+            assert webhook_hub.dispatch("owner/repo", "ABC123") == 1
+
+            status = await waiter
+            assert status == "completed_success"
+            assert mock_get.call_count == 1
+            mock_poll.assert_not_called()
+            assert webhook_hub.dispatch("owner/repo", "abc123") == 0
+
+    asyncio.run(run_test())
+
+def test_wait_for_status_falls_back_to_polling(monitor):
+    async def run_test():
+        with patch.object(monitor, "poll_status", new_callable=AsyncMock, return_value="completed_failure") as mock_poll:
+            status = await monitor.wait_for_status(
+                "https://github.com/o/r", "sha", timeout_seconds=5, fallback_after=0.01
+            )
+            assert status == "completed_failure"
+            mock_poll.assert_called_once()
+
+    asyncio.run(run_test())
@@ -144,8 +144,11 @@ def test_dev_endpoint_timeout_override():
         mock_orch = MagicMock()
         mock_orch.run = AsyncMock(return_value=_fake_state())
         mock_orch_cls.return_value = mock_orch
-        # Make wait_for pass through
-        mock_asyncio.wait_for = AsyncMock(return_value=_fake_state())
+        # Make wait_for pass through (awaiting the run so no coroutine leaks)
+        async def _pass_through(coro, timeout=None):
+            return await coro
+
+        mock_asyncio.wait_for = AsyncMock(side_effect=_pass_through)
         mock_asyncio.TimeoutError = asyncio.TimeoutError
 
         from main import app
@@ -32,6 +32,8 @@ from app.llm.prompts import (
     build_user_prompt,
     DOMAIN_PROMPTS,
 )
+from app.llm.rate_limiter import AsyncRateLimiter
+from app.core.config import LLM_BURST
 from app.parser.classification import BUG_TYPE_PRIORITY
 
 
@@ -207,6 +209,30 @@ class TestDiffSizeCheckReject:
 
         assert FixAgent._check_diff_size(diff, threshold=10) is False
 
+    def test_streamed_check_matches_full_diff(self):
+        original = "\n".join(f"line {i}" for i in range(60))
+        patched = "\n".join(f"changed {i}" for i in range(60))
+        full = FixAgent._compute_diff(original, patched, "test.py")
+
+        ok, partial = FixAgent._compute_diff_within_limit(original, patched, "test.py", 10)
+        assert ok is False
+        assert full.startswith(partial) and len(partial) < len(full)
+
+        ok, diff = FixAgent._compute_diff_within_limit(SAMPLE_FILE, SAMPLE_PATCHED, "t.py", 50)
+        assert ok is True
+        assert diff == FixAgent._compute_diff(SAMPLE_FILE, SAMPLE_PATCHED, "t.py")
+
+    def test_identical_regeneration_reuses_cached_diff(self):
+        FixAgent._compute_diff_within_limit.cache_clear()
+        FixAgent._compute_diff_within_limit(SAMPLE_FILE, SAMPLE_PATCHED, "t.py", 50)
+        FixAgent._compute_diff_within_limit(SAMPLE_FILE, SAMPLE_PATCHED, "t.py", 50)
+        assert FixAgent._compute_diff_within_limit.cache_info().hits == 1
+
+    def test_headers_excluded_and_boundary_inclusive(self):
+        diff = "--- a/f.py\n+++ b/f.py\n@@ -1,2 +1,2 @@\n-old\n+new\n--flag\n context"
+        assert FixAgent._check_diff_size(diff, threshold=3) is True
+        assert FixAgent._check_diff_size(diff, threshold=2) is False
+
     def test_agent_rejects_large_diff(self):
         # Create a patch that changes many lines
         big_patch = "\n".join(f"changed line {i}" for i in range(100))
@@ -307,6 +333,10 @@ class TestMergeConflictDetection:
         content = "<<<<<<< HEAD\ncode\n>>>>>>> branch\n"
         assert FixAgent._has_conflict_markers(content) is True
 
+    def test_unanchored_marker_substring_not_flagged(self):
+        content = 'SEPARATOR = "<<<<<<< not a conflict"\n'
+        assert FixAgent._has_conflict_markers(content) is False
+
 
 # ---------------------------------------------------------------------------
 # 8. Working Directory Scope Respected
@@ -367,6 +397,11 @@ class TestWorkingDirectoryNoScope:
     def test_is_in_scope_not_matching(self):
         assert FixAgent._is_in_scope("frontend/src/App.js", "backend") is False
 
+    def test_is_in_scope_requires_component_boundary(self):
+        assert FixAgent._is_in_scope("backend2/app.py", "backend") is False
+        assert FixAgent._is_in_scope("backend\\app\\main.py", "backend/") is True
+        assert FixAgent._is_in_scope("/backend/app/main.py", "\\backend\\") is True
+
 
 # ---------------------------------------------------------------------------
 # 10. Snippet Extraction
@@ -535,6 +570,10 @@ class TestContextLevelEscalation:
     def test_attempt_5_is_large(self):
         assert decide_context_level(5) == "large"
 
+    def test_small_file_is_always_medium(self):
+        assert decide_context_level(5, num_lines=299) == "medium"
+        assert decide_context_level(5, num_lines=300) == "large"
+
     def test_context_level_in_fix_result(self):
         mock_client = MagicMock(spec=LLMClient)
         mock_client.call_with_fallback = AsyncMock(
@@ -616,6 +655,194 @@ class TestLLMResponseParsing:
         assert resp.confidence_score == 1.0  # Clamped to max
 
 
+# ---------------------------------------------------------------------------
+# Degenerate Inputs
+# ---------------------------------------------------------------------------
+class TestDegenerateInputsSkipLLM:
+    """Verify empty files and far out-of-range lines never reach the LLM."""
+
+    def test_empty_file_skips_llm(self):
+        mock_client = MagicMock(spec=LLMClient)
+        mock_client.call_with_fallback = AsyncMock()
+        agent = FixAgent(client=mock_client)
+
+        result = _run(agent.fix(_make_bug(), "   \n"))
+
+        assert result.manual_required is True
+        assert result.success is False
+        mock_client.call_with_fallback.assert_not_called()
+
+    def test_line_far_past_eof_skips_llm(self):
+        mock_client = MagicMock(spec=LLMClient)
+        mock_client.call_with_fallback = AsyncMock()
+        agent = FixAgent(client=mock_client)
+
+        result = _run(agent.fix(_make_bug(line_number=500), SAMPLE_FILE))
+
+        assert result.manual_required is True
+        mock_client.call_with_fallback.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# Focused Context for Large Files
+# ---------------------------------------------------------------------------
+class TestFocusedContext:
+    """Verify large files are sent as a region and the patch is spliced back."""
+
+    def test_window_includes_enclosing_def(self):
+        lines = [f"x{i} = {i}" for i in range(1000)]
+        lines[450] = "def handler():"
+        assert FixAgent._focused_window(lines, 720, max_lines=400) == (450, 850)
+
+    def test_window_clamped_at_file_end(self):
+        lines = [f"x{i} = {i}" for i in range(1000)]
+        assert FixAgent._focused_window(lines, 999, max_lines=400) == (600, 1000)
+
+    def test_large_file_sends_region_and_splices_patch(self):
+        lines = [f"value_{i} = {i}" for i in range(1000)]
+        lines[699] = "value_699 = (699"
+        content = "\n".join(lines) + "\n"
+
+        def fake_call(user_prompt, system_prompt, router):
+            assert "FILE REGION (lines 500-899 of 1000)" in user_prompt
+            assert "value_100 = 100" not in user_prompt
+            region = "\n".join(lines[499:899]).replace("value_699 = (699", "value_699 = (699)")
+            return _mock_llm_response(patched=region)
+
+        mock_client = MagicMock(spec=LLMClient)
+        mock_client.call_with_fallback = AsyncMock(side_effect=fake_call)
+        agent = FixAgent(client=mock_client)
+
+        result = _run(agent.fix(_make_bug(line_number=700), content))
+
+        assert result.success is True
+        assert result.patched_content == content.replace("value_699 = (699\n", "value_699 = (699)\n")
+
+
+# ---------------------------------------------------------------------------
+# LLM Call Pacing
+# ---------------------------------------------------------------------------
+class TestLLMRateLimiter:
+    """Verify LLM calls are paced by a bucket instead of a fixed sleep."""
+
+    def test_burst_within_capacity_does_not_sleep(self):
+        client = MagicMock(spec=LLMClient)
+        client.call_with_fallback = AsyncMock(return_value=_mock_llm_response())
+        agent = FixAgent(client=client, rate_limiter=AsyncRateLimiter(5, 60, capacity=5))
+
+        with patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            for _ in range(3):
+                _run(agent.fix(_make_bug(), SAMPLE_FILE))
+            mock_sleep.assert_not_called()
+
+    def test_over_capacity_waits_for_drain(self):
+        limiter = AsyncRateLimiter(2, 60, capacity=2)
+        with patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep, \
+             patch("app.llm.rate_limiter.time.monotonic", return_value=100.0):
+            limiter._last_check = 100.0
+            _run(limiter.acquire())
+            _run(limiter.acquire())
+            mock_sleep.side_effect = lambda delay: setattr(limiter, "_level", 0.0)
+            _run(limiter.acquire())
+            mock_sleep.assert_called_once_with(pytest.approx(30.0))
+
+    def test_fix_agent_burst_is_bounded_by_config(self):
+        agent = FixAgent(client=MagicMock(spec=LLMClient))
+        assert agent._limiter.capacity == LLM_BURST
+        assert agent._limiter.capacity < agent._limiter.max_rate
+
+    def test_default_capacity_paces_second_call(self):
+        # Capacity is independent of the rate: 20/min with the default
+        # capacity of 1 lets one call through, then spaces calls 3s apart.
+        limiter = AsyncRateLimiter(20, 60)
+        with patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep, \
+             patch("app.llm.rate_limiter.time.monotonic", return_value=100.0):
+            limiter._last_check = 100.0
+            _run(limiter.acquire())
+            mock_sleep.assert_not_called()
+            mock_sleep.side_effect = lambda delay: setattr(limiter, "_level", 0.0)
+            _run(limiter.acquire())
+            mock_sleep.assert_called_once_with(pytest.approx(3.0))
+
+
+# ---------------------------------------------------------------------------
+# Batched Fixes
+# ---------------------------------------------------------------------------
+class TestFixBatch:
+    """Verify fix_batch runs fixes concurrently behind a semaphore."""
+
+    def test_batch_respects_concurrency_and_order(self):
+        in_flight = 0
+        peak = 0
+
+        async def fake_call(**kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return _mock_llm_response()
+
+        client = MagicMock(spec=LLMClient)
+        client.call_with_fallback = AsyncMock(side_effect=fake_call)
+        agent = FixAgent(client=client, rate_limiter=AsyncRateLimiter(60, 60, capacity=5))
+
+        items = [
+            {"bug_report": _make_bug(file_path=f"app/mod{i}.py"), "file_content": SAMPLE_FILE}
+            for i in range(5)
+        ]
+        results = _run(agent.fix_batch(items, max_concurrency=2))
+
+        assert peak == 2
+        assert [r.bug_report.file_path for r in results] == [f"app/mod{i}.py" for i in range(5)]
+        assert all(r.success for r in results)
+
+    def test_identical_fixes_in_batch_flag_one_repeat(self):
+        client = MagicMock(spec=LLMClient)
+        client.call_with_fallback = AsyncMock(return_value=_mock_llm_response())
+        agent = FixAgent(client=client)
+
+        items = [{"bug_report": _make_bug(), "file_content": SAMPLE_FILE}] * 2
+        results = _run(agent.fix_batch(items))
+
+        assert sum(r.previous_attempt_detected for r in results) == 1
+
+    def test_batch_timeout_returns_timeout_error_per_item(self):
+        async def call(user_prompt, **kwargs):
+            if "mod0" in user_prompt:
+                await asyncio.sleep(10)
+            return _mock_llm_response()
+
+        client = MagicMock(spec=LLMClient)
+        client.call_with_fallback = AsyncMock(side_effect=call)
+        agent = FixAgent(client=client, rate_limiter=AsyncRateLimiter(60, 60, capacity=5))
+
+        items = [
+            {"bug_report": _make_bug(file_path=f"app/mod{i}.py"), "file_content": SAMPLE_FILE}
+            for i in range(2)
+        ]
+        results = _run(agent.fix_batch(items, timeout=0.05))
+
+        assert isinstance(results[0], asyncio.TimeoutError)
+        assert results[1].success
+
+    def test_identical_concurrent_fixes_share_one_llm_call(self):
+        async def slow_call(**kwargs):
+            await asyncio.sleep(0.01)
+            return _mock_llm_response()
+
+        client = MagicMock(spec=LLMClient)
+        client.call_with_fallback = AsyncMock(side_effect=slow_call)
+        agent = FixAgent(client=client)
+
+        items = [{"bug_report": _make_bug(), "file_content": SAMPLE_FILE}] * 3
+        results = _run(agent.fix_batch(items))
+
+        assert client.call_with_fallback.call_count == 1
+        assert all(r.patched_content == SAMPLE_PATCHED for r in results)
+        assert agent._inflight == {}
+
+
 # ---------------------------------------------------------------------------
 # Bonus: Provider Health
 # ---------------------------------------------------------------------------
@@ -138,7 +138,7 @@ class TestFixFingerprint:
         fp1 = generate_fix_fingerprint(bug, diff)
         fp2 = generate_fix_fingerprint(bug, diff)
         assert fp1 == fp2
-        assert len(fp1) == 16
+        assert len(fp1) == 32
 
     def test_same_bug_different_diff_different_fingerprint(self):
         bug = _make_bug()
@@ -191,6 +191,20 @@ class TestBugSignature:
         sig2 = generate_bug_signature(_make_bug(sub_type="missing_colon"))
         assert sig1 != sig2
 
+    def test_cached_property_matches_and_is_not_serialised(self):
+        bug = _make_bug()
+        assert bug.signature == generate_bug_signature(bug)
+        assert bug.severity_hint == "syntax"
+        assert "signature" not in bug.model_dump()
+        assert bug == _make_bug()
+
+    def test_bug_type_is_interned(self):
+        import sys
+        dynamic = "".join(["SYN", "TAX"])
+        bug = BugReport(bug_type=dynamic, sub_type="x", file_path="a.py", line_number=1)
+        assert bug.bug_type is not dynamic
+        assert bug.bug_type is sys.intern("SYNTAX")
+
 
 # ===========================================================================
 # 3. Patch Locality — Pass
@@ -372,7 +386,7 @@ class TestPatchHash:
         h1 = compute_patch_hash(diff)
         h2 = compute_patch_hash(diff)
         assert h1 == h2
-        assert len(h1) == 16
+        assert len(h1) == 32
 
     def test_different_diff_different_hash(self):
         h1 = compute_patch_hash("diff A")
@@ -486,6 +500,59 @@ class TestRepeatDetection:
         r2 = _run(agent.fix(_make_bug(), SAMPLE_FILE))
         assert r2.success is True
         assert r2.previous_attempt_detected is False
+    def test_ineffective_fingerprints_persist_per_repo(self, tmp_path):
+        db = str(tmp_path / "fingerprints.db")
+        repo = "https://github.com/org/repo"
+        mock_client = MagicMock(spec=LLMClient)
+        mock_client.call_with_fallback = AsyncMock(return_value=_mock_response())
+
+        first = FixAgent(client=mock_client, locality_window=100, fingerprint_db=db)
+        r1 = _run(first.fix(_make_bug(), SAMPLE_FILE, repo_url=repo))
+        assert r1.success is True
+        # Accepted fixes are not persisted; only ones found ineffective are
+        assert len(first._fingerprint_store) == 0
+        _run(first.record_ineffective(r1, repo))
+        first._fingerprint_store.close()
+
+        # Fresh agent (e.g. after a restart) still flags it for the same repo...
+        restarted = FixAgent(client=mock_client, locality_window=100, fingerprint_db=db)
+        r2 = _run(restarted.fix(_make_bug(), SAMPLE_FILE, repo_url=repo))
+        assert r2.escalation_reason == REPEATED_FIX
+        restarted._fingerprint_store.close()
+
+        # ...but not for a different repo
+        other = FixAgent(client=mock_client, locality_window=100, fingerprint_db=db)
+        r3 = _run(other.fix(_make_bug(), SAMPLE_FILE, repo_url="https://github.com/org/other"))
+        assert r3.success is True
+        other._fingerprint_store.close()
+
+    def test_clear_fingerprints_keeps_persisted_ones(self, tmp_path):
+        db = str(tmp_path / "fingerprints.db")
+        repo, other = "https://github.com/org/repo", "https://github.com/org/other"
+        agent = FixAgent(client=MagicMock(spec=LLMClient), fingerprint_db=db)
+        agent._fingerprint_store.add("fp-a", repo)
+        agent._fingerprint_store.add("fp-b", other)
+
+        agent.clear_fingerprints()
+        assert agent.has_seen_fingerprint("fp-a", repo)
+        assert agent.has_seen_fingerprint("fp-b", other)
+
+        # A persisted wipe is scoped to the given repo
+        agent.clear_rejected_fingerprints(repo)
+        assert not agent.has_seen_fingerprint("fp-a", repo)
+        assert agent.has_seen_fingerprint("fp-b", other)
+        agent._fingerprint_store.close()
+
+    def test_fingerprint_store_is_bounded_lru(self):
+        agent = FixAgent(client=MagicMock(spec=LLMClient), max_fingerprints=2)
+        assert agent._remember_fingerprint("a") is False
+        assert agent._remember_fingerprint("b") is False
+        assert agent._remember_fingerprint("a") is True  # refreshes "a"
+        assert agent._remember_fingerprint("c") is False  # evicts "b"
+
+        assert agent.has_seen_fingerprint("a") is True
+        assert agent.has_seen_fingerprint("b") is False
+        assert agent.has_seen_fingerprint("c") is True
 
 
 # ===========================================================================
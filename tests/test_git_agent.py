@@ -35,18 +35,86 @@ def test_commit_prefix_enforcement(git_agent):
     abs_file = os.path.join(workspace, "main.py")
 
     with patch("builtins.open", mock_open()), \
+         patch.object(GitAgent, "_write_bytes") as mock_write, \
          patch("app.agents.git_agent.os.path.abspath", return_value=workspace), \
          patch("app.agents.git_agent.os.path.normpath", return_value=abs_file), \
          patch("subprocess.run") as mock_run:
             
             result = git_agent.apply_fix(fix, workspace)
             assert result is True
+            mock_write.assert_called_once_with(abs_file, b"fixed")
             
-            # Check commit call
-            commit_calls = [call for call in mock_run.call_args_list if "commit" in call.args[0]]
-            assert len(commit_calls) > 0
-            msg = commit_calls[0].args[0][3]
-            assert msg.startswith("[AI-AGENT] Fix: SYNTAX/error")
+            # add/diff/commit run as one shell script in a single spawn
+            assert mock_run.call_count == 1
+            script = mock_run.call_args.args[0][2]
+            assert "git commit -F - -- main.py" in script
+            assert mock_run.call_args.kwargs["input"] == b"[AI-AGENT] Fix: SYNTAX/error in main.py"
+
+def test_apply_fix_commits_in_real_repo(git_agent, tmp_path):
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    subprocess.run(["git", "config", "user.email", "t@example.com"], cwd=tmp_path, check=True)
+    subprocess.run(["git", "config", "user.name", "t"], cwd=tmp_path, check=True)
+    (tmp_path / "my file.py").write_text("x = 1\n")
+    subprocess.run(["git", "add", "."], cwd=tmp_path, check=True)
+    subprocess.run(["git", "commit", "-qm", "init"], cwd=tmp_path, check=True)
+
+    bug = BugReport(bug_type="SYNTAX", sub_type="error", file_path="my file.py", line_number=1)
+    assert git_agent.apply_fix(FixResult(bug_report=bug, success=True, patched_content="x = 2\n"), str(tmp_path)) is True
+    # Identical content → skipped before any git process is spawned
+    with patch("subprocess.run") as mock_run:
+        assert git_agent.apply_fix(FixResult(bug_report=bug, success=True, patched_content="x = 2\n"), str(tmp_path)) is False
+        mock_run.assert_not_called()
+    assert git_agent.commit_count == 1
+
+    log = subprocess.run(["git", "log", "--format=%s"], cwd=tmp_path, capture_output=True, text=True).stdout
+    assert log.splitlines()[0] == "[AI-AGENT] Fix: SYNTAX/error in my file.py"
+
+    # Persistent cat-file session tracks HEAD across further commits
+    head = subprocess.run(["git", "rev-parse", "HEAD"], cwd=tmp_path, capture_output=True, text=True).stdout.strip()
+    assert git_agent.get_last_commit_sha(str(tmp_path)) == head
+    git_agent.apply_fix(FixResult(bug_report=bug, success=True, patched_content="x = 3\n"), str(tmp_path))
+    head = subprocess.run(["git", "rev-parse", "HEAD"], cwd=tmp_path, capture_output=True, text=True).stdout.strip()
+    assert git_agent.get_last_commit_sha(str(tmp_path)) == head
+    git_agent.close()
+
+def test_deferred_writes_commit_once_per_domain(git_agent, tmp_path):
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    subprocess.run(["git", "config", "user.email", "t@example.com"], cwd=tmp_path, check=True)
+    subprocess.run(["git", "config", "user.name", "t"], cwd=tmp_path, check=True)
+    for name in ("a.py", "b.py"):
+        (tmp_path / name).write_text("x = 1\n")
+    subprocess.run(["git", "add", "."], cwd=tmp_path, check=True)
+    subprocess.run(["git", "commit", "-qm", "init"], cwd=tmp_path, check=True)
+
+    fixes = [
+        FixResult(bug_report=BugReport(bug_type="SYNTAX", sub_type="error", file_path=name, line_number=1),
+                  success=True, patched_content="x = 2\n")
+        for name in ("a.py", "b.py")
+    ]
+    for fix in fixes:
+        assert git_agent.apply_fix(fix, str(tmp_path), commit=False) is True
+    assert git_agent.commit_count == 0
+
+    assert git_agent.commit_batch(str(tmp_path), "backend", fixes) is True
+    assert git_agent.commit_count == 1
+    log = subprocess.run(["git", "log", "-1", "--format=%B"], cwd=tmp_path, capture_output=True, text=True).stdout
+    assert log.splitlines()[0] == "[AI-AGENT] Fix: backend: 2 fix(es)"
+    assert "- SYNTAX/error in b.py" in log
+    # Nothing left to stage → no empty commit
+    assert git_agent.commit_batch(str(tmp_path), "backend", fixes) is False
+    assert git_agent.commit_count == 1
+
+def test_apply_fix_rejects_sibling_directory_escape(git_agent, tmp_path):
+    workspace = tmp_path / "ws"
+    workspace.mkdir()
+    (tmp_path / "ws-evil").mkdir()
+    bug = BugReport(bug_type="SYNTAX", sub_type="error", file_path="../ws-evil/x.py", line_number=1)
+    fix = FixResult(bug_report=bug, success=True, patched_content="x = 1\n")
+
+    with patch("subprocess.run") as mock_run:
+        assert git_agent.apply_fix(fix, str(workspace)) is False
+        mock_run.assert_not_called()
+    assert not (tmp_path / "ws-evil" / "x.py").exists()
 
 def test_commit_cap_blocks_at_limit(git_agent):
     git_agent.commit_count = 20 # Assuming default limit is 20
@@ -57,6 +125,18 @@ def test_commit_cap_blocks_at_limit(git_agent):
     assert result is False
     assert git_agent.efficiency_penalty_risk is True
 
+def test_commit_cap_logs_once_and_short_circuits(git_agent, caplog):
+    git_agent.commit_count = 20
+    bug = BugReport(bug_type="LINTING", sub_type="unused", file_path="a.py", line_number=1)
+    fix = FixResult(bug_report=bug, success=True, patched_content="new")
+
+    with caplog.at_level("ERROR", logger="app.agents.git_agent"), \
+         patch.object(GitAgent, "_prepare_write") as mock_prepare:
+        for _ in range(5):
+            assert git_agent.apply_fix(fix, "/tmp") is False
+        mock_prepare.assert_not_called()
+    assert sum("Max commit limit" in r.message for r in caplog.records) == 1
+
 @patch("subprocess.run")
 def test_push_refuses_main(mock_run, git_agent):
     status = git_agent.push("/tmp", branch="main")
@@ -66,18 +146,17 @@ def test_push_refuses_main(mock_run, git_agent):
 @patch("subprocess.run")
 def test_push_retry_on_failure(mock_run, git_agent):
     git_agent.generate_branch_name("T", "A")
-    # Fail first push, succeed fetch, rebase, then second push
+    # Fail first push, succeed pull --rebase, then second push
     mock_run.side_effect = [
         subprocess.CalledProcessError(1, "git push", stderr="conflict"),
-        MagicMock(),  # git fetch
-        MagicMock(),  # git rebase
+        MagicMock(),  # git pull --rebase
         MagicMock(),  # push 2 success
     ]
     
     with patch("time.sleep"):
         status = git_agent.push("/tmp")
         assert status == "success"
-        assert mock_run.call_count == 4
+        assert mock_run.call_count == 3
 
 def test_state_exposure(git_agent):
     git_agent.generate_branch_name("TEAM", "LEADER")
@@ -8,6 +8,7 @@ import pytest
 import asyncio
 import subprocess
 import time
+import httpx
 from unittest.mock import MagicMock, patch, mock_open, AsyncMock
 
 from app.llm.router import LLMRouter, ProviderHealth
@@ -117,6 +118,13 @@ class TestPatchTruncation:
         assert agent.validate_patch_size("x" * 100, "x" * 10) is False
         assert agent.validate_patch_size("x" * 100, "x" * 50) is True
 
+    def test_validate_patch_size_accepts_encoded_bytes(self):
+        """Pre-encoded payloads are compared by byte length without re-encoding."""
+        agent = GitAgent()
+        assert agent.validate_patch_size(b"x" * 100, b"x" * 10) is False
+        assert agent.validate_patch_size("é" * 100, "é" * 60) is True
+        assert agent.validate_patch_size(("é" * 100).encode(), ("é" * 60).encode()) is True
+
 
 # -----------------------------------------------------------------------
 # Priority Commit Gating Tests
@@ -183,15 +191,14 @@ class TestCommitBudget:
 class TestPushConflictSafety:
     @patch("subprocess.run")
     def test_push_conflict_triggers_rebase(self, mock_run):
-        """Push failure triggers fetch + rebase before retry."""
+        """Push failure triggers a single pull --rebase before retry."""
         agent = GitAgent()
         agent.generate_branch_name("T", "A")
         
-        # First push fails, fetch succeeds, rebase succeeds, second push succeeds
+        # First push fails, pull --rebase succeeds, second push succeeds
         mock_run.side_effect = [
             subprocess.CalledProcessError(1, "git push", stderr="conflict"),  # push 1
-            MagicMock(),  # git fetch
-            MagicMock(),  # git rebase
+            MagicMock(),  # git pull --rebase
             MagicMock(),  # push 2 (success)
         ]
         
@@ -199,11 +206,31 @@ class TestPushConflictSafety:
             status = agent.push("/tmp")
         
         assert status == "success"
-        assert mock_run.call_count == 4
-        # Verify fetch and rebase were called
+        assert mock_run.call_count == 3
+        # Verify fetch + rebase were combined into one call
         calls = [c.args[0] for c in mock_run.call_args_list]
-        assert ["git", "fetch", "origin", agent.branch_name] in calls
-        assert ["git", "rebase", f"origin/{agent.branch_name}"] in calls
+        assert ["git", "pull", "--rebase", "--autostash", "origin", agent.branch_name] in calls
+
+    @patch("subprocess.run")
+    def test_push_conflict_reset_strategy(self, mock_run):
+        """Reset strategy replays local commits on the remote branch in one spawn."""
+        agent = GitAgent(conflict_strategy="reset")
+        agent.generate_branch_name("T", "A")
+
+        mock_run.side_effect = [
+            subprocess.CalledProcessError(1, "git push", stderr="conflict"),
+            MagicMock(),  # fetch + reset + cherry-pick script
+            MagicMock(),  # push 2 (success)
+        ]
+
+        with patch("time.sleep"):
+            status = agent.push("/tmp")
+
+        assert status == "success"
+        script = mock_run.call_args_list[1].args[0]
+        assert script[:2] == ["/bin/sh", "-c"]
+        assert "git reset --hard origin/T_A_AI_Fix" in script[2]
+        assert "git cherry-pick" in script[2]
 
     @patch("subprocess.run")
     def test_push_conflict_unresolved_on_rebase_failure(self, mock_run):
@@ -219,6 +246,33 @@ class TestPushConflictSafety:
         status = agent.push("/tmp")
         assert status == "conflict_unresolved"
 
+    @patch("subprocess.run")
+    def test_push_auth_failure_not_retried(self, mock_run):
+        """Auth/permission errors stop immediately without sync or sleep."""
+        agent = GitAgent()
+        agent.generate_branch_name("T", "A")
+        mock_run.side_effect = [
+            subprocess.CalledProcessError(128, "git push", stderr=b"remote: Permission denied to bot."),
+        ]
+
+        with patch("time.sleep") as mock_sleep:
+            status = agent.push("/tmp")
+
+        assert status == "auth_failed"
+        assert mock_run.call_count == 1
+        # stdout is discarded and stderr stays binary until an error is handled
+        kwargs = mock_run.call_args.kwargs
+        assert kwargs["stdout"] is subprocess.DEVNULL
+        assert "text" not in kwargs
+        mock_sleep.assert_not_called()
+
+    def test_push_backoff_grows_and_is_capped(self):
+        agent = GitAgent(push_backoff_base=0.5)
+        with patch("random.uniform", return_value=0.1):
+            assert agent._push_backoff(1) == pytest.approx(0.6)
+            assert agent._push_backoff(3) == pytest.approx(2.1)
+            assert agent._push_backoff(10) == pytest.approx(30.1)
+
 
 # -----------------------------------------------------------------------
 # CI Timeline Clarity Tests
@@ -229,15 +283,17 @@ class TestCITimelineClarity:
         monitor = CIMonitor(github_token="fake")
         
         async def run_test():
-            mock_resp = MagicMock()
-            mock_resp.json.return_value = {
-                "check_runs": [{
-                    "status": "completed",
-                    "conclusion": "success",
-                    "name": "Build Python"
-                }]
-            }
-            mock_resp.raise_for_status = MagicMock()
+            mock_resp = httpx.Response(
+                200,
+                json={
+                    "check_runs": [{
+                        "status": "completed",
+                        "conclusion": "success",
+                        "name": "Build Python"
+                    }]
+                },
+                request=httpx.Request("GET", "https://api.github.com/repos/o/r"),
+            )
             
             with patch("httpx.AsyncClient.get", return_value=mock_resp):
                 await monitor.poll_status("https://github.com/o/r", "sha", iteration=1)
@@ -257,14 +313,23 @@ class TestCITimelineClarity:
         monitor = CIMonitor(github_token="fake")
         
         async def run_test():
-            mock_resp = MagicMock()
-            mock_resp.json.return_value = {
-                "check_runs": [{"status": "in_progress", "name": "CI Tests"}]
-            }
-            mock_resp.raise_for_status = MagicMock()
+            mock_resp = httpx.Response(
+                200,
+                json={
+                    "check_runs": [{"status": "in_progress", "name": "CI Tests"}]
+                },
+                request=httpx.Request("GET", "https://api.github.com/repos/o/r"),
+            )
             
+            clock = {"now": 1_000_000.0}
+
+            async def fake_sleep(delay):
+                clock["now"] += delay
+
+            # Stall detection is time-based, so sleeps must advance the clock
             with patch("httpx.AsyncClient.get", return_value=mock_resp), \
-                 patch("asyncio.sleep", new_callable=AsyncMock):
+                 patch("time.time", side_effect=lambda: clock["now"]), \
+                 patch("asyncio.sleep", side_effect=fake_sleep):
                 await monitor.poll_status("https://github.com/o/r", "sha")
         
         asyncio.run(run_test())
@@ -0,0 +1,67 @@
+"""
+GitHub Webhook Endpoint Tests
+==============================
+Tests for POST /webhook/github signature checks and CI waiter dispatch.
+"""
+import hmac
+import json
+import hashlib
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from main import app
+
+_SECRET = "test-secret"
+
+
+def _post(client, event, payload, secret=_SECRET):
+    body = json.dumps(payload).encode()
+    sig = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return client.post(
+        "/webhook/github",
+        content=body,
+        headers={"X-GitHub-Event": event, "X-Hub-Signature-256": sig},
+    )
+
+
+def test_webhook_rejects_bad_signature():
+    with patch("app.api.github_webhook.GITHUB_WEBHOOK_SECRET", _SECRET):
+        client = TestClient(app)
+        resp = _post(client, "check_suite", {"action": "completed"}, secret="wrong")
+        assert resp.status_code == 401
+
+
+def test_webhook_rejected_when_secret_unset():
+    with patch("app.api.github_webhook.GITHUB_WEBHOOK_SECRET", ""):
+        client = TestClient(app)
+        resp = _post(client, "check_suite", {"action": "completed"}, secret="")
+        assert resp.status_code == 401
+
+
+def test_completed_check_suite_dispatched():
+    payload = {
+        "action": "completed",
+        "repository": {"full_name": "owner/repo"},
+        "check_suite": {"head_sha": "abc123"},
+    }
+    with patch("app.api.github_webhook.GITHUB_WEBHOOK_SECRET", _SECRET), \
+         patch("app.api.github_webhook.webhook_hub.dispatch", return_value=1) as mock_dispatch:
+        client = TestClient(app)
+        resp = _post(client, "check_suite", payload)
+        assert resp.status_code == 200
+        assert resp.json() == {"status": "accepted", "woken": 1}
+        mock_dispatch.assert_called_once_with("owner/repo", "abc123")
+
+
+def test_non_completed_events_ignored():
+    payload = {
+        "action": "requested",
+        "repository": {"full_name": "owner/repo"},
+        "workflow_run": {"head_sha": "abc123"},
+    }
+    with patch("app.api.github_webhook.GITHUB_WEBHOOK_SECRET", _SECRET), \
+         patch("app.api.github_webhook.webhook_hub.dispatch") as mock_dispatch:
+        client = TestClient(app)
+        resp = _post(client, "workflow_run", payload)
+        assert resp.json()["status"] == "ignored"
+        mock_dispatch.assert_not_called()
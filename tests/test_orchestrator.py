@@ -20,6 +20,8 @@ import asyncio
 def mock_fix_agent():
     agent = MagicMock(spec=FixAgent)
     agent.fix = AsyncMock()
+    # Real batching over the mocked fix() so wave tests see each call
+    agent.fix_batch = lambda items, **kw: FixAgent.fix_batch(agent, items, **kw)
     return agent
 
 @pytest.fixture
@@ -64,6 +66,7 @@ def test_fix_then_pass(orchestrator, mock_fix_agent):
              patch("os.path.exists", return_value=True), \
              patch("builtins.open", mock_open(read_data="def hello(): pass")), \
              patch.object(orchestrator.git_agent, "apply_fix", return_value=True), \
+             patch.object(orchestrator.git_agent, "commit_batch", return_value=True), \
              patch.object(orchestrator.git_agent, "checkout_branch", return_value=True), \
              patch.object(orchestrator.git_agent, "push"), \
              patch.object(orchestrator.git_agent, "get_last_commit_sha", return_value="sha123"), \
@@ -126,6 +129,7 @@ def test_retries_exhausted(orchestrator, mock_fix_agent):
              patch("os.path.exists", return_value=True), \
              patch("builtins.open", mock_open(read_data="content")), \
              patch.object(orchestrator.git_agent, "apply_fix", return_value=True), \
+             patch.object(orchestrator.git_agent, "commit_batch", return_value=True), \
              patch.object(orchestrator.git_agent, "checkout_branch", return_value=True), \
              patch.object(orchestrator.git_agent, "push"), \
              patch.object(orchestrator.git_agent, "get_last_commit_sha", return_value="sha"), \
@@ -7,9 +7,12 @@ All external dependencies mocked (Docker, Git, GitHub API, LLM).
 import pytest
 import asyncio
 import time
+import threading
 from unittest.mock import AsyncMock, MagicMock, patch, mock_open, PropertyMock
 
-from app.agents.orchestrator import Orchestrator, _sort_bugs_by_priority, _classify_domain
+from app.agents.orchestrator import (
+    Orchestrator, _sort_bugs_by_priority, _classify_domain, _dedupe_by_signature,
+)
 from app.agents.fix_agent import FixAgent
 from app.models.bug_report import BugReport
 from app.models.fix_result import FixResult
@@ -49,6 +52,8 @@ def _pass_exec(log="PASS"):
 def mock_fix_agent():
     agent = MagicMock(spec=FixAgent)
     agent.fix = AsyncMock()
+    # Real batching over the mocked fix() so wave tests see each call
+    agent.fix_batch = lambda items, **kw: FixAgent.fix_batch(agent, items, **kw)
     return agent
 
 
@@ -84,6 +89,7 @@ def test_retry_stops_at_limit(orchestrator, mock_fix_agent):
              patch("app.agents.orchestrator.run_in_container", return_value=_fail_exec()), \
              patch("app.agents.orchestrator.parse_failure_log") as mock_parser, \
              patch.object(orchestrator.git_agent, "apply_fix", return_value=True), \
+             patch.object(orchestrator.git_agent, "commit_batch", return_value=True), \
              patch.object(orchestrator.git_agent, "checkout_branch", return_value=True), \
              patch.object(orchestrator.git_agent, "push"), \
              patch.object(orchestrator.git_agent, "get_last_commit_sha", return_value="sha1"), \
@@ -122,6 +128,7 @@ def test_repeated_fixes_skipped(orchestrator, mock_fix_agent):
              patch("app.agents.orchestrator.run_in_container", return_value=_fail_exec()), \
              patch("app.agents.orchestrator.parse_failure_log") as mock_parser, \
              patch.object(orchestrator.git_agent, "apply_fix", return_value=True), \
+             patch.object(orchestrator.git_agent, "commit_batch", return_value=True), \
              patch.object(orchestrator.git_agent, "checkout_branch", return_value=True), \
              patch.object(orchestrator.git_agent, "push"), \
              patch.object(orchestrator.git_agent, "get_last_commit_sha", return_value="sha1"), \
@@ -222,6 +229,22 @@ def test_failure_prioritization():
     assert sorted_bugs[3].bug_type == "LOGIC"
     assert sorted_bugs[4].bug_type == "LINTING"
 
+    # Order within a tier is preserved (stable, like sorted())
+    same_tier = [
+        _make_bug(bug_type="LINTING", sub_type="a"),
+        _make_bug(bug_type="SYNTAX", sub_type="b"),
+        _make_bug(bug_type="LINTING", sub_type="c"),
+        _make_bug(bug_type="SYNTAX", sub_type="d"),
+    ]
+    assert [b.sub_type for b in _sort_bugs_by_priority(same_tier)] == ["b", "d", "a", "c"]
+
+    # Repeat reports of one bug collapse to the first occurrence
+    first = _make_bug(bug_type="SYNTAX", sub_type="x")
+    repeat = _make_bug(bug_type="SYNTAX", sub_type="x")
+    other = _make_bug(bug_type="LINTING", sub_type="y")
+    deduped = _dedupe_by_signature([first, other, repeat])
+    assert deduped == [first, other] and deduped[0] is first
+
 
 # ===================================================================
 # Test 6: Confidence gating reverts ineffective fix
@@ -238,6 +261,7 @@ def test_confidence_gating_reverts(orchestrator, mock_fix_agent):
              patch("app.agents.orchestrator.run_in_container") as mock_exec, \
              patch("app.agents.orchestrator.parse_failure_log") as mock_parser, \
              patch.object(orchestrator.git_agent, "apply_fix", return_value=True), \
+             patch.object(orchestrator.git_agent, "commit_batch", return_value=True), \
              patch.object(orchestrator.git_agent, "checkout_branch", return_value=True), \
              patch.object(orchestrator.git_agent, "push"), \
              patch.object(orchestrator.git_agent, "get_last_commit_sha", return_value="sha1"), \
@@ -252,6 +276,10 @@ def test_confidence_gating_reverts(orchestrator, mock_fix_agent):
 
             # The fix should have been marked as ineffective via error_message
             assert state["total_fixes_applied"] >= 1
+            # ...and remembered for later runs against this repo
+            fix, repo = mock_fix_agent.record_ineffective.await_args.args
+            assert fix.bug_report is bug and fix.effectiveness_score == 0.0
+            assert repo == "https://github.com/org/repo"
 
     asyncio.run(run_test())
 
@@ -263,7 +291,7 @@ def test_performance_guardrail(orchestrator, mock_fix_agent):
     """When time exceeds threshold, performance_hint changes."""
     async def run_test():
         patches = _base_patches()
-        # Simulate time.time() returning values that trigger the guardrail
+        # Simulate time.monotonic() returning values that trigger the guardrail
         start = 1000.0
         # Use a counter so first call returns `start` (for run_start),
         # all subsequent calls return `start + 200` (elapsed = 200s → "reduced")
@@ -281,7 +309,8 @@ def test_performance_guardrail(orchestrator, mock_fix_agent):
              patch("app.agents.orchestrator.parse_failure_log", return_value=[]), \
              patch("app.agents.orchestrator.time") as mock_time:
 
-            mock_time.time.side_effect = _mock_time
+            mock_time.time.return_value = start
+            mock_time.monotonic.side_effect = _mock_time
 
             state = await orchestrator.run(repo_url="https://github.com/org/repo")
 
@@ -371,6 +400,7 @@ def test_fix_then_pass(orchestrator, mock_fix_agent):
              patch("app.agents.orchestrator.run_in_container") as mock_exec, \
              patch("app.agents.orchestrator.parse_failure_log") as mock_parser, \
              patch.object(orchestrator.git_agent, "apply_fix", return_value=True), \
+             patch.object(orchestrator.git_agent, "commit_batch", return_value=True), \
              patch.object(orchestrator.git_agent, "checkout_branch", return_value=True), \
              patch.object(orchestrator.git_agent, "push"), \
              patch.object(orchestrator.git_agent, "get_last_commit_sha", return_value="sha123"), \
@@ -395,3 +425,423 @@ def test_fix_then_pass(orchestrator, mock_fix_agent):
             assert len(state["ci_runs"]) == 1
 
     asyncio.run(run_test())
+
+
+# ===================================================================
+# Test 12: Fix calls for distinct files run concurrently
+# ===================================================================
+def test_fix_calls_concurrent_across_files(orchestrator, mock_fix_agent):
+    """Bugs in different files are fixed concurrently; same-file bugs wait a wave."""
+    async def run_test():
+        patches = _base_patches()
+        bug_a1 = _make_bug(file_path="a.py", line_number=1)
+        bug_b1 = _make_bug(file_path="b.py", line_number=1)
+        bug_a2 = _make_bug(file_path="a.py", line_number=2)
+
+        in_flight = [0]
+        max_in_flight = [0]
+        order = []
+
+        contents = {}
+
+        async def _fix(bug_report, file_content, **kwargs):
+            contents[(bug_report.file_path, bug_report.line_number)] = file_content
+            in_flight[0] += 1
+            max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+            await asyncio.sleep(0)
+            in_flight[0] -= 1
+            order.append((bug_report.file_path, bug_report.line_number))
+            return _make_fix(bug_report, patched_content=f"patched {bug_report.line_number}",
+                             patch_fingerprint=f"fp_{bug_report.line_number}")
+
+        applied = []
+        with patches["clone"], patches["detect"], patches["writer"], \
+             patches["exists"], patches["open_file"], \
+             patch("app.agents.orchestrator.RUN_RETRY_LIMIT", 1), \
+             patch("app.agents.orchestrator.run_in_container", return_value=_fail_exec()), \
+             patch("app.agents.orchestrator.parse_failure_log", return_value=[bug_a1, bug_b1, bug_a2]), \
+             patch.object(orchestrator.git_agent, "apply_fix",
+                          side_effect=lambda fr, ws, **kw: applied.append(fr.bug_report.line_number) or True), \
+             patch.object(orchestrator.git_agent, "commit_batch", return_value=True) as mock_commit, \
+             patch.object(orchestrator.git_agent, "checkout_branch", return_value=True), \
+             patch.object(orchestrator.git_agent, "push"), \
+             patch.object(orchestrator.git_agent, "get_last_commit_sha", return_value="sha1"), \
+             patch.object(orchestrator.ci_monitor, "poll_status", new_callable=AsyncMock, return_value="failure"):
+
+            mock_fix_agent.fix.side_effect = _fix
+            await orchestrator.run(repo_url="https://github.com/org/repo")
+
+        assert max_in_flight[0] == 2
+        # Second a.py bug is only requested after the first wave was applied
+        assert order[2] == ("a.py", 2)
+        assert applied == [1, 1, 2]
+        # ...and sees the first patch without re-reading the file
+        assert contents[("a.py", 1)] == "def hello(): pass"
+        assert contents[("a.py", 2)] == "patched 1"
+        # All three patches land in one backend commit after the waves
+        mock_commit.assert_called_once()
+        domain, fixes = mock_commit.call_args.args[1:]
+        assert domain == "backend" and len(fixes) == 3
+
+    asyncio.run(run_test())
+
+
+# ===================================================================
+# Test 13: Detectors run concurrently and merge without duplicates
+# ===================================================================
+def test_detectors_run_concurrently_and_merge(orchestrator, mock_fix_agent):
+    """CI log parse and static analysis overlap; a failing scanner is non-fatal."""
+    async def run_test():
+        patches = _base_patches()
+        ci_bug = _make_bug(file_path="a.py", line_number=1)
+        static_new = _make_bug(bug_type="LINTING", sub_type="unused_import", file_path="b.py", line_number=2)
+        # Both detectors must be in flight at once to get past the barrier
+        barrier = threading.Barrier(2, timeout=5)
+
+        def _parse(log, workspace_path=None):
+            barrier.wait()
+            return [ci_bug]
+
+        def _static(workspace_path):
+            barrier.wait()
+            return [_make_bug(file_path="a.py", line_number=1), static_new]
+
+        with patches["clone"], patches["detect"], patches["writer"], \
+             patches["exists"], patches["open_file"], \
+             patch("app.agents.orchestrator.RUN_RETRY_LIMIT", 1), \
+             patch("app.agents.orchestrator.run_in_container", return_value=_fail_exec()), \
+             patch("app.agents.orchestrator.run_builtin_scan", side_effect=RuntimeError("boom")), \
+             patch("app.agents.orchestrator.parse_failure_log", side_effect=_parse), \
+             patch("app.agents.orchestrator.run_static_analysis", side_effect=_static), \
+             patch.object(orchestrator.git_agent, "checkout_branch", return_value=True):
+
+            mock_fix_agent.fix.side_effect = lambda bug_report, file_content, **kw: _make_fix(
+                bug_report, success=False
+            )
+            state = await orchestrator.run(repo_url="https://github.com/org/repo")
+
+        # Static duplicate of the CI bug is dropped; only the new one is added
+        assert [b.file_path for b in state["snapshots"][0].bug_reports] == ["a.py", "b.py"]
+        # total_bugs_found counts the primary + CI merge, before static analysis
+        assert state["total_bugs_found"] == 1
+
+    asyncio.run(run_test())
+
+
+# ===================================================================
+# Test 14: Hung fix calls and builds are bounded by the run budget
+# ===================================================================
+def test_hung_fix_call_times_out(orchestrator, mock_fix_agent):
+    """A fix call that never returns is cut off and counted as skipped."""
+    async def run_test():
+        patches = _base_patches()
+        bug = _make_bug()
+
+        async def _hang(**kwargs):
+            await asyncio.sleep(60)
+
+        with patches["clone"], patches["detect"], patches["writer"], \
+             patches["exists"], patches["open_file"], \
+             patch("app.agents.orchestrator.RUN_RETRY_LIMIT", 1), \
+             patch("app.agents.orchestrator._GUARDRAIL_ABORT", 1.0), \
+             patch("app.agents.orchestrator._MIN_FIX_TIMEOUT", 0.01), \
+             patch("app.agents.orchestrator.run_in_container", return_value=_fail_exec()) as mock_exec, \
+             patch("app.agents.orchestrator.parse_failure_log", return_value=[bug]), \
+             patch.object(orchestrator.git_agent, "checkout_branch", return_value=True):
+
+            mock_fix_agent.fix.side_effect = _hang
+            started = time.monotonic()
+            state = await orchestrator.run(repo_url="https://github.com/org/repo")
+
+        assert time.monotonic() - started < 10
+        assert state["skipped_fix_count"] == 1
+        assert state["total_fixes_applied"] == 0
+        # Container timeout follows the remaining budget, floored at 30s
+        assert mock_exec.call_args.kwargs["timeout_seconds"] == 30
+
+    asyncio.run(run_test())
+
+
+# ===================================================================
+# Test 15: Repeated fix over unchanged source skips the LLM call
+# ===================================================================
+def test_repeated_input_skips_llm_call(orchestrator, mock_fix_agent):
+    """Once a bug's fix repeats, the same bug over the same source is not re-requested."""
+    async def run_test():
+        patches = _base_patches()
+        bug_a = _make_bug(file_path="a.py")
+        bug_b = _make_bug(file_path="b.py")
+        calls = []
+
+        async def _fix(bug_report, file_content, **kwargs):
+            calls.append(bug_report.file_path)
+            fp = "same_a" if bug_report.file_path == "a.py" else f"b_{len(calls)}"
+            return _make_fix(bug_report, patch_fingerprint=fp)
+
+        with patches["clone"], patches["detect"], patches["writer"], \
+             patches["exists"], patches["open_file"], \
+             patch("app.agents.orchestrator.RUN_RETRY_LIMIT", 3), \
+             patch("app.agents.orchestrator.run_in_container", return_value=_fail_exec()), \
+             patch("app.agents.orchestrator.parse_failure_log", return_value=[bug_a, bug_b]), \
+             patch.object(orchestrator.git_agent, "apply_fix", return_value=True), \
+             patch.object(orchestrator.git_agent, "commit_batch", return_value=True), \
+             patch.object(orchestrator.git_agent, "checkout_branch", return_value=True), \
+             patch.object(orchestrator.git_agent, "push"), \
+             patch.object(orchestrator.git_agent, "get_last_commit_sha", return_value="sha1"), \
+             patch.object(orchestrator.ci_monitor, "poll_status", new_callable=AsyncMock, return_value="failure"):
+
+            mock_fix_agent.fix.side_effect = _fix
+            state = await orchestrator.run(repo_url="https://github.com/org/repo")
+
+        assert state["iteration"] == 3
+        # a.py: applied in 1, repeated in 2, not requested in 3
+        assert calls.count("a.py") == 2
+        assert calls.count("b.py") == 3
+
+    asyncio.run(run_test())
+
+
+# ===================================================================
+# Test 16: Guardrail is enforced between fix waves
+# ===================================================================
+def test_guardrail_stops_remaining_fix_waves(orchestrator, mock_fix_agent):
+    """Crossing the abort threshold mid-iteration skips later waves but commits written fixes."""
+    async def run_test():
+        patches = _base_patches()
+        bug_1 = _make_bug(file_path="a.py", line_number=1)
+        bug_2 = _make_bug(file_path="a.py", line_number=2)
+        calls = []
+        clock = [1000.0]
+
+        async def _slow_fix(bug_report, file_content, **kwargs):
+            calls.append(bug_report.line_number)
+            clock[0] += 300  # first wave alone exceeds the 5-minute budget
+            return _make_fix(bug_report)
+
+        with patches["clone"], patches["detect"], patches["writer"], \
+             patches["exists"], patches["open_file"], \
+             patch("app.agents.orchestrator.time") as mock_time, \
+             patch("app.agents.orchestrator.run_in_container", return_value=_fail_exec()) as mock_exec, \
+             patch("app.agents.orchestrator.run_builtin_scan", return_value=[]), \
+             patch("app.agents.orchestrator.run_static_analysis", return_value=[]), \
+             patch("app.agents.orchestrator.parse_failure_log", return_value=[bug_1, bug_2]), \
+             patch.object(orchestrator.git_agent, "apply_fix", return_value=True), \
+             patch.object(orchestrator.git_agent, "commit_batch", return_value=True) as mock_commit, \
+             patch.object(orchestrator.git_agent, "checkout_branch", return_value=True), \
+             patch.object(orchestrator.git_agent, "push") as mock_push:
+
+            mock_time.time.return_value = clock[0]
+            mock_time.monotonic.side_effect = lambda: clock[0]
+            mock_fix_agent.fix.side_effect = _slow_fix
+            state = await orchestrator.run(repo_url="https://github.com/org/repo")
+
+        assert calls == [1]
+        assert state["status"] == "exhausted"
+        assert state["total_fixes_applied"] == 1
+        mock_commit.assert_called_once()
+        # No verification build and no push after the guardrail
+        assert mock_exec.call_count == 1
+        mock_push.assert_not_called()
+        assert state["snapshots"][-1].ci_status == "skipped"
+
+    asyncio.run(run_test())
+
+
+# ===================================================================
+# Test 17: CI result comes from the webhook wait when a secret is set
+# ===================================================================
+def test_ci_wait_uses_webhook_when_secret_configured(orchestrator, mock_fix_agent):
+    """With GITHUB_WEBHOOK_SECRET set, CI completion is awaited via webhook, not polled."""
+    async def run_test():
+        patches = _base_patches()
+        bug = _make_bug()
+
+        with patches["clone"], patches["detect"], patches["writer"], \
+             patches["exists"], patches["open_file"], \
+             patch("app.agents.orchestrator.GITHUB_WEBHOOK_SECRET", "s3cret"), \
+             patch("app.agents.orchestrator.run_in_container", side_effect=[_fail_exec(), _fail_exec()]), \
+             patch("app.agents.orchestrator.parse_failure_log", side_effect=[[bug], []]), \
+             patch.object(orchestrator.git_agent, "apply_fix", return_value=True), \
+             patch.object(orchestrator.git_agent, "commit_batch", return_value=True), \
+             patch.object(orchestrator.git_agent, "checkout_branch", return_value=True), \
+             patch.object(orchestrator.git_agent, "push"), \
+             patch.object(orchestrator.git_agent, "get_last_commit_sha", return_value="sha123"), \
+             patch.object(orchestrator.ci_monitor, "poll_status", new_callable=AsyncMock) as mock_poll, \
+             patch.object(orchestrator.ci_monitor, "wait_for_status", new_callable=AsyncMock,
+                          return_value="completed_success") as mock_wait:
+
+            mock_fix_agent.fix.return_value = _make_fix(bug)
+            state = await orchestrator.run(repo_url="https://github.com/org/repo")
+
+        assert state["status"] == "success"
+        mock_wait.assert_awaited_once_with("https://github.com/org/repo", "sha123", iteration=1)
+        mock_poll.assert_not_called()
+
+    asyncio.run(run_test())
+
+
+# ===================================================================
+# Test 18: Pushes are batched across iterations
+# ===================================================================
+def _fresh_bug_parser():
+    """parse_failure_log stand-in reporting a new bug each call, so every fix is effective."""
+    counter = [0]
+
+    def _parse(log, workspace_path=None):
+        counter[0] += 1
+        return [_make_bug(line_number=counter[0])]
+    return _parse
+
+
+def test_pushes_batched_across_iterations(orchestrator, mock_fix_agent):
+    """Commits land every iteration; push + CI wait happen once per batch and on the last iteration."""
+    async def run_test():
+        patches = _base_patches()
+
+        with patches["clone"], patches["detect"], patches["writer"], \
+             patches["exists"], patches["open_file"], \
+             patch("app.agents.orchestrator.RUN_RETRY_LIMIT", 3), \
+             patch("app.agents.orchestrator.COMMIT_BATCH_SIZE", 2), \
+             patch("app.agents.orchestrator.run_in_container", return_value=_fail_exec()), \
+             patch("app.agents.orchestrator.parse_failure_log", side_effect=_fresh_bug_parser()), \
+             patch.object(orchestrator.git_agent, "apply_fix", return_value=True), \
+             patch.object(orchestrator.git_agent, "commit_batch", return_value=True) as mock_commit, \
+             patch.object(orchestrator.git_agent, "checkout_branch", return_value=True), \
+             patch.object(orchestrator.git_agent, "push") as mock_push, \
+             patch.object(orchestrator.git_agent, "get_last_commit_sha", return_value="sha1"), \
+             patch.object(orchestrator.ci_monitor, "poll_status", new_callable=AsyncMock,
+                          return_value="completed_failure") as mock_poll:
+
+            mock_fix_agent.fix.side_effect = lambda bug_report, file_content, **kw: _make_fix(
+                bug_report, patch_fingerprint=f"fp_{bug_report.line_number}"
+            )
+            state = await orchestrator.run(repo_url="https://github.com/org/repo")
+
+        assert mock_commit.call_count == 3
+        assert [s.ci_status for s in state["snapshots"]] == [
+            "deferred", "completed_failure", "completed_failure",
+        ]
+        assert mock_push.call_count == 2
+        assert mock_poll.await_count == 2
+
+    asyncio.run(run_test())
+
+
+def test_batched_fixes_pushed_when_loop_ends_early(orchestrator, mock_fix_agent):
+    """Fixes still batched when the build passes locally are pushed on the way out."""
+    async def run_test():
+        patches = _base_patches()
+
+        with patches["clone"], patches["detect"], patches["writer"], \
+             patches["exists"], patches["open_file"], \
+             patch("app.agents.orchestrator.COMMIT_BATCH_SIZE", 5), \
+             patch("app.agents.orchestrator.run_in_container",
+                   side_effect=[_fail_exec(), _fail_exec(), _pass_exec()]), \
+             patch("app.agents.orchestrator.parse_failure_log", side_effect=_fresh_bug_parser()), \
+             patch.object(orchestrator.git_agent, "apply_fix", return_value=True), \
+             patch.object(orchestrator.git_agent, "commit_batch", return_value=True), \
+             patch.object(orchestrator.git_agent, "checkout_branch", return_value=True), \
+             patch.object(orchestrator.git_agent, "push") as mock_push, \
+             patch.object(orchestrator.git_agent, "get_last_commit_sha", return_value="sha1"), \
+             patch.object(orchestrator.ci_monitor, "poll_status", new_callable=AsyncMock) as mock_poll:
+
+            mock_fix_agent.fix.side_effect = lambda bug_report, file_content, **kw: _make_fix(
+                bug_report, patch_fingerprint=f"fp_{bug_report.line_number}"
+            )
+            state = await orchestrator.run(repo_url="https://github.com/org/repo")
+
+        assert state["status"] == "success"
+        assert state["snapshots"][0].ci_status == "deferred"
+        mock_push.assert_called_once()
+        mock_poll.assert_not_called()
+
+    asyncio.run(run_test())
+
+
+# ===================================================================
+# Test 19: A cancelled run still cleans up and serialises git work
+# ===================================================================
+def test_cancelled_run_cleans_up_and_waits_for_git(orchestrator, mock_fix_agent):
+    """wait_for cancelling run() still writes results and closes clients;
+    push_partial waits for a git call still running in a worker thread."""
+    async def run_test():
+        patches = _base_patches()
+        bug = _make_bug()
+
+        async def _hang(**kwargs):
+            await asyncio.sleep(60)
+
+        with patches["clone"], patches["detect"], patches["writer"] as mock_writer, \
+             patches["exists"], patches["open_file"], \
+             patch("app.agents.orchestrator.run_in_container", return_value=_fail_exec()), \
+             patch("app.agents.orchestrator.parse_failure_log", return_value=[bug]), \
+             patch.object(orchestrator.git_agent, "checkout_branch", return_value=True), \
+             patch.object(orchestrator.ci_monitor, "aclose", new_callable=AsyncMock) as mock_aclose, \
+             patch.object(orchestrator.git_agent, "close") as mock_close:
+
+            mock_fix_agent.fix.side_effect = _hang
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    orchestrator.run(repo_url="https://github.com/org/repo"), timeout=0.2
+                )
+
+        mock_writer.assert_called_once()
+        mock_aclose.assert_awaited_once()
+        mock_close.assert_called_once()
+
+        # A git call holding the lock delays push_partial until it finishes
+        order = []
+        with patch.object(orchestrator.git_agent, "push", side_effect=lambda *a: order.append("push")):
+            orchestrator._git_lock.acquire()
+            pusher = asyncio.ensure_future(
+                asyncio.to_thread(orchestrator.push_partial, "/fake/workspace", "fix-branch")
+            )
+            await asyncio.sleep(0.05)
+            order.append("git call done")
+            orchestrator._git_lock.release()
+            await pusher
+        assert order == ["git call done", "push"]
+
+    asyncio.run(run_test())
+
+
+# ===================================================================
+# Test 20: A repeat at one context level does not block escalation
+# ===================================================================
+def test_repeated_input_still_escalates_context(orchestrator, mock_fix_agent):
+    """In a large file, a repeat at attempt 2 ("medium") still gets the
+    attempt-3 ("large") retry; the skipped attempt is not counted."""
+    async def run_test():
+        patches = _base_patches()
+        big_source = "x = 1\n" * 400
+        bug_a = _make_bug(file_path="a.py")
+        bug_b = _make_bug(file_path="b.py")
+        attempts = []
+
+        async def _fix(bug_report, file_content, attempt_number=1, **kwargs):
+            if bug_report.file_path == "a.py":
+                attempts.append(attempt_number)
+                return _make_fix(bug_report, patched_content=big_source, patch_fingerprint="same_a")
+            return _make_fix(bug_report, patch_fingerprint=f"b_{len(attempts)}_{attempt_number}")
+
+        with patches["clone"], patches["detect"], patches["writer"], patches["exists"], \
+             patch("builtins.open", mock_open(read_data=big_source)), \
+             patch("app.agents.orchestrator.RUN_RETRY_LIMIT", 5), \
+             patch("app.agents.orchestrator.run_in_container", return_value=_fail_exec()), \
+             patch("app.agents.orchestrator.parse_failure_log", return_value=[bug_a, bug_b]), \
+             patch.object(orchestrator.git_agent, "apply_fix", return_value=True), \
+             patch.object(orchestrator.git_agent, "commit_batch", return_value=True), \
+             patch.object(orchestrator.git_agent, "checkout_branch", return_value=True), \
+             patch.object(orchestrator.git_agent, "push"), \
+             patch.object(orchestrator.git_agent, "get_last_commit_sha", return_value="sha1"), \
+             patch.object(orchestrator.ci_monitor, "poll_status", new_callable=AsyncMock, return_value="failure"):
+
+            mock_fix_agent.fix.side_effect = _fix
+            state = await orchestrator.run(repo_url="https://github.com/org/repo")
+
+        assert state["iteration"] == 5
+        # 1: applied, 2: repeat at "medium", 3: "large" retry (repeat again),
+        # 4-5: skipped without spending attempts
+        assert attempts == [1, 2, 3]
+
+    asyncio.run(run_test())
@@ -57,6 +57,8 @@ def _pass_exec(log="PASS"):
 def mock_fix_agent():
     agent = MagicMock(spec=FixAgent)
     agent.fix = AsyncMock()
+    # Real batching over the mocked fix() so wave tests see each call
+    agent.fix_batch = lambda items, **kw: FixAgent.fix_batch(agent, items, **kw)
     return agent
 
 
@@ -90,6 +92,7 @@ def test_repeated_ineffective_fixes_no_commit(orchestrator, mock_fix_agent):
              patch("app.agents.orchestrator.run_in_container") as mock_exec, \
              patch("app.agents.orchestrator.parse_failure_log") as mock_parser, \
              patch.object(orchestrator.git_agent, "apply_fix", return_value=True), \
+             patch.object(orchestrator.git_agent, "commit_batch", return_value=True), \
              patch.object(orchestrator.git_agent, "checkout_branch", return_value=True), \
              patch.object(orchestrator.git_agent, "push") as mock_push:
 
@@ -122,6 +125,7 @@ def test_ci_polling_timeout_stalled(orchestrator, mock_fix_agent):
              patch("app.agents.orchestrator.run_in_container") as mock_exec, \
              patch("app.agents.orchestrator.parse_failure_log") as mock_parser, \
              patch.object(orchestrator.git_agent, "apply_fix", return_value=True), \
+             patch.object(orchestrator.git_agent, "commit_batch", return_value=True), \
              patch.object(orchestrator.git_agent, "push"), \
              patch.object(orchestrator.git_agent, "get_last_commit_sha", return_value="sha1"), \
              patch.object(orchestrator.ci_monitor, "poll_status", new_callable=AsyncMock, return_value="unknown_timeout"):
@@ -167,22 +171,37 @@ def test_regression_detection_priority_aware():
     # Case 1: SYNTAX removed, only LINTING remains → improved
     prev_bugs = [_make_bug(bug_type="SYNTAX")]
     curr_bugs = [_make_bug(bug_type="LINTING", sub_type="unused_var")]
-    prev_sigs = [generate_bug_signature(b) for b in prev_bugs]
-    curr_sigs = [generate_bug_signature(b) for b in curr_bugs]
+    prev_sigs = frozenset(generate_bug_signature(b) for b in prev_bugs)
+    curr_sigs = frozenset(generate_bug_signature(b) for b in curr_bugs)
     assert _classify_iteration_outcome(prev_sigs, curr_sigs, prev_bugs, curr_bugs) == "improved"
 
     # Case 2: Only LINTING before, SYNTAX appears → regressed
     prev_bugs2 = [_make_bug(bug_type="LINTING", sub_type="unused_var", file_path="utils.py")]
     curr_bugs2 = [_make_bug(bug_type="SYNTAX", sub_type="invalid_syntax", file_path="main.py")]
-    prev_sigs2 = [generate_bug_signature(b) for b in prev_bugs2]
-    curr_sigs2 = [generate_bug_signature(b) for b in curr_bugs2]
+    prev_sigs2 = frozenset(generate_bug_signature(b) for b in prev_bugs2)
+    curr_sigs2 = frozenset(generate_bug_signature(b) for b in curr_bugs2)
     assert _classify_iteration_outcome(prev_sigs2, curr_sigs2, prev_bugs2, curr_bugs2) == "regressed"
 
     # Case 3: Identical → unchanged
     prev_bugs3 = [_make_bug()]
-    prev_sigs3 = [generate_bug_signature(b) for b in prev_bugs3]
+    prev_sigs3 = frozenset(generate_bug_signature(b) for b in prev_bugs3)
     assert _classify_iteration_outcome(prev_sigs3, prev_sigs3, prev_bugs3, prev_bugs3) == "unchanged"
 
+    # Case 4: Same top tier, fewer bugs at it (lint noise ignored) → improved
+    prev_bugs4 = [
+        _make_bug(bug_type="SYNTAX", line_number=1),
+        _make_bug(bug_type="SYNTAX", line_number=2),
+    ]
+    curr_bugs4 = [
+        _make_bug(bug_type="SYNTAX", line_number=1),
+        _make_bug(bug_type="LINTING", sub_type="unused_var", line_number=3),
+        _make_bug(bug_type="LINTING", sub_type="unused_var", line_number=4),
+    ]
+    prev_sigs4 = frozenset(generate_bug_signature(b) for b in prev_bugs4)
+    curr_sigs4 = frozenset(generate_bug_signature(b) for b in curr_bugs4)
+    assert _classify_iteration_outcome(prev_sigs4, curr_sigs4, prev_bugs4, curr_bugs4) == "improved"
+    assert _classify_iteration_outcome(curr_sigs4, prev_sigs4, curr_bugs4, prev_bugs4) == "regressed"
+
 
 # ===================================================================
 # Test 4: Fingerprint history cap
@@ -200,14 +219,19 @@ def test_fingerprint_history_cap():
     assert fps == {"fp_2", "fp_3", "fp_4"}
     assert "fp_0" not in fps
     assert "fp_1" not in fps
+    assert store.contains("bug_A", "fp_4")
+    assert not store.contains("bug_A", "fp_0")
+    assert not store.contains("unknown", "fp_4")
 
-    # Global cap: add 5 unique bugs (cap is 5, so first should be evicted)
+    # Global cap: add 5 one-shot bugs (cap is 5, so one must be evicted)
     for idx in range(5):
         store.add(f"other_bug_{idx}", f"fp_x_{idx}", idx)
 
-    # "bug_A" should have been evicted (it was the oldest)
-    assert store.get_fingerprints("bug_A") == set()
-    assert store.tracked_signatures <= 5
+    # "bug_A" was seen repeatedly (main queue), so the oldest one-shot bug goes instead
+    assert store.get_fingerprints("bug_A") == {"fp_2", "fp_3", "fp_4"}
+    assert store.get_fingerprints("other_bug_0") == set()
+    assert store.get_fingerprints("other_bug_4") == {"fp_x_4"}
+    assert store.tracked_signatures == 5
 
 
 # ===================================================================
@@ -228,6 +252,7 @@ def test_root_commit_gate_blocks_lint_fix(orchestrator, mock_fix_agent):
              patch("app.agents.orchestrator.run_in_container") as mock_exec, \
              patch("app.agents.orchestrator.parse_failure_log") as mock_parser, \
              patch.object(orchestrator.git_agent, "apply_fix", return_value=True), \
+             patch.object(orchestrator.git_agent, "commit_batch", return_value=True), \
              patch.object(orchestrator.git_agent, "checkout_branch", return_value=True), \
              patch.object(orchestrator.git_agent, "push") as mock_push:
 
@@ -243,7 +268,7 @@ def test_root_commit_gate_blocks_lint_fix(orchestrator, mock_fix_agent):
             async def _selective_fix(bug_report, **kwargs):
                 if bug_report.bug_type == "SYNTAX":
                     return _make_fix(bug_report, success=False, escalation_reason="LOW_CONFIDENCE")
-                return _make_fix(bug_report, bug_type="LINTING", patch_fingerprint="lint_fp")
+                return _make_fix(bug_report, patch_fingerprint="lint_fp")
             mock_fix_agent.fix.side_effect = _selective_fix
 
             state = await orchestrator.run(repo_url="https://github.com/org/repo")
@@ -251,6 +276,52 @@ def test_root_commit_gate_blocks_lint_fix(orchestrator, mock_fix_agent):
             # Push should NOT have been called because root failure remains
             # and no fix targets root
             mock_push.assert_not_called()
+            assert state["total_fixes_applied"] == 1
+            # The CI log showed the root failure, so the outcome was
+            # predetermined and the verify build was skipped
+            assert mock_exec.call_count == 1
+
+    asyncio.run(run_test())
+
+
+# ===================================================================
+# Test 5b: Scanner-only root failures do not skip verification
+# ===================================================================
+def test_scanner_only_root_failure_still_verifies(orchestrator, mock_fix_agent):
+    """A SYNTAX bug seen only by the built-in scanner may be absent from the
+    post-fix log, so the verify build still runs and can allow the commit."""
+    async def run_test():
+        patches = _base_patches()
+        syntax_bug = _make_bug(bug_type="SYNTAX", file_path="main.py")
+        lint_bug = _make_bug(bug_type="LINTING", sub_type="unused_var", file_path="utils.py", line_number=20)
+
+        with patches["clone"], patches["detect"], patches["writer"], \
+             patches["exists"], patches["open_file"], \
+             patch("app.agents.orchestrator.RUN_RETRY_LIMIT", 1), \
+             patch("app.agents.orchestrator.run_builtin_scan", return_value=[syntax_bug]), \
+             patch("app.agents.orchestrator.run_in_container", return_value=_fail_exec()) as mock_exec, \
+             patch("app.agents.orchestrator.parse_failure_log") as mock_parser, \
+             patch.object(orchestrator.git_agent, "apply_fix", return_value=True), \
+             patch.object(orchestrator.git_agent, "commit_batch", return_value=True), \
+             patch.object(orchestrator.git_agent, "checkout_branch", return_value=True), \
+             patch.object(orchestrator.git_agent, "push"), \
+             patch.object(orchestrator.git_agent, "get_last_commit_sha", return_value="sha1"), \
+             patch.object(orchestrator.ci_monitor, "poll_status", new_callable=AsyncMock, return_value="completed_failure"):
+
+            mock_parser.side_effect = [[lint_bug], [lint_bug.model_copy(update={"line_number": 30})]]
+
+            async def _selective_fix(bug_report, **kwargs):
+                if bug_report.bug_type == "SYNTAX":
+                    return _make_fix(bug_report, success=False, escalation_reason="LOW_CONFIDENCE")
+                return _make_fix(bug_report, patch_fingerprint="lint_fp")
+            mock_fix_agent.fix.side_effect = _selective_fix
+
+            state = await orchestrator.run(repo_url="https://github.com/org/repo")
+
+            assert state["total_fixes_applied"] == 1
+            # Built-in scan + verify build: the gate was not skipped
+            assert mock_exec.call_count == 2
+            assert state["effective_fix_count"] == 1
 
     asyncio.run(run_test())
 
@@ -291,6 +362,18 @@ def test_global_fingerprint_cap():
     assert store.get_fingerprints("sig_1") == set()
     assert store.get_fingerprints("sig_4") == {"fp4"}
 
+    # Repeat signatures are promoted; new one-shot signatures evict each other first
+    store.add("sig_2", "fp2b", 5)
+    store.add("sig_3", "fp3b", 6)
+    store.add("sig_5", "fp5", 7)
+    assert store.get_fingerprints("sig_4") == set()
+    assert store.get_fingerprints("sig_2") == {"fp2", "fp2b"}
+    # With no one-shot signatures left, the oldest main signature goes
+    store.add("sig_5", "fp5b", 8)
+    store.add("sig_6", "fp6", 9)
+    assert store.get_fingerprints("sig_2") == set()
+    assert store.tracked_signatures == 3
+
 
 # ===================================================================
 # Test 8: Serialisation round-trip for FixHistoryStore
@@ -308,3 +391,11 @@ def test_fix_history_store_serialisation():
     restored = _FixHistoryStore.from_list(serialised, per_bug_cap=5, global_cap=200)
     assert restored.get_fingerprints("sig_a") == {"fp1", "fp2"}
     assert restored.get_fingerprints("sig_b") == {"fp3"}
+
+    # Caps apply on restore: the repeated signature outlives the one-shot one
+    capped = _FixHistoryStore.from_list(serialised, per_bug_cap=1, global_cap=1)
+    assert capped.tracked_signatures == 1
+    assert capped.get_fingerprints("sig_b") == set()
+    assert capped.contains("sig_a", "fp2")
+    capped = _FixHistoryStore.from_list(serialised, per_bug_cap=1, global_cap=2)
+    assert capped.get_fingerprints("sig_a") == {"fp2"}